@@ -0,0 +1,204 @@
+import subprocess
+from pathlib import Path
+from typing import Optional, Tuple, List, Dict, Iterator, Union
+from assistant_merger.diff_stream import FileDiff, InvalidTargetError, NULL_BLOB, is_working_tree, diff_command, stream_lines, read_blobs
+from assistant_merger.classify import TEXT, classify_file_diff, summary_diff, parse_summary
+from assistant_merger.git_tools import PartialDecision, find_git_repo, parse_hunk_header, parse_llm_response, summary_decision, add_change_numbers
+
+NO_NEWLINE_MARKER = b"\\"
+
+def line_offsets(data: Union[bytes, memoryview]) -> List[int]:
+	"""Return the start offset of every line plus a final len(data), found with bytes.find.
+
+	Line i spans offsets[i]:offsets[i + 1], including its line ending.
+	"""
+	data = bytes(data) if isinstance(data, memoryview) else data
+	offsets = [0]
+	end = len(data)
+	find = data.find
+	pos = find(b"\n")
+	while pos != -1 and pos + 1 < end:
+		offsets.append(pos + 1)
+		pos = find(b"\n", pos + 1)
+	if end:
+		offsets.append(end)
+	return offsets
+
+def iter_lines(data: bytes) -> Iterator[bytes]:
+	"""Yield each line of data with its line ending, without splitting the whole buffer up front."""
+	start = 0
+	end = len(data)
+	while start < end:
+		pos = data.find(b"\n", start)
+		stop = end if pos == -1 else pos + 1
+		yield data[start:stop]
+		start = stop
+
+def get_git_diff_bytes(file_path: Path, target: Optional[str] = None, classify_files: bool = True) -> Tuple[bytes, Optional[str]]:
+	"""Get the git diff for a file as raw bytes, starting at its first hunk.
+
+	Binary files get the same single summary hunk as get_git_diff, and with
+	classify_files so do generated and huge files, so change numbers match
+	between the two.
+	"""
+	repo_path = find_git_repo(file_path)
+	if not repo_path:
+		return b"", f"No git repository found for {file_path}"
+	try:
+		relative_path = file_path.relative_to(repo_path)
+		args = diff_command(target) + ["--", relative_path.as_posix()]
+		file_diff = FileDiff(path=relative_path.as_posix())
+		body = []
+		for line in stream_lines(args, repo_path):
+			if body or line.startswith(b"@@"):
+				body.append(line)
+				# Sized and counted as parse_diff_stream does, for the huge check and the summary
+				file_diff.size += len(line)
+				if line[:1] == b"+":
+					file_diff.added += 1
+				elif line[:1] == b"-":
+					file_diff.removed += 1
+			elif line.startswith(b"index "):
+				blobs = line.split()[1].decode().split("..")
+				if len(blobs) == 2:
+					file_diff.old_blob, file_diff.new_blob = blobs
+			elif line.startswith(b"Binary files "):
+				file_diff.binary = True
+		if (file_diff.binary or classify_files and body) and file_diff.old_blob and file_diff.new_blob:
+			kind = classify_file_diff(repo_path, file_diff, is_working_tree(target))
+			if kind != TEXT:
+				return summary_diff(file_diff, kind).encode(), None
+		if body:
+			return b"".join(body), None
+		return b"", f"No changes or file not tracked: {relative_path}"
+	except InvalidTargetError as e:
+		return b"", str(e)
+	except (subprocess.SubprocessError, OSError) as e:
+		return b"", f"Error running git diff: {e}"
+	except ValueError as e:
+		return b"", f"Invalid file path relative to repo: {e}"
+
+def parse_hunks_bytes(diff: bytes) -> List[Dict[str, object]]:
+	"""Parse a bytes diff into hunks holding the exact old-side bytes of each hunk.
+
+	Only headers are decoded; removed lines are kept as bytes, with the final
+	newline dropped when git marks the old side as having none.
+	"""
+	hunks = []
+	current = None
+	last_sign = None
+	for line in iter_lines(diff):
+		if line.startswith(b"@@"):
+			parsed = parse_hunk_header(line.rstrip(b"\r\n").decode("utf-8", "replace"))
+			if parsed is None:
+				continue
+			current = {
+				"number": f"Change #{len(hunks) + 1}",
+				"old_start": parsed[0],
+				"old_lines": parsed[1],
+				"new_start": parsed[2],
+				"new_lines": parsed[3],
+				"removed": [],
+				"added": []
+			}
+			hunks.append(current)
+			last_sign = None
+		elif current is None:
+			continue
+		elif line.startswith(NO_NEWLINE_MARKER):
+			# The previous line had no newline in its version of the file
+			side = current["removed"] if last_sign == b"-" else current["added"]
+			if side:
+				side[-1] = side[-1].rstrip(b"\n")
+		elif line[:1] in (b"-", b"+"):
+			last_sign = line[:1]
+			(current["removed"] if last_sign == b"-" else current["added"]).append(line[1:])
+	return hunks
+
+def _line_ending(hunk: Dict[str, object]) -> bytes:
+	"""Guess the line ending a replacement should use from the lines in its hunk."""
+	for line in hunk["removed"] + hunk["added"]:
+		if line.endswith(b"\r\n"):
+			return b"\r\n"
+		if line.endswith(b"\n"):
+			return b"\n"
+	return b"\n"
+
+def add_change_numbers_bytes(diff: bytes, file_path: Path, add_line_numbers: bool = False, content: Optional[bytes] = None) -> Tuple[str, List[Dict[str, str]]]:
+	"""Annotate a bytes diff for display, decoding only for the rendered text.
+
+	Undecodable bytes are shown as replacement characters; apply_changes_bytes
+	still works from the original bytes so nothing is lost on the way back.
+	"""
+	if content is None:
+		try:
+			content = file_path.read_bytes()
+		except Exception as e:
+			return "", [{"error": f"Could not read file: {e}"}]
+	return add_change_numbers(
+		diff.decode("utf-8", "replace"),
+		file_path,
+		add_line_numbers,
+		content=content.decode("utf-8", "replace")
+	)
+
+def apply_changes_bytes(file_path: Path, diff: bytes, llm_response: str, content: Optional[bytes] = None) -> bytes:
+	"""Apply or revert changes on raw bytes and return the byte-exact merged file content.
+
+	Unchanged regions are copied straight from the file as memoryview slices;
+	line endings and encodings are preserved since nothing is decoded.
+	"""
+	approvals = parse_llm_response(llm_response)
+	if content is None:
+		content = file_path.read_bytes()
+
+	summary = parse_summary(diff[:diff.find(b"\n")].decode("utf-8", "replace")) if diff.startswith(b"@@ ") else None
+	if summary:
+		decision = summary_decision(approvals)
+		if isinstance(decision, list):
+			return "\n".join(decision).encode("utf-8", "surrogateescape")
+		if decision or summary.group(2) == NULL_BLOB:
+			return content if decision else b""
+		blob = read_blobs(find_git_repo(file_path), [summary.group(2)]).get(summary.group(2))
+		if blob is None:
+			raise ValueError(f"Could not read blob {summary.group(2)}")
+		return blob
+
+	view = memoryview(content)
+	offsets = line_offsets(content)
+	line_count = len(offsets) - 1
+	parts = []
+	pos = 0
+	for hunk in parse_hunks_bytes(diff):
+		decision = approvals.get(hunk["number"], True)
+		if decision is True:
+			continue
+		if hunk["new_lines"] == 0:
+			# Pure removal: the old lines go back after line new_start
+			start = end = offsets[min(hunk["new_start"], line_count)]
+		else:
+			start = offsets[hunk["new_start"] - 1]
+			end = offsets[min(hunk["new_start"] - 1 + hunk["new_lines"], line_count)]
+		if isinstance(decision, list):
+			ending = _line_ending(hunk)
+			replacement = ending.join(l.encode("utf-8", "surrogateescape") for l in decision)
+			if end < len(content) or content.endswith(b"\n"):
+				replacement += ending
+			original = [replacement]
+		elif isinstance(decision, PartialDecision):
+			# Body lines are numbered removed first, then added, as --unified=0 lists them
+			removed_count = len(hunk["removed"])
+			original = [line for i, line in enumerate(hunk["removed"]) if decision.rejects(i + 1)]
+			original += [line for i, line in enumerate(hunk["added"]) if not decision.rejects(removed_count + i + 1)]
+			# A kept line that ended its file without a newline needs one if lines now follow it
+			ending = _line_ending(hunk)
+			original = [line if i + 1 == len(original) or line.endswith(b"\n") else line + ending for i, line in enumerate(original)]
+			if original and not original[-1].endswith(b"\n") and end < len(content):
+				original[-1] += ending
+		else:
+			original = hunk["removed"]
+		parts.append(view[pos:start])
+		parts.extend(original)
+		pos = end
+	parts.append(view[pos:])
+	return b"".join(parts)
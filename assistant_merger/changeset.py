@@ -0,0 +1,381 @@
+import os
+import re
+import hashlib
+import tempfile
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Tuple, List, Dict
+from assistant_merger.git_tools import find_git_repo, format_hunk_header, parse_llm_response, summary_decision
+from assistant_merger.classify import TEXT, classify_file_diffs, summary_diff, parse_summary
+from assistant_merger.diff_stream import FileDiff, NULL_BLOB, iter_file_diffs, read_blobs
+from assistant_merger.bytes_mode import get_git_diff_bytes, apply_changes_bytes, parse_hunks_bytes, line_offsets
+
+def content_hash(data: bytes) -> str:
+	"""Hash file content so a changeset can tell if a file moved on since it was diffed."""
+	return hashlib.sha256(data).hexdigest()
+
+def get_changeset_diffs(paths: List[Path], max_workers: Optional[int] = None) -> Tuple[Dict[Path, bytes], Dict[Path, str], Dict[Path, str]]:
+	"""Diff many files in parallel, returning ({path: diff}, {path: content hash}, {path: error}).
+
+	Each hash is of the content read just before its diff was taken, to pass
+	back to apply_changeset along with the reviewer's responses.
+	"""
+	def snapshot(path):
+		data = path.read_bytes()
+		diff, error = get_git_diff_bytes(path)
+		return path, content_hash(data), diff, error
+
+	diffs, hashes, errors = {}, {}, {}
+	with ThreadPoolExecutor(max_workers) as pool:
+		for path, digest, diff, error in pool.map(snapshot, paths):
+			if error:
+				errors[path] = error
+			else:
+				diffs[path] = diff
+				hashes[path] = digest
+	return diffs, hashes, errors
+
+def _fsync_dir(directory: Path):
+	"""Flush a directory entry so renames inside it survive a crash."""
+	if not hasattr(os, "O_DIRECTORY"):
+		return  # Windows can't open directories; NTFS renames are journaled anyway
+	fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+	try:
+		os.fsync(fd)
+	finally:
+		os.close(fd)
+
+def _write_temp(path: Path, data: bytes) -> Path:
+	"""Write data to a flushed temp file next to path, carrying over path's permissions."""
+	fd, temp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+	temp_path = Path(temp_name)
+	try:
+		with os.fdopen(fd, 'wb') as f:
+			f.write(data)
+			f.flush()
+			os.fsync(f.fileno())
+		shutil.copymode(path, temp_path)
+	except BaseException:
+		temp_path.unlink(missing_ok=True)
+		raise
+	return temp_path
+
+def _merge_all(responses: Dict[Path, str], diffs: Optional[Dict[Path, bytes]], hashes: Optional[Dict[Path, str]], max_workers: Optional[int]) -> Tuple[Dict[Path, bytes], Dict[Path, bytes], Optional[str]]:
+	"""Compute every merge of a changeset in parallel, returning ({path: original}, {path: merged}, error)."""
+	diffs = diffs or {}
+	hashes = hashes or {}
+
+	def merge(path):
+		data = path.read_bytes()
+		digest = content_hash(data)
+		if path in hashes and hashes[path] != digest:
+			return path, data, None, f"{path} changed since it was diffed"
+		diff = diffs.get(path)
+		if diff is None:
+			diff, error = get_git_diff_bytes(path)
+			if error:
+				return path, data, None, error
+		return path, data, apply_changes_bytes(path, diff, responses[path], content=data), None
+
+	originals = {}
+	merged = {}
+	try:
+		with ThreadPoolExecutor(max_workers) as pool:
+			for path, data, result, error in pool.map(merge, responses):
+				if error:
+					return {}, {}, f"Error: {error}"
+				merged[path] = result
+				originals[path] = data
+	except Exception as e:
+		return {}, {}, f"Error: Could not merge changeset: {e}"
+	return originals, merged, None
+
+def apply_changeset(responses: Dict[Path, str], diffs: Optional[Dict[Path, bytes]] = None, hashes: Optional[Dict[Path, str]] = None, max_workers: Optional[int] = None) -> Optional[str]:
+	"""Apply LLM responses to many files as one all-or-nothing transaction, returning an error or None.
+
+	Merges are computed in parallel with apply_changes_bytes (diffing any
+	file missing from diffs). If a file's content no longer matches its
+	entry in hashes nothing is written. Otherwise every merged file is
+	written to a temp file in its own directory, each directory is fsynced
+	once after the renames, and if any rename fails the files already
+	replaced are restored.
+	"""
+	originals, merged, error = _merge_all(responses, diffs, hashes, max_workers)
+	if error:
+		return error
+
+	temp_paths = {}
+	replaced = []
+	try:
+		for path, data in merged.items():
+			if data != originals[path]:
+				temp_paths[path] = _write_temp(path, data)
+		for path, temp_path in temp_paths.items():
+			# Last check that nobody wrote to the file while we were merging
+			if content_hash(path.read_bytes()) != content_hash(originals[path]):
+				raise RuntimeError(f"{path} changed while the changeset was being applied")
+			os.replace(temp_path, path)
+			replaced.append(path)
+		for directory in {path.parent for path in replaced}:
+			_fsync_dir(directory)
+	except Exception as e:
+		for path in replaced:
+			try:
+				os.replace(_write_temp(path, originals[path]), path)
+			except OSError:
+				pass
+		for directory in {path.parent for path in replaced}:
+			_fsync_dir(directory)
+		return f"Error: Changeset rolled back: {e}"
+	finally:
+		for temp_path in temp_paths.values():
+			temp_path.unlink(missing_ok=True)
+	return None
+
+def _summary_of(diff: bytes) -> Optional[re.Match]:
+	"""parse_summary for a bytes diff, decoding only its first line."""
+	return parse_summary(diff[:diff.find(b"\n")].decode("utf-8", "replace")) if diff.startswith(b"@@ ") else None
+
+def _apply_hunks(old: bytes, hunks: List[Dict[str, object]]) -> bytes:
+	"""Apply every hunk of a bytes diff to its old side, giving the new side in the same (index) form."""
+	offsets = line_offsets(old)
+	line_count = len(offsets) - 1
+	parts = []
+	pos = 0
+	for hunk in hunks:
+		if hunk["old_lines"] == 0:
+			# Pure addition: the new lines go after line old_start
+			start = end = offsets[min(hunk["old_start"], line_count)]
+		else:
+			start = offsets[hunk["old_start"] - 1]
+			end = offsets[min(hunk["old_start"] - 1 + hunk["old_lines"], line_count)]
+		parts.append(old[pos:start])
+		parts.extend(hunk["added"])
+		pos = end
+	parts.append(old[pos:])
+	return b"".join(parts)
+
+def _index_mode(file_diff: FileDiff) -> Optional[str]:
+	"""The index entry's mode from a working tree diff's header; the old side is the index."""
+	for line in file_diff.header:
+		fields = line.split()
+		if line.startswith("index ") and len(fields) == 3:
+			return fields[2]
+		if line.startswith(("old mode ", "deleted file mode ")):
+			return fields[-1]
+	return None
+
+def _write_blobs(repo_path: Path, blobs: List[bytes]) -> List[str]:
+	"""Write in-memory blobs to the object database with one 'git fast-import', returning their ids in order.
+
+	'git hash-object --stdin' takes a single object per process, and
+	--stdin-paths needs files, so fast-import is the one git command that
+	writes many blobs from a pipe.
+	"""
+	stream = []
+	for i, data in enumerate(blobs, 1):
+		stream += [b"blob\nmark :%d\ndata %d\n" % (i, len(data)), data, b"\n"]
+	stream += [b"get-mark :%d\n" % i for i in range(1, len(blobs) + 1)]
+	result = subprocess.run(["git", "fast-import", "--quiet"], cwd=repo_path, input=b"".join(stream), capture_output=True, check=False)
+	if result.returncode != 0:
+		raise RuntimeError(f"git fast-import failed: {result.stderr.decode(errors='replace').strip()}")
+	blob_ids = result.stdout.decode().split()
+	if len(blob_ids) != len(blobs):
+		raise RuntimeError(f"git fast-import returned {len(blob_ids)} blobs for {len(blobs)}")
+	return blob_ids
+
+def _hash_objects(repo_path: Path, files: List[str]) -> List[str]:
+	"""Write working files as blobs through git's clean filters with one 'git hash-object', returning their ids in order."""
+	result = subprocess.run(
+		["git", "hash-object", "-w", "--stdin-paths"],
+		cwd=repo_path,
+		input="".join(f"{f}\n" for f in files).encode("utf-8", "surrogateescape"),
+		capture_output=True,
+		check=False
+	)
+	if result.returncode != 0:
+		raise RuntimeError(f"git hash-object failed: {result.stderr.decode(errors='replace').strip()}")
+	blob_ids = result.stdout.decode().split()
+	if len(blob_ids) != len(files):
+		raise RuntimeError(f"git hash-object returned {len(blob_ids)} blobs for {len(files)} files")
+	return blob_ids
+
+def _bytes_diff(file_diff: FileDiff, kind: str) -> bytes:
+	"""The diff get_git_diff_bytes gives for a streamed FileDiff of the working tree."""
+	if kind != TEXT:
+		return summary_diff(file_diff, kind).encode()
+	# parse_diff_stream decodes with surrogateescape, so this gives back git's bytes
+	return file_diff.diff.encode("utf-8", "surrogateescape")
+
+def apply_changes_to_index(responses: Dict[Path, str], diffs: Optional[Dict[Path, bytes]] = None, hashes: Optional[Dict[Path, str]] = None, max_workers: Optional[int] = None) -> Optional[str]:
+	"""Stage the approved hunks of every file in the git index without touching the working tree.
+
+	Like 'git add -p', the approved hunks are applied to each file's index
+	blob, so the staged content stays in the index's form (after clean
+	filters such as autocrlf) and every entry keeps its index mode. diffs
+	are working tree vs index, as from get_changeset_diffs; entries of
+	hashes are checked against the working files.
+
+	The whole changeset takes one 'git diff' stream (for index modes and
+	blob ids, and the diffs not given), one 'git cat-file --batch' for the
+	index blobs, one 'git fast-import' writing the merged blobs from memory
+	and one 'git update-index --index-info'. An accepted summary hunk
+	stages the working file; only if git's clean filters change it is it
+	hashed again with 'git hash-object'. Returns an error or None.
+	"""
+	if not responses:
+		return None
+	repo_path = find_git_repo(next(iter(responses)))
+	if not repo_path:
+		return f"Error: No git repository found for {next(iter(responses))}"
+	diffs = diffs or {}
+	hashes = hashes or {}
+	try:
+		relative_paths = {path: path.relative_to(repo_path).as_posix() for path in responses}
+	except ValueError as e:
+		return f"Error: Changeset spans more than one repository: {e}"
+
+	try:
+		wanted = set(relative_paths.values())
+		streamed = {d.path: d for d in iter_file_diffs(repo_path, None, sorted(wanted)) if d.path in wanted}
+		missing = [p for p in relative_paths.values() if p not in streamed or _index_mode(streamed[p]) is None]
+		if missing:
+			return f"Error: No unstaged changes in the index for: {', '.join(missing)}"
+		# Diffs not given are classified as get_git_diff_bytes would, with one git check-attr
+		given = {relative_paths[path] for path in diffs if path in relative_paths}
+		to_classify = [
+			d for p, d in streamed.items()
+			if p not in given and (d.diff or d.binary) and d.old_blob and d.new_blob
+		]
+		kinds = classify_file_diffs(repo_path, to_classify) if to_classify else {}
+		index_blobs = read_blobs(repo_path, (d.old_blob for d in streamed.values()))
+
+		def merge(path):
+			if path in hashes and hashes[path] != content_hash(path.read_bytes()):
+				raise ValueError(f"{path} changed since it was diffed")
+			file_diff = streamed[relative_paths[path]]
+			diff = diffs[path] if path in diffs else _bytes_diff(file_diff, kinds.get(file_diff.path, TEXT))
+			index_blob = index_blobs.get(file_diff.old_blob, b"" if file_diff.old_blob == NULL_BLOB else None)
+			if index_blob is None:
+				raise ValueError(f"Could not read blob {file_diff.old_blob} of {file_diff.path}")
+			summary = _summary_of(diff)
+			if summary:
+				decision = summary_decision(parse_llm_response(responses[path]))
+				if decision is True:
+					# The working file, expected to hash to the diff's new blob id
+					return path, path.read_bytes(), summary.group(3)
+				if isinstance(decision, list):
+					return path, "\n".join(decision).encode("utf-8", "surrogateescape"), None
+				return path, None, None
+			if not diff:
+				raise ValueError(f"No changes or file not tracked: {file_diff.path}")
+			new_side = _apply_hunks(index_blob, parse_hunks_bytes(diff))
+			data = apply_changes_bytes(path, diff, responses[path], content=new_side)
+			return path, (data if data != index_blob else None), None
+
+		merged = {}  # path: staged bytes
+		expected = {}  # path: blob id an accepted summary's working file should get
+		with ThreadPoolExecutor(max_workers) as pool:
+			for path, data, blob_id in pool.map(merge, responses):
+				if data is not None:
+					merged[path] = data
+				if blob_id:
+					expected[path] = blob_id
+		staged = dict(zip(merged, _write_blobs(repo_path, list(merged.values())))) if merged else {}
+		# Clean filters (autocrlf, LFS, ...) changed these, so stage them the way 'git add' would
+		filtered = [path for path, blob_id in expected.items() if staged[path] != blob_id]
+		if filtered:
+			staged.update(zip(filtered, _hash_objects(repo_path, [relative_paths[p] for p in filtered])))
+	except (subprocess.SubprocessError, OSError, RuntimeError, ValueError) as e:
+		return f"Error: Could not stage changeset: {e}"
+	if not staged:
+		return None
+
+	index_info = "".join(
+		f"{_index_mode(streamed[relative_paths[path]])} {blob_id}\t{relative_paths[path]}\0"
+		for path, blob_id in staged.items()
+	)
+	result = subprocess.run(
+		["git", "update-index", "-z", "--index-info"],
+		cwd=repo_path,
+		input=index_info.encode("utf-8", "surrogateescape"),
+		capture_output=True,
+		check=False
+	)
+	if result.returncode != 0:
+		return f"Error: git update-index failed: {result.stderr.decode(errors='replace').strip()}"
+	return None
+
+def _normalized_hunk_hash(hunk: Dict[str, object]) -> str:
+	"""Hash a hunk's removed and added lines, ignoring trailing whitespace and line endings."""
+	digest = hashlib.sha256()
+	for sign, lines in ((b"-", hunk["removed"]), (b"+", hunk["added"])):
+		for line in lines:
+			digest.update(sign + line.rstrip() + b"\n")
+	return digest.hexdigest()
+
+def dedupe_changeset(diffs: Dict[Path, bytes]) -> List[Dict[str, object]]:
+	"""Group identical hunks across a changeset so each is reviewed once.
+
+	Returns groups in order of first appearance, each {"number": change
+	number for the whole changeset, "content": the hunk's lines,
+	"locations": [(path, change number in that file, header)]}. Hunks match
+	when their lines are equal up to trailing whitespace; summary diffs
+	(binary, generated or huge files) always get a group of their own.
+	"""
+	groups = {}
+	for path, diff in diffs.items():
+		if _summary_of(diff):
+			header, _, body = diff.decode("utf-8", "replace").partition("\n")
+			groups[("summary", path)] = {"content": body.rstrip("\n"), "locations": [(path, "Change #1", header)]}
+			continue
+		for hunk in parse_hunks_bytes(diff):
+			header = format_hunk_header(hunk["old_start"], hunk["old_lines"], hunk["new_start"], hunk["new_lines"])
+			key = _normalized_hunk_hash(hunk)
+			group = groups.get(key)
+			if group is None:
+				content = [b"-" + line.rstrip(b"\r\n") for line in hunk["removed"]]
+				content += [b"+" + line.rstrip(b"\r\n") for line in hunk["added"]]
+				content = [line.decode("utf-8", "replace") for line in content]
+				group = groups[key] = {"content": "\n".join(content), "locations": []}
+			group["locations"].append((path, hunk["number"], header))
+	return [dict(group, number=f"Change #{i + 1}") for i, group in enumerate(groups.values())]
+
+def render_deduped(groups: List[Dict[str, object]], repo_path: Optional[Path] = None) -> str:
+	"""Render deduplicated hunks like add_change_numbers, each followed by the places it occurs."""
+	output = []
+	for group in groups:
+		locations = group["locations"]
+		output += [
+			f"@@ {len(locations)} location{'s' if len(locations) != 1 else ''} @@ ({group['number']})",
+			group["content"],
+			f"@@ End {group['number']} Hunk @@"
+		]
+		for path, _, header in locations:
+			shown = path.relative_to(repo_path).as_posix() if repo_path else str(path)
+			output.append(f"{shown} {header}")
+	return "\n".join(output)
+
+def fan_out_response(llm_response: str, groups: List[Dict[str, object]]) -> Dict[Path, str]:
+	"""Turn one response to render_deduped's output into a response per file.
+
+	Each 'Change #N, ...' line is copied to every location of group N with
+	the change number rewritten, so any decision form carries over as is.
+	Files with no decision get an empty response, which accepts everything.
+	"""
+	by_number = {group["number"]: group for group in groups}
+	responses = {path: [] for group in groups for path, _, _ in group["locations"]}
+	for line in llm_response.strip().splitlines():
+		match = re.match(r'Change #(\d+)(,.*)', line)
+		group = by_number.get(f"Change #{int(match.group(1))}") if match else None
+		if group is None:
+			continue
+		for path, number, _ in group["locations"]:
+			responses[path].append(f"{number}{match.group(2)}")
+	return {path: "\n".join(lines) for path, lines in responses.items()}
+
+def apply_deduped(llm_response: str, groups: List[Dict[str, object]], diffs: Dict[Path, bytes], hashes: Optional[Dict[Path, str]] = None, max_workers: Optional[int] = None) -> Optional[str]:
+	"""Apply one response to a deduplicated changeset with apply_changeset, returning an error or None."""
+	return apply_changeset(fan_out_response(llm_response, groups), diffs, hashes, max_workers)
@@ -0,0 +1,141 @@
+import fnmatch
+import re
+import subprocess
+from pathlib import Path
+from typing import Optional, List, Dict, Iterable
+from assistant_merger.diff_stream import FileDiff
+from assistant_merger.instrumentation import count, stage
+
+TEXT = "text"
+BINARY = "binary"
+GENERATED = "generated"
+HUGE = "huge"
+
+SNIFF_SIZE = 8000  # Same block size git inspects for NUL bytes
+MAX_FILE_SIZE = 1 << 20
+MAX_LINE_LENGTH = 1000
+MAX_DIFF_SIZE = 1 << 20
+
+# Files that are generated often enough that a line by line review is never useful
+GENERATED_PATTERNS = [
+	"*.min.js", "*.min.css", "*.map",
+	"package-lock.json", "yarn.lock", "pnpm-lock.yaml", "poetry.lock",
+	"Pipfile.lock", "Cargo.lock", "composer.lock", "Gemfile.lock", "go.sum",
+]
+_generated_regex = re.compile("|".join(fnmatch.translate(p) for p in GENERATED_PATTERNS))
+
+# Header of the single hunk that stands in for a file's whole diff
+SUMMARY_PATTERN = re.compile(r'^@@ (binary|generated|huge) ([0-9a-f]+)\.\.([0-9a-f]+) @@$')
+
+def sniff(data: bytes, max_line_length: int = MAX_LINE_LENGTH) -> str:
+	"""Classify a file from its first block: NUL bytes mean binary, very long lines mean minified."""
+	if b"\0" in data[:SNIFF_SIZE]:
+		return BINARY
+	start = 0
+	while start < len(data):
+		end = data.find(b"\n", start)
+		if end == -1:
+			# A trailing partial line only counts if it is already too long
+			end = len(data)
+		if end - start > max_line_length:
+			return HUGE
+		start = end + 1
+	return TEXT
+
+def has_attributes_files(repo_path: Path, relative_path: str) -> bool:
+	"""Cheaply check whether any .gitattributes could apply to relative_path."""
+	if (repo_path / ".git" / "info" / "attributes").exists():
+		return True
+	current = (repo_path / relative_path).parent
+	while True:
+		if (current / ".gitattributes").exists():
+			return True
+		if current == repo_path or current == current.parent:
+			return False
+		current = current.parent
+
+def check_attributes(repo_path: Path, relative_paths: Iterable[str]) -> Dict[str, Dict[str, str]]:
+	"""Look up the binary, diff and linguist-generated attributes of many paths with one git process."""
+	relative_paths = list(relative_paths)
+	if not relative_paths:
+		return {}
+	count("subprocesses")
+	with stage("subprocess"):
+		result = subprocess.run(
+			["git", "check-attr", "-z", "--stdin", "binary", "diff", "linguist-generated"],
+			cwd=repo_path,
+			input="".join(f"{p}\0" for p in relative_paths).encode("utf-8", "surrogateescape"),
+			capture_output=True,
+			check=False
+		)
+	attributes = {p: {} for p in relative_paths}
+	fields = result.stdout.decode("utf-8", "surrogateescape").split("\0")
+	for i in range(0, len(fields) - 2, 3):
+		path, name, value = fields[i:i + 3]
+		if value != "unspecified":
+			attributes.setdefault(path, {})[name] = value
+	return attributes
+
+def classify(file_path: Optional[Path], relative_path: str, attributes: Optional[Dict[str, str]] = None, diff_size: int = 0,
+		max_size: int = MAX_FILE_SIZE, max_line_length: int = MAX_LINE_LENGTH, max_diff_size: int = MAX_DIFF_SIZE) -> str:
+	"""Decide whether a file should get a full line review or a single summary hunk.
+
+	file_path is the on-disk file to sniff, or None when the reviewed content
+	isn't in the working tree (e.g. --cached or commit range diffs).
+	"""
+	attributes = attributes or {}
+	if attributes.get("binary") == "set" or attributes.get("diff") == "unset":
+		return BINARY
+	if attributes.get("linguist-generated") in ("set", "true"):
+		return GENERATED
+	if _generated_regex.match(Path(relative_path).name):
+		return GENERATED
+	if diff_size > max_diff_size:
+		return HUGE
+	if file_path is not None:
+		try:
+			if file_path.stat().st_size > max_size:
+				return HUGE
+			with open(file_path, 'rb') as f:
+				return sniff(f.read(SNIFF_SIZE), max_line_length)
+		except OSError:
+			pass
+	return TEXT
+
+def classify_file_diff(repo_path: Path, file_diff: FileDiff, working_tree: bool = True) -> str:
+	"""Classify a single file's diff, only asking git for attributes if any could apply."""
+	if file_diff.binary:
+		return BINARY
+	if file_diff.oversized:
+		return HUGE
+	attributes = None
+	if has_attributes_files(repo_path, file_diff.path):
+		attributes = check_attributes(repo_path, [file_diff.path]).get(file_diff.path)
+	return classify(repo_path / file_diff.path if working_tree else None, file_diff.path, attributes, file_diff.size)
+
+def classify_file_diffs(repo_path: Path, file_diffs: List[FileDiff], working_tree: bool = True) -> Dict[str, str]:
+	"""Classify every FileDiff of a changeset, using one git check-attr for all of them."""
+	attributes = check_attributes(repo_path, (d.path for d in file_diffs if not d.binary))
+	kinds = {}
+	for file_diff in file_diffs:
+		if file_diff.binary:
+			kinds[file_diff.path] = BINARY
+		elif file_diff.oversized:
+			kinds[file_diff.path] = HUGE
+		else:
+			kinds[file_diff.path] = classify(
+				repo_path / file_diff.path if working_tree else None,
+				file_diff.path,
+				attributes.get(file_diff.path),
+				file_diff.size
+			)
+	return kinds
+
+def summary_diff(file_diff: FileDiff, kind: str) -> str:
+	"""Build a diff holding one summary hunk, to be accepted or rejected as a whole."""
+	description = f"{file_diff.path}: binary file changed" if kind == BINARY else file_diff.summary()
+	return f"@@ {kind} {file_diff.old_blob}..{file_diff.new_blob} @@\n~ {description}\n"
+
+def parse_summary(diff: str) -> Optional[re.Match]:
+	"""Return the summary hunk header match if diff is a summary diff."""
+	return SUMMARY_PATTERN.match(diff.split("\n", 1)[0])
@@ -0,0 +1,287 @@
+import time
+import tempfile
+import subprocess
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, List, Dict, Iterator, Iterable, Union
+from assistant_merger import instrumentation
+
+NULL_BLOB = "0" * 40
+READ_CHUNK_SIZE = 1 << 16
+
+class DiffTooLargeError(ValueError):
+	"""Raised when a streamed diff exceeds a size cap with on_oversize='abort'."""
+
+class InvalidTargetError(ValueError):
+	"""Raised for a diff target git would read as an option, e.g. '--output=file'."""
+
+class GitCommandError(subprocess.SubprocessError):
+	"""Raised when a streamed git command exits with an error, carrying its stderr."""
+
+@dataclass
+class FileDiff:
+	"""A single file's portion of a (possibly multi-file, multi-commit) git diff stream."""
+	path: str
+	old_path: Optional[str] = None
+	commit: Optional[str] = None
+	old_blob: Optional[str] = None
+	new_blob: Optional[str] = None
+	binary: bool = False
+	header: List[str] = field(default_factory=list)
+	diff: str = ""
+	added: int = 0
+	removed: int = 0
+	size: int = 0
+	oversized: bool = False
+
+	def summary(self) -> str:
+		"""One line description of the change, used in place of oversized hunks."""
+		return f"{self.path}: +{self.added} -{self.removed} lines, {self.size} bytes of diff"
+
+def is_range(target: Optional[str]) -> bool:
+	"""Return True if target is a commit range like 'a..b' or 'a...b'."""
+	return target is not None and ".." in target
+
+def is_working_tree(target: Optional[str]) -> bool:
+	"""Return True if target's new side is the working tree: no target, or a single commit."""
+	return target not in ("--cached", "--staged") and not is_range(target)
+
+def diff_command(target: Optional[str] = None, per_commit: bool = False) -> List[str]:
+	"""Build the git command producing a --unified=0 diff stream for target.
+
+	target may be None (working tree vs index), '--cached' (index vs HEAD),
+	a single commit (commit vs working tree) or a range 'a..b'. With per_commit,
+	a range is expanded to one diff per commit using a single 'git log -p'.
+	Any other target starting with '-' raises InvalidTargetError.
+	"""
+	if target is not None and target.startswith("-") and target not in ("--cached", "--staged"):
+		raise InvalidTargetError(f"Invalid diff target: {target}")
+	base = ["git", "-c", "core.quotepath=off"]
+	if per_commit and is_range(target):
+		return base + ["log", "-p", "--reverse", "--no-color", "--full-index", "--unified=0", "--format=commit %H", target]
+	args = base + ["diff", "--no-color", "--full-index", "--unified=0"]
+	if target in ("--cached", "--staged"):
+		args.append("--cached")
+	elif target:
+		args.append(target)
+	return args
+
+def _unquote_path(path: str) -> str:
+	"""Undo git's C-style quoting of a path, if present."""
+	if len(path) < 2 or path[0] != '"' or path[-1] != '"':
+		return path
+	raw = path[1:-1].encode("latin-1", "backslashreplace").decode("unicode_escape")
+	return raw.encode("latin-1").decode("utf-8", "surrogateescape")
+
+def _strip_prefix(path: str) -> Optional[str]:
+	"""Strip the a/ or b/ prefix from a ---/+++ path, returning None for /dev/null."""
+	path = _unquote_path(path.rstrip("\t"))
+	if path == "/dev/null":
+		return None
+	if path[:2] in ("a/", "b/"):
+		return path[2:]
+	return path
+
+def _paths_from_git_line(line: str) -> List[Optional[str]]:
+	"""Best effort old/new paths from a 'diff --git a/x b/y' line."""
+	rest = line[len("diff --git "):]
+	if rest.startswith('"'):
+		end = rest.index('"', 1)
+		while rest[end - 1] == "\\":
+			end = rest.index('"', end + 1)
+		old, new = rest[:end + 1], rest[end + 2:]
+	else:
+		# Unquoted paths can't be split unambiguously; assume both sides are equal length
+		half = (len(rest) - 1) // 2
+		old, new = rest[:half], rest[half + 1:]
+	return [_strip_prefix(old), _strip_prefix(new)]
+
+def parse_diff_stream(lines: Iterable[Union[str, bytes]], max_file_bytes: Optional[int] = None, max_total_bytes: Optional[int] = None, on_oversize: str = "summarize") -> Iterator[FileDiff]:
+	"""Incrementally split a multi-file git diff/log -p stream into FileDiffs.
+
+	Each yielded FileDiff's diff holds only the hunks (starting at the first
+	'@@' line), matching what get_git_diff returns for a single file. Lines may
+	be bytes, in which case they are decoded one at a time.
+
+	Once a file's hunks exceed max_file_bytes (or the whole stream exceeds
+	max_total_bytes) its lines stop being kept: with on_oversize='summarize'
+	the FileDiff is yielded with oversized set and only its counts filled in,
+	with on_oversize='abort' DiffTooLargeError is raised instead.
+	"""
+	if on_oversize not in ("summarize", "abort"):
+		raise ValueError(f"Unknown on_oversize mode: {on_oversize}")
+	commit = None
+	current = None
+	body = []
+	in_hunks = False
+	total = 0
+
+	def finish():
+		current.diff = "\n".join(body) + ("\n" if body else "")
+		return current
+
+	def oversize(reason):
+		if on_oversize == "abort":
+			raise DiffTooLargeError(f"Diff for {current.path} exceeds {reason}")
+		current.oversized = True
+		body.clear()
+
+	for line in lines:
+		if isinstance(line, bytes):
+			size = len(line)
+			line = line.decode("utf-8", "surrogateescape")
+		else:
+			size = len(line)
+		total += size
+		line = line.rstrip("\n")
+		# Hunk body lines always start with ' ', '+', '-' or '\\', so these can't collide
+		if line.startswith("commit "):
+			if current is not None:
+				yield finish()
+				current, body, in_hunks = None, [], False
+			commit = line[len("commit "):].strip()
+			continue
+		if line.startswith("diff --git "):
+			if current is not None:
+				yield finish()
+			old, new = _paths_from_git_line(line)
+			current = FileDiff(path=new or old, old_path=old, commit=commit, header=[line])
+			body, in_hunks = [], False
+			continue
+		if current is None:
+			continue
+		if in_hunks:
+			if not line:
+				continue
+			current.size += size
+			if line[0] == "+":
+				current.added += 1
+			elif line[0] == "-":
+				current.removed += 1
+			if current.oversized:
+				continue
+			if max_file_bytes is not None and current.size > max_file_bytes:
+				oversize(f"max_file_bytes={max_file_bytes}")
+			elif max_total_bytes is not None and total > max_total_bytes:
+				oversize(f"max_total_bytes={max_total_bytes}")
+			else:
+				body.append(line)
+		elif line.startswith("@@"):
+			in_hunks = True
+			current.size += size
+			body.append(line)
+		else:
+			current.header.append(line)
+			if line.startswith("index "):
+				blobs = line.split()[1].split("..")
+				if len(blobs) == 2:
+					current.old_blob, current.new_blob = blobs
+			elif line.startswith("--- "):
+				current.old_path = _strip_prefix(line[4:])
+			elif line.startswith("+++ "):
+				new = _strip_prefix(line[4:])
+				if new is not None:
+					current.path = new
+			elif line.startswith("rename to "):
+				current.path = _unquote_path(line[len("rename to "):])
+			elif line.startswith("Binary files "):
+				current.binary = True
+	if current is not None:
+		yield finish()
+
+def stream_lines(args: List[str], cwd: Path) -> Iterator[bytes]:
+	"""Run a command and yield its stdout line by line as raw bytes without buffering all of it.
+
+	Raises GitCommandError with the command's stderr if it exits with an
+	error after its output was read to the end.
+	"""
+	metrics = instrumentation.current()
+	started = time.perf_counter()
+	# A file rather than a pipe, so a chatty stderr can't block git while we read stdout
+	stderr = tempfile.TemporaryFile()
+	proc = subprocess.Popen(
+		args,
+		cwd=cwd,
+		stdout=subprocess.PIPE,
+		stderr=stderr,
+		bufsize=READ_CHUNK_SIZE
+	)
+	finished = False
+	try:
+		if metrics is None:
+			yield from proc.stdout
+		else:
+			bytes_read = 0
+			try:
+				for line in proc.stdout:
+					bytes_read += len(line)
+					yield line
+			finally:
+				metrics.count("bytes_read", bytes_read)
+		finished = True
+	finally:
+		# Stopping early (e.g. on abort) must not wait for git to finish writing
+		if proc.poll() is None and not finished:
+			proc.kill()
+		proc.stdout.close()
+		proc.wait()
+		if metrics is not None:
+			metrics.count("subprocesses")
+			metrics.add_time("subprocess", time.perf_counter() - started)
+		stderr.seek(0)
+		message = stderr.read().decode("utf-8", "replace").strip()
+		stderr.close()
+	if finished and proc.returncode != 0:
+		raise GitCommandError(message or f"{args[0]} exited with status {proc.returncode}")
+
+def iter_file_diffs(repo_path: Path, target: Optional[str] = None, paths: Optional[List[str]] = None, per_commit: bool = False, max_file_bytes: Optional[int] = None, max_total_bytes: Optional[int] = None, on_oversize: str = "summarize") -> Iterator[FileDiff]:
+	"""Stream FileDiffs for every file (and commit, with per_commit) of target from one git process.
+
+	The size caps behave as in parse_diff_stream.
+	"""
+	args = diff_command(target, per_commit)
+	args.append("--")
+	if paths:
+		args.extend(str(p) for p in paths)
+	yield from parse_diff_stream(stream_lines(args, repo_path), max_file_bytes, max_total_bytes, on_oversize)
+
+def read_blobs(repo_path: Path, blob_ids: Iterable[str]) -> Dict[str, bytes]:
+	"""Read many blobs with a single 'git cat-file --batch' process, returning {blob_id: bytes}."""
+	ids = [b for b in dict.fromkeys(blob_ids) if b and b != NULL_BLOB]
+	if not ids:
+		return {}
+	metrics = instrumentation.current()
+	started = time.perf_counter()
+	proc = subprocess.Popen(
+		["git", "cat-file", "--batch"],
+		cwd=repo_path,
+		stdin=subprocess.PIPE,
+		stdout=subprocess.PIPE,
+		stderr=subprocess.DEVNULL
+	)
+	# Feed requests from a thread so large outputs can't deadlock against our reads
+	def feed():
+		try:
+			proc.stdin.write("".join(f"{b}\n" for b in ids).encode())
+		finally:
+			proc.stdin.close()
+	feeder = threading.Thread(target=feed, daemon=True)
+	feeder.start()
+	blobs = {}
+	try:
+		for blob_id in ids:
+			info = proc.stdout.readline().split()
+			if len(info) < 3 or info[1] != b"blob":
+				continue
+			blobs[blob_id] = proc.stdout.read(int(info[2]))
+			proc.stdout.read(1)  # Trailing newline
+	finally:
+		feeder.join()
+		proc.stdout.close()
+		proc.wait()
+		if metrics is not None:
+			metrics.count("subprocesses")
+			metrics.count("bytes_read", sum(len(b) for b in blobs.values()))
+			metrics.add_time("subprocess", time.perf_counter() - started)
+	return blobs
@@ -1,9 +1,21 @@
 import os
 import subprocess
 import re
+from difflib import SequenceMatcher
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, Tuple, List, Dict
+from typing import Optional, Tuple, List, Dict, Iterable, Iterator, Union, FrozenSet
+from assistant_merger.diff_stream import FileDiff, DiffTooLargeError, InvalidTargetError, NULL_BLOB, is_working_tree, iter_file_diffs, read_blobs
+from assistant_merger.word_diff import word_diff_hunk
+from assistant_merger.instrumentation import count, timed
+from assistant_merger.profiling import profiled
+from assistant_merger.classify import TEXT, BINARY, HUGE, SUMMARY_PATTERN, classify_file_diff, classify_file_diffs, summary_diff, parse_summary
 
+# Regex to match hunk headers like @@ -old,new +new,lines @@ or @@ -old +new,lines @@
+HUNK_PATTERN = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@(?: .*)?$')
+HUNK_HEADER_PATTERN = re.compile(r'^(@@ .* @@)(?: .*)?$')
+
+@timed("find_git_repo")
 def find_git_repo(file_path: Path) -> Optional[Path]:
 	"""Find the git repository root for a given file path."""
 	current = file_path.parent
@@ -13,93 +25,280 @@ def find_git_repo(file_path: Path) -> Optional[Path]:
 		current = current.parent
 	return None
 
-def get_git_diff(file_path: Path) -> Tuple[str, Optional[str]]:
-	"""Get the git diff for a specific file."""
+@profiled("get_git_diff")
+@timed("git_diff")
+def get_git_diff(file_path: Path, target: Optional[str] = None, max_file_bytes: Optional[int] = None, on_oversize: str = "summarize", classify_files: bool = True) -> Tuple[str, Optional[str]]:
+	"""Get the git diff for a specific file.
+
+	target selects what to diff against: None for the working tree vs the index,
+	'--cached' for the index vs HEAD, a commit, or a range like 'a..b'.
+	The diff is streamed from git rather than buffered. With classify_files,
+	binary, generated and huge files (including diffs over max_file_bytes)
+	get a single summary hunk to accept or reject as a whole; otherwise an
+	oversized diff returns an error summarizing the change.
+	"""
 	repo_path = find_git_repo(file_path)
 	if not repo_path:
 		return "", f"No git repository found for {file_path}"
 	try:
 		relative_path = file_path.relative_to(repo_path)
-		result = subprocess.run(
-			["git", "diff", "--unified=0", str(relative_path)],
-			cwd=repo_path,
-			capture_output=True,
-			text=True,
-			check=False
-		)
-		if result.returncode == 0 and result.stdout:
-			s = result.stdout.split("\n")
-			return "\n".join(s[4:]), None
+		file_diffs = iter_file_diffs(repo_path, target, [relative_path.as_posix()], max_file_bytes=max_file_bytes, on_oversize=on_oversize)
+		for file_diff in file_diffs:
+			# A mode-only change has no hunks or blob ids to summarize
+			has_change = file_diff.diff or file_diff.binary or file_diff.oversized
+			if classify_files and has_change and file_diff.old_blob and file_diff.new_blob:
+				kind = classify_file_diff(repo_path, file_diff, is_working_tree(target))
+				if kind != TEXT:
+					return summary_diff(file_diff, kind), None
+			if file_diff.oversized:
+				return "", f"Diff too large: {file_diff.summary()}"
+			if file_diff.diff:
+				return file_diff.diff, None
 		return "", f"No changes or file not tracked: {relative_path}"
-	except subprocess.SubprocessError as e:
+	except DiffTooLargeError as e:
+		return "", f"Diff too large: {e}"
+	except InvalidTargetError as e:
+		return "", str(e)
+	except (subprocess.SubprocessError, OSError) as e:
 		return "", f"Error running git diff: {e}"
 	except ValueError as e:
 		return "", f"Invalid file path relative to repo: {e}"
 
-def add_change_numbers(diff: str, file_path: Path, add_line_numbers: bool = False) -> Tuple[str, List[Dict[str, str]]]:
-	"""Add change numbers to diff hunks, include post-hunk content, and return modified diff with hunk metadata."""
-	if not diff:
-		return "", []
+def get_git_diffs(repo_path: Path, relative_paths: List[str], target: Optional[str] = None, classify_files: bool = True) -> Dict[str, Tuple[str, Optional[str]]]:
+	"""get_git_diff for many files of one repository, as {relative path: (diff, error)}.
 
-	# Read current file content
+	All the files are diffed by one git process and classified with one
+	git check-attr, instead of a process or two per file.
+	"""
+	wanted = set(relative_paths)
 	try:
-		with open(file_path, 'r') as f:
-			file_lines = f.read().splitlines()
-	except Exception as e:
-		return "", [{"error": f"Could not read file: {e}"}]
+		file_diffs = [d for d in iter_file_diffs(repo_path, target, sorted(wanted)) if d.path in wanted]
+		classifiable = [d for d in file_diffs if classify_files and (d.diff or d.binary) and d.old_blob and d.new_blob]
+		kinds = classify_file_diffs(repo_path, classifiable, is_working_tree(target)) if classifiable else {}
+	except InvalidTargetError as e:
+		return {p: ("", str(e)) for p in relative_paths}
+	except (subprocess.SubprocessError, OSError) as e:
+		return {p: ("", f"Error running git diff: {e}") for p in relative_paths}
+	results = {}
+	for file_diff in file_diffs:
+		kind = kinds.get(file_diff.path, TEXT)
+		if kind != TEXT:
+			results[file_diff.path] = (summary_diff(file_diff, kind), None)
+		elif file_diff.diff:
+			results[file_diff.path] = (file_diff.diff, None)
+	for relative_path in relative_paths:
+		results.setdefault(relative_path, ("", f"No changes or file not tracked: {relative_path}"))
+	return results
 
-	lines = diff.splitlines()
-	modified_lines = []
-	change_count = 0
-	hunks = []
-	current_hunk_lines = []
-	hunk_start = None
+def read_new_contents(repo_path: Path, file_diffs: List[FileDiff], target: Optional[str] = None) -> Dict[str, str]:
+	"""Read the new-side content of each FileDiff, keyed by path, for use with add_change_numbers/apply_changes.
 
-	# Regex to match hunk headers like @@ -old,new +new,lines @@ or @@ -old +new,lines @@
-	hunk_pattern = re.compile(r'^@@ -(\d+)(?:,\d+)? \+(\d+)(?:,(\d+))? @@(?: .*)?$')
-	hunk_pattern2 = re.compile(r'^(@@ .* @@)(?: .*)?$')
+	When the new side is the working tree (no target or a single commit)
+	files are read from disk; otherwise blobs are read through a single
+	batched git process. A deleted file reads as empty, and a blob git
+	can't find raises ValueError.
+	"""
+	if is_working_tree(target):
+		contents = {}
+		for file_diff in file_diffs:
+			if file_diff.new_blob == NULL_BLOB and not (repo_path / file_diff.path).exists():
+				contents[file_diff.path] = ""
+				continue
+			with open(repo_path / file_diff.path, 'r', errors='surrogateescape') as f:
+				contents[file_diff.path] = f.read()
+		return contents
+	blobs = read_blobs(repo_path, (d.new_blob for d in file_diffs))
+	contents = {}
+	for file_diff in file_diffs:
+		if file_diff.new_blob == NULL_BLOB:
+			contents[file_diff.path] = ""
+		elif file_diff.new_blob in blobs:
+			contents[file_diff.path] = blobs[file_diff.new_blob].decode("utf-8", "surrogateescape")
+		else:
+			raise ValueError(f"Could not read blob {file_diff.new_blob} of {file_diff.path}")
+	return contents
 
+def parse_hunk_header(header: str) -> Optional[Tuple[int, int, int, int]]:
+	"""Parse a hunk header into (old_start, old_lines, new_start, new_lines)."""
+	hunk_match = HUNK_PATTERN.match(header)
+	if not hunk_match:
+		return None
+	old_start, old_lines, new_start, new_lines = hunk_match.groups()
+	return (
+		int(old_start),
+		int(old_lines) if old_lines is not None else 1,
+		int(new_start),
+		int(new_lines) if new_lines is not None else 1
+	)
+
+def format_hunk_header(old_start: int, old_lines: int, new_start: int, new_lines: int) -> str:
+	"""Build a hunk header the way git does, omitting counts of 1."""
+	old = f"{old_start}" if old_lines == 1 else f"{old_start},{old_lines}"
+	new = f"{new_start}" if new_lines == 1 else f"{new_start},{new_lines}"
+	return f"@@ -{old} +{new} @@"
+
+def parse_hunks(lines: Iterable[str], split: bool = False) -> Iterator[Dict[str, str]]:
+	"""Incrementally parse diff lines into numbered hunks, yielding each as soon as it ends.
+
+	split breaks each hunk into independent sub-hunks (see split_hunk) and
+	numbers those instead.
+	"""
+	if split:
+		yield from split_hunks(parse_hunks(lines))
+		return
+	change_count = 0
+	hunk_start = None
+	current_hunk_lines = []
 	for line in lines:
-		hunk_match = hunk_pattern.match(line)
-		if hunk_match:
+		if HUNK_PATTERN.match(line) or SUMMARY_PATTERN.match(line):
 			if current_hunk_lines and hunk_start:
-				hunks.append({
+				count("hunks_parsed")
+				yield {
 					"number": f"Change #{change_count}",
 					"header": hunk_start,
 					"content": "\n".join(current_hunk_lines)
-				})
-				current_hunk_lines = []
+				}
+			current_hunk_lines = []
 			change_count += 1
-			
-			# Extract new file start line and number of lines
-			new_start = int(hunk_match.group(2))
-			new_lines = int(hunk_match.group(3)) if hunk_match.group(3) else 1
-			
 			# Reconstruct clean header without trailing text
-			hunk_start = hunk_pattern2.match(line).group(1)
-			modified_lines.append(f"{hunk_start} (Change #{change_count})")
-		else:
+			hunk_start = HUNK_HEADER_PATTERN.match(line).group(1)
+		elif hunk_start:
 			current_hunk_lines.append(line)
-			modified_lines.append(line)
-
 	if current_hunk_lines and hunk_start:
-		hunks.append({
+		count("hunks_parsed")
+		yield {
 			"number": f"Change #{change_count}",
 			"header": hunk_start,
 			"content": "\n".join(current_hunk_lines)
-		})
+		}
+
+SPLIT_MAX_LINES = 2000  # Bigger hunks are left whole rather than diffed line against line
+
+def _indent(line: str) -> int:
+	return len(line) - len(line.lstrip())
+
+def _block_boundaries(lines: List[str]) -> List[int]:
+	"""Indexes where a one-sided block can be cut: after a blank line, before a line at the block's outermost indent."""
+	indents = [_indent(line) for line in lines if line.strip()]
+	if not indents:
+		return []
+	outer = min(indents)
+	return [
+		i for i in range(1, len(lines))
+		if not lines[i - 1].strip() and lines[i].strip() and _indent(lines[i]) <= outer
+	]
+
+def split_hunk(hunk: Dict[str, str]) -> List[Dict[str, str]]:
+	"""Break a --unified=0 hunk into independent sub-hunks, without change numbers.
+
+	Lines the removed and added sides have in common (found with
+	SequenceMatcher) become unchanged anchors between sub-hunks, and pure
+	additions or removals are cut again at blank lines followed by a line at
+	the block's outermost indent. Accepting or rejecting every sub-hunk gives
+	the same file as the whole hunk. Hunks with context lines, no-newline
+	markers or more than SPLIT_MAX_LINES lines come back whole.
+	"""
+	parsed = parse_hunk_header(hunk["header"])
+	body = hunk["content"].splitlines()
+	if not parsed or len(body) > SPLIT_MAX_LINES or any(not line or line[0] not in "-+" for line in body):
+		return [hunk]
+	old_start, old_lines, new_start, new_lines = parsed
+	old_first = old_start if old_lines else old_start + 1
+	new_first = new_start if new_lines else new_start + 1
+	removed = [line[1:] for line in body if line[0] == "-"]
+	added = [line[1:] for line in body if line[0] == "+"]
+
+	segments = []
+	for tag, i1, i2, j1, j2 in SequenceMatcher(None, removed, added, autojunk=False).get_opcodes():
+		if tag == "equal":
+			continue
+		if i1 == i2 or j1 == j2:
+			# One-sided, so it can be cut at block boundaries without pairing lines up
+			lines = removed[i1:i2] if j1 == j2 else added[j1:j2]
+			cuts = [0] + _block_boundaries(lines) + [len(lines)]
+			for a, b in zip(cuts, cuts[1:]):
+				segments.append((i1 + a, i1 + b, j1, j1) if j1 == j2 else (i1, i1, j1 + a, j1 + b))
+		else:
+			segments.append((i1, i2, j1, j2))
+	if len(segments) <= 1:
+		return [hunk]
+
+	sub_hunks = []
+	for i1, i2, j1, j2 in segments:
+		header = format_hunk_header(
+			old_first + i1 if i2 > i1 else old_first + i1 - 1, i2 - i1,
+			new_first + j1 if j2 > j1 else new_first + j1 - 1, j2 - j1
+		)
+		content = [f"-{line}" for line in removed[i1:i2]] + [f"+{line}" for line in added[j1:j2]]
+		sub_hunks.append({"header": header, "content": "\n".join(content)})
+	return sub_hunks
+
+def split_hunks(hunks: Iterable[Dict[str, str]]) -> Iterator[Dict[str, str]]:
+	"""Split every hunk with split_hunk and renumber the results in order."""
+	change_count = 0
+	for hunk in hunks:
+		for sub_hunk in split_hunk(hunk):
+			change_count += 1
+			yield dict(sub_hunk, number=f"Change #{change_count}")
+
+def number_hunk_lines(content: str) -> str:
+	"""Number a hunk's body lines from 1, as PartialDecision ranges refer to them."""
+	numbered = []
+	line_number = 0
+	for line in content.split("\n"):
+		if not line or line[0] == '\\':
+			numbered.append(line)
+			continue
+		line_number += 1
+		numbered.append(f"{line[0]}{line_number:4d} {line[1:]}")
+	return "\n".join(numbered)
+
+@profiled("add_change_numbers")
+@timed("render")
+def add_change_numbers(diff: str, file_path: Path, add_line_numbers: bool = False, content: Optional[str] = None, add_hunk_line_numbers: bool = False, split: bool = False, word_diff: bool = False) -> Tuple[str, List[Dict[str, str]]]:
+	"""Add change numbers to diff hunks, include post-hunk content, and return modified diff with hunk metadata.
+
+	content overrides reading file_path, e.g. with the new side of a --cached or commit diff.
+	add_hunk_line_numbers numbers each hunk's body lines so a response can
+	accept or reject line ranges of a hunk (see PartialDecision).
+	split numbers split_hunk's sub-hunks instead of git's hunks; pass the
+	same split to apply_changes.
+	word_diff shows paired -/+ lines as one '*' line of '{-old-}{+new+}'
+	edits (see word_diff_hunk). It only changes the rendering, and is
+	ignored with add_hunk_line_numbers since those count the plain lines.
+	"""
+	if not diff:
+		return "", []
+
+	# Summary diffs stand in for the whole file, so there's no file content to show
+	if parse_summary(diff):
+		hunks = list(parse_hunks(diff.splitlines()))
+		return "\n".join(
+			f"{hunk['header']} ({hunk['number']})\n{hunk['content']}\n@@ End {hunk['number']} Hunk @@"
+			for hunk in hunks
+		), hunks
+
+	# Read current file content
+	if content is not None:
+		file_lines = content.splitlines()
+	else:
+		try:
+			with open(file_path, 'r') as f:
+				file_lines = f.read().splitlines()
+		except Exception as e:
+			return "", [{"error": f"Could not read file: {e}"}]
+
+	hunks = list(parse_hunks(diff.splitlines(), split))
 
 	# Process hunks in reverse to get post-hunk content
 	result_lines = []
 	prev_end = len(file_lines)  # Start from end of file
 	for hunk in reversed(hunks):
 		# Extract new file start and lines from header
-		header = hunk["header"]
-		hunk_match = hunk_pattern.match(header)
-		if not hunk_match:
+		parsed = parse_hunk_header(hunk["header"])
+		if not parsed:
 			continue
-		new_start = int(hunk_match.group(2))
-		new_lines = int(hunk_match.group(3)) if hunk_match.group(3) else 1
+		_, _, new_start, new_lines = parsed
 		
 		if new_lines == 0:
 			post_hunk_lines = file_lines[new_start:prev_end]
@@ -111,12 +310,13 @@ def add_change_numbers(diff: str, file_path: Path, add_line_numbers: bool = Fals
 			post_hunk_lines = file_lines[start_idx:prev_end]
 			if add_line_numbers:
 				post_hunk_lines = [f"{start_idx + i + 1:4d} {line}" for i, line in enumerate(post_hunk_lines)]
-			prev_end = new_start - (1 if len(post_hunk_lines)>0 else 0)
+			# Split hunks can sit back to back, so don't repeat this hunk's first line
+			prev_end = new_start - (1 if len(post_hunk_lines)>0 or split else 0)
 		
 		# Build hunk output
 		hunk_output = [
 			f"{hunk['header']} ({hunk['number']})",
-			hunk['content'],
+			number_hunk_lines(hunk['content']) if add_hunk_line_numbers else word_diff_hunk(hunk['content']) if word_diff else hunk['content'],
 			f"@@ End {hunk['number']} Hunk @@"
 		] + post_hunk_lines
 		# Prepend to result (building in reverse)
@@ -126,19 +326,63 @@ def add_change_numbers(diff: str, file_path: Path, add_line_numbers: bool = Fals
 		if add_line_numbers:
 			first_lines = [f"{i + 1:4d} {line}" for i, line in enumerate(first_lines)]
 		result_lines = first_lines + result_lines
+	count("lines_rendered", len(result_lines))
 	return "\n".join(result_lines), hunks
 
-def apply_changes(file_path: Path, diff: str, llm_response: str) -> str:
-	"""Apply or revert changes based on LLM response and return merged file content."""
-	try:
-		with open(file_path, 'r') as f:
-			file_lines = f.read().split("\n")
-	except Exception as e:
-		return f"Error: Could not read file: {e}"
+@dataclass(frozen=True)
+class PartialDecision:
+	"""Line-range decision for one hunk, e.g. 'Change #7, Yes except 12-15'.
+
+	Lines are numbered from 1 over the hunk's body as rendered between its
+	header and End marker; a rejected '+' line is dropped and a rejected '-'
+	line is put back.
+	"""
+	lines: FrozenSet[int]
+	accept_listed: bool = False  # True for 'No except ...' / 'lines ... Yes'
+
+	def rejects(self, line_number: int) -> bool:
+		return (line_number in self.lines) != self.accept_listed
+
+def _parse_line_ranges(ranges: str) -> Optional[FrozenSet[int]]:
+	"""Parse '3-9, 12' into the set of 1-based line numbers it names, or None if it is malformed.
 
-	# Parse LLM response
+	A reversed range like '15-12' means the same lines as '12-15'.
+	"""
+	lines = set()
+	for part in ranges.split(","):
+		part = part.strip()
+		if not part:
+			continue
+		match = re.fullmatch(r'(\d+)\s*(?:-\s*(\d+))?', part)
+		if not match:
+			return None
+		start, end = sorted((int(match.group(1)), int(match.group(2) or match.group(1))))
+		lines.update(range(start, end + 1))
+	return frozenset(lines) if lines else None
+
+PARTIAL_EXCEPT_PATTERN = re.compile(r'Change #(\d+),\s*(Yes|No)\s+except\s+(?:lines?\s+)?([\d,\s-]+)', re.IGNORECASE)
+PARTIAL_LINES_PATTERN = re.compile(r'Change #(\d+),\s*lines?\s+([\d,\s-]+?)\s*(Yes|No)\b', re.IGNORECASE)
+
+@timed("parse_response")
+def parse_llm_response(llm_response: str) -> Dict[str, Union[bool, List[str], PartialDecision]]:
+	"""Parse LLM response lines into {change number: True/False, replacement lines or a PartialDecision}."""
 	approvals = {}
 	for line in llm_response.strip().splitlines():
+		# Malformed ranges leave the line ignored, rather than read as a plain Yes or No
+		match = PARTIAL_EXCEPT_PATTERN.match(line)
+		if match:
+			# 'Yes except' rejects the listed lines, 'No except' accepts only them
+			lines = _parse_line_ranges(match.group(3))
+			if lines is not None:
+				approvals[f"Change #{int(match.group(1))}"] = PartialDecision(lines, match.group(2).lower() == "no")
+			continue
+		match = PARTIAL_LINES_PATTERN.match(line)
+		if match:
+			# 'lines 3-9 No' rejects the listed lines, 'lines 3-9 Yes' accepts only them
+			lines = _parse_line_ranges(match.group(2))
+			if lines is not None:
+				approvals[f"Change #{int(match.group(1))}"] = PartialDecision(lines, match.group(3).lower() == "yes")
+			continue
 		match = re.match(r'Change #(\d+),\s*(Yes|No)', line, re.IGNORECASE)
 		if match:
 			change_num = int(match.group(1))
@@ -150,14 +394,89 @@ def apply_changes(file_path: Path, diff: str, llm_response: str) -> str:
 				change_num = int(match.group(1))
 				replacement = match.group(2).split('\\n')
 				approvals[f"Change #{change_num}"] = replacement
+	return approvals
 
-	# Get hunks from diff
-	_, hunks = add_change_numbers(diff, file_path)
-	hunk_pattern = re.compile(r'^@@ -(\d+)(?:,\d+)? \+(\d+)(?:,(\d+))? @@(?: .*)?$')
+def summary_decision(approvals: Dict[str, Union[bool, List[str], PartialDecision]]) -> Union[bool, List[str]]:
+	"""The decision for a summary diff's one hunk; line ranges raise ValueError since it has no lines to pick from."""
+	decision = approvals.get("Change #1", True)
+	if isinstance(decision, PartialDecision):
+		raise ValueError("A summary hunk is accepted or rejected as a whole, not by line ranges")
+	return decision
 
-	# Build merged content
-	merged_lines = file_lines.copy()
-	for hunk in reversed(hunks):
+def _apply_summary(file_path: Path, summary: re.Match, decision: Union[bool, List[str]], content: Optional[str]) -> str:
+	"""Resolve a summary hunk all at once: keep the new file, restore the old blob, or use a replacement.
+
+	Binary content round trips through str using surrogateescape.
+	"""
+	if isinstance(decision, list):
+		return "\n".join(decision)
+	if decision:
+		if content is not None:
+			return content
+		try:
+			with open(file_path, 'r', errors='surrogateescape') as f:
+				return f.read()
+		except Exception as e:
+			return f"Error: Could not read file: {e}"
+	old_blob = summary.group(2)
+	if old_blob == NULL_BLOB:
+		return ""
+	repo_path = find_git_repo(file_path)
+	if not repo_path:
+		return f"Error: No git repository found for {file_path}"
+	blob = read_blobs(repo_path, [old_blob]).get(old_blob)
+	if blob is None:
+		return f"Error: Could not read blob {old_blob}"
+	return blob.decode("utf-8", "surrogateescape")
+
+def hunk_result_lines(hunk: Dict[str, str], decision: Union[bool, List[str], PartialDecision]) -> List[str]:
+	"""Lines a hunk's region holds once decision is applied."""
+	if isinstance(decision, list):
+		return decision
+	result = []
+	line_number = 0
+	for diff_line in hunk["content"].splitlines():
+		if not diff_line or diff_line[0] == '\\':
+			continue
+		line_number += 1
+		if diff_line[0] == ' ':
+			result.append(diff_line[1:])
+		elif diff_line[0] == '-':
+			# Removed lines come back when the change (or this line of it) is rejected
+			if decision is False or isinstance(decision, PartialDecision) and decision.rejects(line_number):
+				result.append(diff_line[1:])
+		elif diff_line[0] == '+':
+			if decision is True or isinstance(decision, PartialDecision) and not decision.rejects(line_number):
+				result.append(diff_line[1:])
+	return result
+
+def partial_result_lacks_newline(hunk: Dict[str, str], decision: PartialDecision) -> bool:
+	"""Whether the last line a partial decision keeps is one that ended its file without a newline."""
+	lacks_newline = False
+	line_number = 0
+	body = [line for line in hunk["content"].splitlines() if line]
+	for i, diff_line in enumerate(body):
+		if diff_line[0] == '\\':
+			continue
+		line_number += 1
+		kept = diff_line[0] == ' ' or decision.rejects(line_number) == (diff_line[0] == '-')
+		if kept:
+			lacks_newline = i + 1 < len(body) and body[i + 1][0] == '\\'
+	return lacks_newline
+
+def _side_lacks_newline(hunk: Dict[str, str], side: str) -> bool:
+	"""Whether the hunk's old ('-') or new ('+') side ends its file without a newline."""
+	body = [line for line in hunk["content"].splitlines() if line]
+	return any(line[0] == side and i + 1 < len(body) and body[i + 1][0] == '\\' for i, line in enumerate(body))
+
+def revert_operations(file_lines: List[str], hunks: List[Dict[str, str]], approvals: Dict[str, Union[bool, List[str], PartialDecision]]) -> List[Tuple[int, int, List[str]]]:
+	"""Work out the line replacements apply_changes makes, as ascending (start, end, lines) over file_lines.
+
+	Each operation replaces file_lines[start:end] (the hunk's new lines) with
+	the original or replacement lines.
+	"""
+	operations = []
+	for hunk in hunks:
 		change_num = hunk["number"]
 		if change_num not in approvals:
 			continue  # Skip if no decision for this change
@@ -166,36 +485,72 @@ def apply_changes(file_path: Path, diff: str, llm_response: str) -> str:
 			continue # Skip yes's since we have those lines from the file
 		
 		# Extract line numbers
-		header = hunk["header"]
-		hunk_match = hunk_pattern.match(header)
-		if not hunk_match:
+		parsed = parse_hunk_header(hunk["header"])
+		if not parsed:
 			continue
-		new_start = int(hunk_match.group(2)) - 1  # 0-based
-		new_lines = int(hunk_match.group(3)) if hunk_match.group(3) else 1
+		_, _, new_start, new_lines = parsed
+		new_start -= 1  # 0-based
 		new_end = new_start+new_lines
 		
-		# Get diff lines
-		diff_lines = hunk["content"].splitlines()
-		
-		# Get original content:
-		og_lines = []
-		for diff_line in diff_lines:
-			if diff_line[0] == ' ':
-				og_lines.append(diff_line[1:])
-			elif diff_line[0] == '-':
-				og_lines.append(diff_line[1:])
-				
-		if isinstance(approvals[change_num], list):
-			og_lines = approvals[change_num]
+		og_lines = hunk_result_lines(hunk, approvals[change_num])
 		
 		if new_lines == 0:
 			new_start += 1
 			new_end += 1
 			
-		# Revert:
-		before_hunk = merged_lines[:new_start]
-		after_hunk = merged_lines[new_end:] if '\\ No newline at end of file' not in hunk['content'] else []
-		merged_lines = before_hunk + og_lines + after_hunk
+		# Revert, dropping the rest of the file if the hunk ends it without a newline
+		if '\\ No newline at end of file' in hunk['content']:
+			new_end = len(file_lines)
+			decision = approvals[change_num]
+			if isinstance(decision, PartialDecision):
+				lacks_newline = partial_result_lacks_newline(hunk, decision)
+			else:
+				# Restored lines end the way the original did, replacements the way the agent's lines did
+				lacks_newline = _side_lacks_newline(hunk, '+' if isinstance(decision, list) else '-')
+			if not lacks_newline:
+				og_lines = og_lines + [""]
+		operations.append((new_start, new_end, og_lines))
+	return operations
+
+@profiled("apply_changes")
+def apply_changes(file_path: Path, diff: str, llm_response: str, content: Optional[str] = None, split: bool = False) -> str:
+	"""Apply or revert changes based on LLM response and return merged file content.
+
+	content and split must match what add_change_numbers was given.
+	A line-range decision on a summary hunk raises ValueError.
+	"""
+	return apply_decisions(file_path, diff, parse_llm_response(llm_response), content, split)
+
+@timed("apply")
+def apply_decisions(file_path: Path, diff: str, approvals: Dict[str, Union[bool, List[str], PartialDecision]], content: Optional[str] = None, split: bool = False) -> str:
+	"""apply_changes for decisions that are already parsed, as {change number: decision}."""
+	summary = parse_summary(diff)
+	if summary:
+		return _apply_summary(file_path, summary, summary_decision(approvals), content)
+
+	if content is not None:
+		file_lines = content.split("\n")
+	else:
+		try:
+			with open(file_path, 'r') as f:
+				file_lines = f.read().split("\n")
+		except Exception as e:
+			return f"Error: Could not read file: {e}"
+
+	# Get hunks from diff
+	hunks = list(parse_hunks(diff.splitlines(), split))
+
+	# Build merged content in one forward pass over the file
+	merged_lines = []
+	pos = 0
+	operations = revert_operations(file_lines, hunks, approvals)
+	for start, end, og_lines in operations:
+		merged_lines.extend(file_lines[pos:start])
+		merged_lines.extend(og_lines)
+		pos = max(pos, end)
+	merged_lines.extend(file_lines[pos:])
+	count("hunks_applied", len(hunks))
+	count("hunks_reverted", len(operations))
 
 	return "\n".join(merged_lines)
 
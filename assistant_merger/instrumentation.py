@@ -0,0 +1,124 @@
+import json
+import time
+import functools
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import Optional, List, Dict, Callable, Iterator
+
+class Metrics:
+	"""Per-stage timers and named counters collected while instrumentation is on."""
+	def __init__(self):
+		self.timers: Dict[str, List[float]] = {}  # stage: [calls, seconds]
+		self.counters: Dict[str, int] = {}
+		self.callbacks: List[Callable[[str, float], None]] = []
+		self.lock = threading.Lock()
+
+	def add_time(self, stage: str, seconds: float):
+		with self.lock:
+			timer = self.timers.setdefault(stage, [0, 0.0])
+			timer[0] += 1
+			timer[1] += seconds
+		for callback in self.callbacks:
+			callback(stage, seconds)
+
+	def count(self, name: str, n: int = 1):
+		with self.lock:
+			self.counters[name] = self.counters.get(name, 0) + n
+
+	def to_dict(self) -> Dict[str, Dict]:
+		return {
+			"stages": {stage: {"calls": calls, "seconds": seconds} for stage, (calls, seconds) in sorted(self.timers.items())},
+			"counters": dict(sorted(self.counters.items()))
+		}
+
+	def to_json(self) -> str:
+		return json.dumps(self.to_dict())
+
+	def to_prometheus(self, prefix: str = "assistant_merger") -> str:
+		"""Render in the Prometheus text exposition format."""
+		lines = []
+		if self.timers:
+			lines.append(f"# TYPE {prefix}_stage_seconds_total counter")
+			lines += [f'{prefix}_stage_seconds_total{{stage="{stage}"}} {seconds}' for stage, (_, seconds) in sorted(self.timers.items())]
+			lines.append(f"# TYPE {prefix}_stage_calls_total counter")
+			lines += [f'{prefix}_stage_calls_total{{stage="{stage}"}} {calls}' for stage, (calls, _) in sorted(self.timers.items())]
+		for name, value in sorted(self.counters.items()):
+			lines.append(f"# TYPE {prefix}_{name}_total counter")
+			lines.append(f"{prefix}_{name}_total {value}")
+		return "\n".join(lines) + "\n"
+
+# Process-wide so threads from pools and executors report into the same Metrics
+_active: Optional[Metrics] = None
+_NOOP = nullcontext()
+
+def current() -> Optional[Metrics]:
+	"""The Metrics being collected into, or None while instrumentation is off."""
+	return _active
+
+def enable(metrics: Optional[Metrics] = None) -> Metrics:
+	"""Start collecting into metrics (a new Metrics by default) until disable()."""
+	global _active
+	_active = metrics or Metrics()
+	return _active
+
+def disable():
+	global _active
+	_active = None
+
+@contextmanager
+def collect(metrics: Optional[Metrics] = None, callback: Optional[Callable[[str, float], None]] = None) -> Iterator[Metrics]:
+	"""Collect metrics for the duration of a with block; callback(stage, seconds) runs as each stage ends."""
+	global _active
+	previous = _active
+	_active = metrics or Metrics()
+	if callback:
+		_active.callbacks.append(callback)
+	metrics = _active
+	try:
+		yield metrics
+	finally:
+		_active = previous
+		if callback:
+			metrics.callbacks.remove(callback)
+
+class _Stage:
+	__slots__ = ("metrics", "name", "start")
+
+	def __init__(self, metrics: Metrics, name: str):
+		self.metrics = metrics
+		self.name = name
+
+	def __enter__(self):
+		self.start = time.perf_counter()
+		return self
+
+	def __exit__(self, *exc):
+		self.metrics.add_time(self.name, time.perf_counter() - self.start)
+		return False
+
+def stage(name: str):
+	"""Context manager timing a stage; a shared no-op while instrumentation is off."""
+	metrics = _active
+	return _NOOP if metrics is None else _Stage(metrics, name)
+
+def count(name: str, n: int = 1):
+	"""Add n to a counter, if instrumentation is on."""
+	metrics = _active
+	if metrics is not None:
+		metrics.count(name, n)
+
+def timed(name: str):
+	"""Decorator timing every call of a function as stage name; costs one global lookup when off."""
+	def decorate(function):
+		@functools.wraps(function)
+		def wrapper(*args, **kwargs):
+			metrics = _active
+			if metrics is None:
+				return function(*args, **kwargs)
+			start = time.perf_counter()
+			try:
+				return function(*args, **kwargs)
+			finally:
+				metrics.add_time(name, time.perf_counter() - start)
+		return wrapper
+	return decorate
@@ -0,0 +1,168 @@
+import json
+import hashlib
+from pathlib import Path
+from typing import Optional, List, Dict
+from assistant_merger.classify import parse_summary
+from assistant_merger.git_tools import find_git_repo, parse_hunks, parse_hunk_header, parse_llm_response, revert_operations
+
+JOURNAL_NAME = "assistant_merger_journal.jsonl"
+
+def lines_hash(lines: List[str]) -> str:
+	"""Hash a block of lines so undo/redo can check the file still holds it."""
+	return hashlib.sha1("\n".join(lines).encode("utf-8", "surrogateescape")).hexdigest()
+
+class Journal:
+	"""Append-only record of the hunks apply_changes reverted, supporting per-decision undo and redo.
+
+	Each reverted hunk is one entry holding the lines it removed ("before")
+	and put back ("after") plus where they now sit. Undo and redo swap those
+	blocks in place and append a record; the positions of other entries in
+	the same file are shifted arithmetically, so no diff is ever recomputed.
+	"""
+	def __init__(self, repo_path: Path):
+		self.repo_path = repo_path
+		self.journal_path = repo_path / ".git" / JOURNAL_NAME
+		self.entries: Dict[int, Dict] = {}
+		self._load()
+
+	@classmethod
+	def for_file(cls, file_path: Path) -> "Journal":
+		"""Open the journal of the repository containing file_path."""
+		repo_path = find_git_repo(file_path)
+		if not repo_path:
+			raise ValueError(f"No git repository found for {file_path}")
+		return cls(repo_path)
+
+	def _load(self):
+		if not self.journal_path.exists():
+			return
+		with open(self.journal_path, 'r', errors='surrogateescape') as f:
+			for line in f:
+				if line.strip():
+					self._replay(json.loads(line))
+
+	def _append(self, record: Dict):
+		self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+		with open(self.journal_path, 'a', errors='surrogateescape') as f:
+			f.write(json.dumps(record) + "\n")
+		self._replay(record)
+
+	def _shift(self, path: str, exclude: int, at: int, delta: int):
+		"""Move entries of path at or after line at by delta lines."""
+		if delta == 0:
+			return
+		for entry in self.entries.values():
+			if entry["path"] == path and entry["id"] != exclude and entry["start"] >= at:
+				entry["start"] += delta
+
+	def _replay(self, record: Dict):
+		"""Update in-memory state for one journal record."""
+		if record["op"] == "apply":
+			entry = dict(record, applied=True)
+			# Positions of older entries follow the lines this revert inserted
+			self._shift(entry["path"], entry["id"], entry["start"] + len(entry["before"]), len(entry["after"]) - len(entry["before"]))
+			self.entries[entry["id"]] = entry
+		else:
+			entry = self.entries[record["id"]]
+			removed, inserted = (entry["after"], entry["before"]) if record["op"] == "undo" else (entry["before"], entry["after"])
+			entry["start"] = record.get("start", entry["start"])
+			self._shift(entry["path"], entry["id"], entry["start"] + len(removed), len(inserted) - len(removed))
+			entry["applied"] = record["op"] == "redo"
+
+	def history(self, file_path: Optional[Path] = None) -> List[Dict]:
+		"""Entries in the order they were recorded, optionally only for one file."""
+		entries = sorted(self.entries.values(), key=lambda e: e["id"])
+		if file_path is not None:
+			path = file_path.relative_to(self.repo_path).as_posix()
+			entries = [e for e in entries if e["path"] == path]
+		return entries
+
+	def record(self, file_path: Path, diff: str, llm_response: str, content: Optional[str] = None) -> str:
+		"""Apply an LLM response like apply_changes, write the file, journal every revert, and return the content.
+
+		Summary diffs (binary, generated or huge files) have no lines to
+		journal and raise ValueError before anything is written.
+		"""
+		summary = parse_summary(diff)
+		if summary:
+			raise ValueError(f"Can't journal the {summary.group(1)} file {file_path}; decide it with apply_changes")
+		if content is None:
+			with open(file_path, 'r') as f:
+				content = f.read()
+		file_lines = content.split("\n")
+		hunks = list(parse_hunks(diff.splitlines()))
+		approvals = parse_llm_response(llm_response)
+		operations = revert_operations(file_lines, hunks, approvals)
+		# revert_operations keeps the order of the hunks it reverts
+		changes = [h["number"] for h in hunks if approvals.get(h["number"], True) is not True and parse_hunk_header(h["header"])]
+
+		path = file_path.relative_to(self.repo_path).as_posix()
+		merged_lines = []
+		pos = 0
+		records = []
+		next_id = max(self.entries, default=0) + 1
+		for (start, end, og_lines), change in zip(operations, changes):
+			merged_lines.extend(file_lines[pos:start])
+			before = file_lines[start:end]
+			records.append({
+				"op": "apply",
+				"id": next_id + len(records),
+				"path": path,
+				"change": change,
+				"start": len(merged_lines),
+				"before": before,
+				"after": og_lines,
+				"before_hash": lines_hash(before),
+				"after_hash": lines_hash(og_lines)
+			})
+			merged_lines.extend(og_lines)
+			pos = max(pos, end)
+		merged_lines.extend(file_lines[pos:])
+		merged = "\n".join(merged_lines)
+
+		with open(file_path, 'w') as f:
+			f.write(merged)
+		for record in records:
+			self._append(record)
+		return merged
+
+	def _swap(self, entry_id: int, op: str):
+		entry = self.entries.get(entry_id)
+		if entry is None:
+			raise KeyError(f"No journal entry {entry_id}")
+		if entry["applied"] != (op == "undo"):
+			raise ValueError(f"Journal entry {entry_id} is already {'undone' if op == 'undo' else 'applied'}")
+		removed, inserted = (entry["after"], entry["before"]) if op == "undo" else (entry["before"], entry["after"])
+		removed_hash = entry["after_hash"] if op == "undo" else entry["before_hash"]
+
+		file_path = self.repo_path / entry["path"]
+		with open(file_path, 'r') as f:
+			file_lines = f.read().split("\n")
+		start = entry["start"]
+		if lines_hash(file_lines[start:start + len(removed)]) != removed_hash:
+			start = self._find_block(file_lines, removed, removed_hash)
+			if start is None:
+				raise ValueError(f"{entry['path']} no longer contains the lines of journal entry {entry_id}")
+		file_lines[start:start + len(removed)] = inserted
+		with open(file_path, 'w') as f:
+			f.write("\n".join(file_lines))
+		self._append({"op": op, "id": entry_id, "start": start})
+
+	@staticmethod
+	def _find_block(file_lines: List[str], block: List[str], block_hash: str) -> Optional[int]:
+		"""Fall back to locating a block that moved through edits made outside the journal, if it's unique."""
+		if not block:
+			return None
+		matches = [
+			i for i in range(len(file_lines) - len(block) + 1)
+			if file_lines[i] == block[0] and lines_hash(file_lines[i:i + len(block)]) == block_hash
+		]
+		return matches[0] if len(matches) == 1 else None
+
+	def undo(self, entry_id: int):
+		"""Put the agent's change for one journal entry back into its file."""
+		self._swap(entry_id, "undo")
+
+	def redo(self, entry_id: int):
+		"""Revert the agent's change for one journal entry again."""
+		self._swap(entry_id, "redo")
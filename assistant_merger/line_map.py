@@ -0,0 +1,138 @@
+from bisect import bisect_right
+from typing import Optional, List, Dict, Union, Iterable, Tuple, Any
+from assistant_merger.git_tools import format_hunk_header, hunk_result_lines, parse_hunks, parse_hunk_header
+
+class LineMap:
+	"""Maps lines between the old and new side of a diff, and to the hunk covering them, in O(log hunks).
+
+	Built from parsed hunks as sorted arrays of hunk boundaries with the
+	cumulative line offset after each hunk. Lines are 1-based; mapping a line
+	that only exists on one side (added or removed) returns None.
+	"""
+	def __init__(self, hunks: List[Dict[str, str]]):
+		self.hunks = []
+		self.old_first, self.old_after = [], []
+		self.new_first, self.new_after = [], []
+		self.offsets = []  # old line - new line for lines after hunk i
+		offset = 0
+		parsed_hunks = sorted(
+			((parse_hunk_header(h["header"]), h) for h in hunks if parse_hunk_header(h["header"])),
+			key=lambda p: p[0][2]
+		)
+		for (old_start, old_lines, new_start, new_lines), hunk in parsed_hunks:
+			# A side with no lines sits just after its start line
+			old_first = old_start if old_lines else old_start + 1
+			new_first = new_start if new_lines else new_start + 1
+			self.hunks.append(hunk)
+			self.old_first.append(old_first)
+			self.old_after.append(old_first + old_lines)
+			self.new_first.append(new_first)
+			self.new_after.append(new_first + new_lines)
+			offset += old_lines - new_lines
+			self.offsets.append(offset)
+
+	@classmethod
+	def from_diff(cls, diff: str) -> "LineMap":
+		return cls(list(parse_hunks(diff.splitlines())))
+
+	def _offset_before(self, index: int) -> int:
+		return self.offsets[index - 1] if index else 0
+
+	def new_to_old(self, line: int) -> Optional[int]:
+		"""Map a line of the new file to the old file, or None if the line was added."""
+		index = bisect_right(self.new_after, line)
+		if index < len(self.hunks) and line >= self.new_first[index]:
+			return None
+		return line + self._offset_before(index)
+
+	def old_to_new(self, line: int) -> Optional[int]:
+		"""Map a line of the old file to the new file, or None if the line was removed."""
+		index = bisect_right(self.old_after, line)
+		if index < len(self.hunks) and line >= self.old_first[index]:
+			return None
+		return line - self._offset_before(index)
+
+	def hunk_index_at(self, line: int, side: str = "new") -> Optional[int]:
+		"""Index of the hunk whose lines on side ('new' or 'old') include line."""
+		first, after = (self.new_first, self.new_after) if side == "new" else (self.old_first, self.old_after)
+		index = bisect_right(after, line)
+		if index < len(self.hunks) and line >= first[index]:
+			return index
+		return None
+
+	def hunk_at(self, line: int, side: str = "new") -> Optional[Dict[str, str]]:
+		"""The hunk whose lines on side ('new' or 'old') include line."""
+		index = self.hunk_index_at(line, side)
+		return self.hunks[index] if index is not None else None
+
+	def apply(self, approvals: Dict[str, Union[bool, List[str]]]) -> "LineMap":
+		"""Map for the file apply_changes produces from these decisions, still relative to the old side.
+
+		Rejected hunks disappear, replaced or partly accepted hunks take the
+		length of their resolved lines, and everything after them shifts.
+		"""
+		hunks = []
+		shift = 0
+		for hunk, old_first, new_first, new_after in zip(self.hunks, self.old_first, self.new_first, self.new_after):
+			old_start, old_lines, new_start, new_lines = parse_hunk_header(hunk["header"])
+			decision = approvals.get(hunk["number"], True)
+			if decision is False:
+				shift += old_lines - new_lines
+				continue
+			if decision is not True:
+				# Replaced or partly accepted: the region now holds the resolved lines
+				resolved = len(hunk_result_lines(hunk, decision))
+				start = new_first + shift
+				shift += resolved - new_lines
+				new_lines = resolved
+				new_start = start if new_lines else start - 1
+			else:
+				new_start += shift
+			hunks.append(dict(hunk, header=format_hunk_header(old_start, old_lines, new_start, new_lines)))
+		return LineMap(hunks)
+
+class ChangesetIndex:
+	"""Interval index over every hunk of a changeset, for attributing (path, line) diagnostics to changes.
+
+	Holds one LineMap per file, so each lookup is a dict access plus one
+	bisect and attaching d diagnostics to h hunks costs O((d + h) log h).
+	"""
+	def __init__(self, maps: Dict[str, LineMap]):
+		self.maps = maps
+
+	@classmethod
+	def from_diffs(cls, diffs: Dict[str, str]) -> "ChangesetIndex":
+		"""Build from {relative path: diff}, e.g. the FileDiffs of iter_file_diffs."""
+		return cls({str(path): LineMap.from_diff(diff) for path, diff in diffs.items()})
+
+	def lookup(self, path: str, line: int, side: str = "new", slack: int = 0) -> Optional[Dict[str, str]]:
+		"""The hunk of path covering line, or the nearest one within slack lines of it."""
+		line_map = self.maps.get(str(path))
+		if line_map is None or not line_map.hunks:
+			return None
+		index = line_map.hunk_index_at(line, side)
+		if index is not None:
+			return line_map.hunks[index]
+		if slack <= 0:
+			return None
+		first, after = (line_map.new_first, line_map.new_after) if side == "new" else (line_map.old_first, line_map.old_after)
+		index = bisect_right(after, line)
+		# Closest of the hunk ending before the line and the one starting after it
+		best, best_distance = None, slack + 1
+		if index > 0 and line - (after[index - 1] - 1) < best_distance:
+			best, best_distance = index - 1, line - (after[index - 1] - 1)
+		if index < len(first) and first[index] - line < best_distance:
+			best = index
+		return line_map.hunks[best] if best is not None else None
+
+	def attach(self, diagnostics: Iterable[Tuple[str, int, Any]], side: str = "new", slack: int = 0) -> Dict[Tuple[str, str], List[Any]]:
+		"""Group (path, line, payload) diagnostics by the (path, change number) they fall in.
+
+		Diagnostics outside every hunk (beyond slack) are left out.
+		"""
+		attached = {}
+		for path, line, payload in diagnostics:
+			hunk = self.lookup(path, line, side, slack)
+			if hunk is not None:
+				attached.setdefault((str(path), hunk["number"]), []).append(payload)
+		return attached
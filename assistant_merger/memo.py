@@ -0,0 +1,166 @@
+import re
+import time
+import sqlite3
+import hashlib
+from pathlib import Path
+from typing import Optional, Tuple, List, Dict, Iterable
+from assistant_merger.instrumentation import count
+from assistant_merger.git_tools import find_git_repo, parse_hunks, parse_hunk_header, parse_llm_response
+from assistant_merger.classify import SUMMARY_PATTERN
+
+MEMO_NAME = "assistant_merger_memo.sqlite"
+CONTEXT_LINES = 3
+
+MemoKey = Tuple[str, str, str]  # (path, hunk hash, context hash)
+
+def hunk_hash(hunk: Dict[str, str]) -> str:
+	"""Hash a hunk's lines, ignoring trailing whitespace and its position in the file."""
+	normalized = "\n".join(line.rstrip() for line in hunk["content"].splitlines())
+	return hashlib.sha256(normalized.encode("utf-8", "surrogateescape")).hexdigest()
+
+def context_hash(file_lines: List[str], hunk: Dict[str, str], context_lines: int = CONTEXT_LINES) -> str:
+	"""Hash the lines just before and after a hunk's new side, so a decision only replays in the same surroundings.
+
+	A summary hunk covers its whole file, so its context is the blob pair in
+	its header: the decision only replays for that exact change.
+	"""
+	if SUMMARY_PATTERN.match(hunk["header"]):
+		return hashlib.sha256(hunk["header"].encode()).hexdigest()
+	_, _, new_start, new_lines = parse_hunk_header(hunk["header"])
+	start = new_start if new_lines == 0 else new_start - 1
+	end = start + new_lines
+	around = file_lines[max(0, start - context_lines):start] + ["@@"] + file_lines[end:end + context_lines]
+	return hashlib.sha256("\n".join(around).encode("utf-8", "surrogateescape")).hexdigest()
+
+class DecisionMemo:
+	"""SQLite store of past decisions, replayed when the same hunk shows up again in the same place.
+
+	Decisions are stored as the text after 'Change #N' in the response line
+	(', Yes', ', No', a replacement or a partial decision), so any form
+	replays exactly. Entries older than ttl seconds since last use are
+	ignored and evicted, and beyond max_entries the least recently used go.
+	"""
+	def __init__(self, db_path: Path, ttl: Optional[float] = None, max_entries: Optional[int] = None, repo_path: Optional[Path] = None):
+		self.db_path = db_path
+		self.ttl = ttl
+		self.max_entries = max_entries
+		self.repo_path = repo_path
+		self.db = sqlite3.connect(str(db_path))
+		self.db.execute(
+			"CREATE TABLE IF NOT EXISTS decisions ("
+			"path TEXT, hunk_hash TEXT, context_hash TEXT, decision TEXT, used_at REAL, "
+			"PRIMARY KEY (path, hunk_hash, context_hash))"
+		)
+		self.db.execute("CREATE INDEX IF NOT EXISTS decisions_used_at ON decisions (used_at)")
+		self.db.commit()
+
+	@classmethod
+	def for_file(cls, file_path: Path, ttl: Optional[float] = None, max_entries: Optional[int] = None) -> "DecisionMemo":
+		"""Open the memo of the repository containing file_path."""
+		repo_path = find_git_repo(file_path)
+		if not repo_path:
+			raise ValueError(f"No git repository found for {file_path}")
+		return cls(repo_path / ".git" / MEMO_NAME, ttl, max_entries, repo_path)
+
+	def close(self):
+		self.db.close()
+
+	def _path_key(self, file_path: Path) -> str:
+		if self.repo_path is not None:
+			try:
+				return file_path.relative_to(self.repo_path).as_posix()
+			except ValueError:
+				pass
+		return file_path.as_posix()
+
+	def keys(self, file_path: Path, diff: str, content: Optional[str] = None) -> Dict[str, Tuple[MemoKey, Dict[str, str]]]:
+		"""Memo key of every hunk in diff, as {change number: (key, hunk)}."""
+		if content is None:
+			try:
+				with open(file_path, 'r', errors='surrogateescape') as f:
+					content = f.read()
+			except FileNotFoundError:
+				# A deleted file's diff still has hunks to key
+				content = ""
+		file_lines = content.split("\n")
+		path = self._path_key(file_path)
+		return {
+			hunk["number"]: ((path, hunk_hash(hunk), context_hash(file_lines, hunk)), hunk)
+			for hunk in parse_hunks(diff.splitlines())
+		}
+
+	def lookup(self, keys: Iterable[MemoKey]) -> Dict[MemoKey, str]:
+		"""Find stored decisions for many keys with a single query, refreshing their last use."""
+		keys = list(set(keys))
+		if not keys:
+			return {}
+		now = time.time()
+		self.db.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (path TEXT, hunk_hash TEXT, context_hash TEXT)")
+		self.db.execute("DELETE FROM wanted")
+		self.db.executemany("INSERT INTO wanted VALUES (?, ?, ?)", keys)
+		rows = self.db.execute(
+			"SELECT d.path, d.hunk_hash, d.context_hash, d.decision FROM decisions d "
+			"JOIN wanted w ON d.path = w.path AND d.hunk_hash = w.hunk_hash AND d.context_hash = w.context_hash "
+			"WHERE d.used_at >= ?",
+			(now - self.ttl if self.ttl is not None else float("-inf"),)
+		).fetchall()
+		found = {(path, hh, ch): decision for path, hh, ch, decision in rows}
+		count("memo_hits", len(found))
+		count("memo_misses", len(keys) - len(found))
+		self.db.executemany(
+			"UPDATE decisions SET used_at = ? WHERE path = ? AND hunk_hash = ? AND context_hash = ?",
+			[(now,) + key for key in found]
+		)
+		self.db.commit()
+		return found
+
+	def store(self, decisions: Dict[MemoKey, str]):
+		"""Record decisions (the text after 'Change #N') and evict what no longer fits."""
+		now = time.time()
+		self.db.executemany(
+			"INSERT OR REPLACE INTO decisions VALUES (?, ?, ?, ?, ?)",
+			[key + (decision, now) for key, decision in decisions.items()]
+		)
+		self.evict(now)
+		self.db.commit()
+
+	def evict(self, now: Optional[float] = None):
+		"""Drop entries past their TTL, then the least recently used beyond max_entries."""
+		now = time.time() if now is None else now
+		if self.ttl is not None:
+			self.db.execute("DELETE FROM decisions WHERE used_at < ?", (now - self.ttl,))
+		if self.max_entries is not None:
+			self.db.execute(
+				"DELETE FROM decisions WHERE rowid IN (SELECT rowid FROM decisions ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+				(self.max_entries,)
+			)
+		self.db.commit()
+
+	def recall(self, diffs: Dict[Path, str], contents: Optional[Dict[Path, str]] = None) -> Tuple[Dict[Path, str], Dict[Path, List[Dict[str, str]]]]:
+		"""Replay remembered decisions for a changeset with one lookup.
+
+		Returns ({path: response holding the replayed decisions}, {path: hunks
+		still needing a decision}). Feed the second to the reviewer and join
+		its answer with the first before calling apply_changes.
+		"""
+		contents = contents or {}
+		file_keys = {path: self.keys(path, diff, contents.get(path)) for path, diff in diffs.items()}
+		found = self.lookup(key for keys in file_keys.values() for key, _ in keys.values())
+		responses, pending = {}, {}
+		for path, keys in file_keys.items():
+			responses[path] = "\n".join(f"{number}{found[key]}" for number, (key, _) in keys.items() if key in found)
+			pending[path] = [hunk for key, hunk in keys.values() if key not in found]
+		return responses, pending
+
+	def remember(self, file_path: Path, diff: str, llm_response: str, content: Optional[str] = None):
+		"""Store every decision of llm_response for the hunks of diff; content is the file the diff was taken against."""
+		keys = self.keys(file_path, diff, content)
+		decisions = {}
+		for line in llm_response.strip().splitlines():
+			match = re.match(r'Change #(\d+)(,.*)', line.strip())
+			number = f"Change #{int(match.group(1))}" if match else None
+			# Only lines apply_changes understands are worth replaying
+			if number in keys and parse_llm_response(line.strip()):
+				decisions[keys[number][0]] = match.group(2)
+		if decisions:
+			self.store(decisions)
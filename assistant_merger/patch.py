@@ -0,0 +1,131 @@
+from pathlib import Path
+from typing import Optional, List, Tuple
+from assistant_merger.classify import parse_summary
+from assistant_merger.git_tools import PartialDecision, find_git_repo, format_hunk_header, hunk_result_lines, partial_result_lacks_newline, parse_hunks, parse_hunk_header, parse_llm_response, summary_decision
+
+NO_NEWLINE = "\\ No newline at end of file"
+
+def _hunk_sides(content: str) -> Tuple[List[str], List[str], bool, bool]:
+	"""Split hunk content into (removed, added, removed lacks newline, added lacks newline)."""
+	removed, added = [], []
+	removed_no_newline = added_no_newline = False
+	last = None
+	for line in content.splitlines():
+		if line.startswith("\\"):
+			if last is removed:
+				removed_no_newline = True
+			elif last is added:
+				added_no_newline = True
+		elif line.startswith("-"):
+			removed.append(line[1:])
+			last = removed
+		elif line.startswith("+"):
+			added.append(line[1:])
+			last = added
+	return removed, added, removed_no_newline, added_no_newline
+
+def build_reject_patch(file_path: Path, diff: str, llm_response: str, content: Optional[str] = None) -> str:
+	"""Build a minimal --unified=0 patch that turns the current file into apply_changes' result.
+
+	Only rejected or replaced hunks appear, reversed, so the payload grows with
+	the number of rejected lines rather than the file size. Apply it with
+	apply_patch or 'git apply --unidiff-zero'. Returns "" if nothing is rejected.
+	Raises ValueError for a rejected or replaced summary hunk (binary,
+	generated or huge file), which has no lines to patch; use apply_changes.
+	"""
+	approvals = parse_llm_response(llm_response)
+	summary = parse_summary(diff)
+	if summary:
+		if summary_decision(approvals) is True:
+			return ""
+		raise ValueError(f"Can't build a text patch for the {summary.group(1)} file {file_path}")
+	if content is None:
+		with open(file_path, 'r') as f:
+			content = f.read()
+	ends_with_newline = content.endswith("\n")
+	line_count = content.count("\n") + (0 if ends_with_newline or not content else 1)
+
+	hunk_lines = []
+	offset = 0
+	for hunk in parse_hunks(diff.splitlines()):
+		decision = approvals.get(hunk["number"], True)
+		if decision is True:
+			continue
+		parsed = parse_hunk_header(hunk["header"])
+		if not parsed:
+			continue
+		_, _, new_start, new_lines = parsed
+		removed, added, removed_no_newline, _ = _hunk_sides(hunk["content"])
+		# The agent's lines are what we remove; the original, replacement or partly kept lines come back
+		restore = hunk_result_lines(hunk, decision)
+		touches_end = new_lines > 0 and new_start + new_lines - 1 == line_count
+		if isinstance(decision, list):
+			restore_no_newline = touches_end and not ends_with_newline
+		elif isinstance(decision, PartialDecision):
+			restore_no_newline = partial_result_lacks_newline(hunk, decision)
+		else:
+			restore_no_newline = removed_no_newline
+
+		target_start = (new_start if new_lines > 0 else new_start + 1) + offset
+		if not restore:
+			target_start -= 1
+		hunk_lines.append(format_hunk_header(new_start, new_lines, target_start, len(restore)))
+		hunk_lines.extend(f"-{line}" for line in added)
+		if added and touches_end and not ends_with_newline:
+			hunk_lines.append(NO_NEWLINE)
+		hunk_lines.extend(f"+{line}" for line in restore)
+		if restore and restore_no_newline:
+			hunk_lines.append(NO_NEWLINE)
+		offset += len(restore) - new_lines
+
+	if not hunk_lines:
+		return ""
+	repo_path = find_git_repo(file_path)
+	relative_path = file_path.relative_to(repo_path).as_posix() if repo_path else file_path.name
+	header = [f"diff --git a/{relative_path} b/{relative_path}", f"--- a/{relative_path}", f"+++ b/{relative_path}"]
+	return "\n".join(header + hunk_lines) + "\n"
+
+def _split_keepends(content: str) -> List[str]:
+	"""Split on '\\n' only, keeping line endings so CR and other separators stay in the line."""
+	lines = content.split("\n")
+	last = lines.pop()
+	lines = [line + "\n" for line in lines]
+	if last:
+		lines.append(last)
+	return lines
+
+def apply_patch(content: str, patch: str) -> str:
+	"""Apply a single-file unified patch (any amount of context) to content in process.
+
+	Raises ValueError if a hunk's context or removed lines don't match.
+	"""
+	source = _split_keepends(content)
+	result = []
+	pos = 0  # Next unconsumed source line
+	hunks = list(parse_hunks(line for line in patch.splitlines() if not line.startswith(("diff ", "--- ", "+++ ", "index "))))
+	for hunk in hunks:
+		parsed = parse_hunk_header(hunk["header"])
+		if not parsed:
+			raise ValueError(f"Bad hunk header: {hunk['header']}")
+		old_start, old_lines, _, _ = parsed
+		start = old_start if old_lines == 0 else old_start - 1
+		if start < pos or start > len(source):
+			raise ValueError(f"Hunk {hunk['header']} is out of order or past the end of the file")
+		result.extend(source[pos:start])
+		pos = start
+
+		body = hunk["content"].splitlines()
+		for i, line in enumerate(body):
+			if line.startswith("\\"):
+				continue
+			text = line[1:]
+			if i + 1 >= len(body) or not body[i + 1].startswith("\\"):
+				text += "\n"
+			if line[0] in (" ", "-"):
+				if pos >= len(source) or source[pos] != text:
+					raise ValueError(f"Patch does not apply at line {pos + 1}: expected {text!r}")
+				pos += 1
+			if line[0] in (" ", "+"):
+				result.append(text)
+	result.extend(source[pos:])
+	return "".join(result)
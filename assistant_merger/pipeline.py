@@ -0,0 +1,148 @@
+import re
+import abc
+import time
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import Optional, List, Dict, Callable, Iterable, Tuple, Type
+from assistant_merger.git_tools import get_git_diff, add_change_numbers
+from assistant_merger.changeset import apply_changeset
+
+class Reviewer(abc.ABC):
+	"""Something that answers a rendered diff with 'Change #N, ...' decision lines, e.g. an LLM client."""
+	@abc.abstractmethod
+	async def review(self, prompt: str) -> str:
+		"""Answer prompt; raise ReviewerError for failures worth retrying."""
+
+class ReviewerError(Exception):
+	"""A failed review call worth retrying."""
+
+class StubReviewer(Reviewer):
+	"""Deterministic local reviewer for tests and offline benchmarks.
+
+	Rejects a change when the hash of its number and content falls under
+	reject_ratio, sleeps latency seconds per call, and raises ReviewerError
+	on every fail_every-th call so retries get exercised.
+	"""
+	def __init__(self, reject_ratio: float = 0.0, latency: float = 0.0, fail_every: int = 0):
+		self.reject_ratio = reject_ratio
+		self.latency = latency
+		self.fail_every = fail_every
+		self.calls = 0
+
+	async def review(self, prompt: str) -> str:
+		self.calls += 1
+		if self.latency:
+			await asyncio.sleep(self.latency)
+		if self.fail_every and self.calls % self.fail_every == 0:
+			raise ReviewerError(f"Stub failure on call {self.calls}")
+		decisions = []
+		for number, body in re.findall(r'^@@ [^\n]* @@ \((Change #\d+)\)\n(.*?)\n@@ End \1 Hunk @@', prompt, re.MULTILINE | re.DOTALL):
+			digest = hashlib.sha256(f"{number}\n{body}".encode("utf-8", "surrogateescape")).digest()
+			rejected = int.from_bytes(digest[:4], "big") / 2**32 < self.reject_ratio
+			decisions.append(f"{number}, {'No' if rejected else 'Yes'}")
+		return "\n".join(decisions)
+
+class _RateLimiter:
+	"""Spaces out calls to at most rate per second."""
+	def __init__(self, rate: Optional[float]):
+		self.interval = 1 / rate if rate else 0
+		self.next_time = 0.0
+		self.lock = asyncio.Lock()
+
+	async def wait(self):
+		if not self.interval:
+			return
+		async with self.lock:
+			now = time.monotonic()
+			if self.next_time > now:
+				await asyncio.sleep(self.next_time - now)
+			self.next_time = max(now, self.next_time) + self.interval
+
+async def _in_thread(function, *args):
+	"""Run a blocking call in the default executor; asyncio.to_thread needs Python 3.9."""
+	return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+
+def _write_merged(file_path: Path, diff: str, response: str) -> Optional[str]:
+	"""Merge a response as bytes and replace the file through a temp file, so a failure leaves it intact."""
+	# get_git_diff decodes with surrogateescape, so this gives back git's bytes
+	return apply_changeset({file_path: response}, {file_path: diff.encode("utf-8", "surrogateescape")})
+
+class ReviewPipeline:
+	"""Review a changeset through a Reviewer, one file per call, applying each response as it arrives.
+
+	Files are diffed and rendered by a producer into a queue bounded to
+	twice max_concurrency, so rendering never runs far ahead of review.
+	max_concurrency workers call the reviewer, spaced by rate_limit calls
+	per second, and calls raising one of retry_on (ReviewerError by default)
+	are retried with exponential backoff up to max_retries times; any other
+	error fails the file at once.
+	on_response(file_path, diff, response) handles each answer; by default
+	the merged file replaces the original through apply_changeset. An
+	exception from on_response fails only its own file.
+	"""
+	def __init__(self, reviewer: Reviewer, max_concurrency: int = 8, max_retries: int = 3, backoff: float = 0.5, rate_limit: Optional[float] = None, add_line_numbers: bool = False, on_response: Optional[Callable[[Path, str, str], Optional[str]]] = None, retry_on: Tuple[Type[BaseException], ...] = (ReviewerError,)):
+		self.reviewer = reviewer
+		self.max_concurrency = max_concurrency
+		self.max_retries = max_retries
+		self.backoff = backoff
+		self.rate_limit = rate_limit
+		self.add_line_numbers = add_line_numbers
+		self.on_response = on_response or _write_merged
+		self.retry_on = retry_on
+		self.stats = {"calls": 0, "retries": 0, "failed": 0, "applied": 0}
+
+	async def _review(self, limiter: _RateLimiter, prompt: str) -> str:
+		for attempt in range(self.max_retries + 1):
+			await limiter.wait()
+			self.stats["calls"] += 1
+			try:
+				return await self.reviewer.review(prompt)
+			except self.retry_on:
+				if attempt == self.max_retries:
+					raise
+				self.stats["retries"] += 1
+				await asyncio.sleep(self.backoff * 2 ** attempt)
+
+	async def run(self, paths: Iterable[Path]) -> Dict[Path, Optional[str]]:
+		"""Review every file, returning {path: error or None}."""
+		queue = asyncio.Queue(maxsize=self.max_concurrency * 2)
+		limiter = _RateLimiter(self.rate_limit)
+		results = {}
+
+		async def produce():
+			for file_path in paths:
+				diff, error = await _in_thread(get_git_diff, file_path)
+				if error:
+					results[file_path] = error
+					continue
+				prompt, _ = await _in_thread(add_change_numbers, diff, file_path, self.add_line_numbers)
+				await queue.put((file_path, diff, prompt))
+			for _ in range(self.max_concurrency):
+				await queue.put(None)
+
+		async def work():
+			while True:
+				item = await queue.get()
+				if item is None:
+					return
+				file_path, diff, prompt = item
+				try:
+					response = await self._review(limiter, prompt)
+				except Exception as e:
+					self.stats["failed"] += 1
+					results[file_path] = f"Error: Review failed: {e}"
+					continue
+				try:
+					results[file_path] = await _in_thread(self.on_response, file_path, diff, response)
+				except Exception as e:
+					results[file_path] = f"Error: Could not apply response: {e}"
+				if results[file_path] is None:
+					self.stats["applied"] += 1
+
+		await asyncio.gather(produce(), *(work() for _ in range(self.max_concurrency)))
+		return results
+
+def run_pipeline(paths: List[Path], reviewer: Reviewer, **kwargs) -> Dict[Path, Optional[str]]:
+	"""Run a ReviewPipeline to completion from synchronous code."""
+	return asyncio.run(ReviewPipeline(reviewer, **kwargs).run(paths))
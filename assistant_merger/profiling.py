@@ -0,0 +1,113 @@
+import os
+import json
+import time
+import cProfile
+import warnings
+import functools
+import threading
+from pathlib import Path
+from typing import Optional, Dict
+
+PROFILE_DIR_ENV = "ASSISTANT_MERGER_PROFILE_DIR"
+PROFILE_THRESHOLD_ENV = "ASSISTANT_MERGER_PROFILE_THRESHOLD"
+PROFILE_KEEP_ENV = "ASSISTANT_MERGER_PROFILE_KEEP"
+
+class _Settings:
+	dump_dir: Optional[Path] = None
+	threshold = 1.0  # Seconds a call must take for its profile to be kept
+	keep = 20  # Dumps kept in dump_dir before the oldest are removed
+
+_settings = _Settings()
+# Only one cProfile can run at a time, so concurrent or nested calls go unprofiled
+_profiling = threading.Lock()
+
+def configure(dump_dir: Optional[Path] = None, threshold: Optional[float] = None, keep: Optional[int] = None):
+	"""Turn capture on by giving a dump directory (None turns it off), optionally changing threshold and keep."""
+	_settings.dump_dir = Path(dump_dir) if dump_dir else None
+	if threshold is not None:
+		_settings.threshold = threshold
+	if keep is not None:
+		_settings.keep = keep
+
+def _env_number(name: str, kind: type):
+	"""An environment variable parsed with kind, or None (with a warning) if it is unset or malformed."""
+	value = os.environ.get(name)
+	if not value:
+		return None
+	try:
+		return kind(value)
+	except ValueError:
+		warnings.warn(f"Ignoring {name}={value!r}: not a valid {kind.__name__}")
+		return None
+
+def configure_from_env():
+	"""Configure from ASSISTANT_MERGER_PROFILE_DIR, _THRESHOLD (seconds) and _KEEP.
+
+	Runs at import, so a malformed value only warns rather than breaking the import.
+	"""
+	configure(os.environ.get(PROFILE_DIR_ENV), _env_number(PROFILE_THRESHOLD_ENV, float), _env_number(PROFILE_KEEP_ENV, int))
+
+def _describe(value) -> object:
+	"""Input size of an argument, without copying the input itself into the dump."""
+	if isinstance(value, (str, bytes)):
+		return {"type": type(value).__name__, "length": len(value), "lines": value.count("\n" if isinstance(value, str) else b"\n")}
+	if isinstance(value, Path):
+		return str(value)
+	if value is None or isinstance(value, (bool, int, float)):
+		return value
+	return type(value).__name__
+
+def _rotate(dump_dir: Path, keep: int):
+	profiles = sorted(dump_dir.glob("*.pstats"), key=lambda p: p.stat().st_mtime)
+	for profile in profiles[:max(0, len(profiles) - keep)]:
+		profile.unlink(missing_ok=True)
+		profile.with_suffix(".json").unlink(missing_ok=True)
+
+def _dump(profiler: cProfile.Profile, name: str, seconds: float, args: tuple, kwargs: Dict) -> Path:
+	dump_dir = _settings.dump_dir
+	dump_dir.mkdir(parents=True, exist_ok=True)
+	stem = dump_dir / f"{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 10**9:09d}-{os.getpid()}-{name}"
+	profiler.dump_stats(str(stem.with_suffix(".pstats")))
+	with open(stem.with_suffix(".json"), 'w') as f:
+		json.dump({
+			"function": name,
+			"seconds": seconds,
+			"args": [_describe(a) for a in args],
+			"kwargs": {k: _describe(v) for k, v in kwargs.items()}
+		}, f)
+	_rotate(dump_dir, _settings.keep)
+	return stem.with_suffix(".pstats")
+
+def profiled(name: str):
+	"""Decorator profiling calls with cProfile while capture is on, keeping only calls slower than the threshold.
+
+	With capture off it costs one attribute check per call.
+	"""
+	def decorate(function):
+		@functools.wraps(function)
+		def wrapper(*args, **kwargs):
+			if _settings.dump_dir is None or not _profiling.acquire(blocking=False):
+				return function(*args, **kwargs)
+			try:
+				profiler = cProfile.Profile()
+				try:
+					profiler.enable()
+				except ValueError:
+					return function(*args, **kwargs)  # Another profiler is already running
+				start = time.perf_counter()
+				try:
+					return function(*args, **kwargs)
+				finally:
+					profiler.disable()
+					seconds = time.perf_counter() - start
+					if seconds >= _settings.threshold:
+						try:
+							_dump(profiler, name, seconds, args, kwargs)
+						except OSError:
+							pass  # Losing a profile must never fail the call
+			finally:
+				_profiling.release()
+		return wrapper
+	return decorate
+
+configure_from_env()
@@ -0,0 +1,150 @@
+from bisect import bisect_right
+from pathlib import Path
+from typing import Optional, List, Dict
+from assistant_merger.classify import parse_summary
+from assistant_merger.git_tools import format_hunk_header, parse_hunks, parse_hunk_header, parse_llm_response, revert_operations
+
+PENDING = "pending"
+ACCEPTED = "accepted"
+
+def _refuse_summary(file_path: Path, diff: str):
+	summary = parse_summary(diff)
+	if summary:
+		raise ValueError(f"Can't review the {summary.group(1)} file {file_path} in rounds; decide it with apply_changes")
+
+class ReviewRound:
+	"""A file under multi-round review, re-emitting only hunks that still need a decision.
+
+	Hunks keep their change number from the first round. After apply, hunks
+	that were replaced come back as pending with their replacement as the new
+	side; rejected hunks drop out, and every other hunk's position is shifted
+	arithmetically instead of re-running git diff and add_change_numbers.
+	Summary diffs (binary, generated or huge files) have no lines to track
+	and raise ValueError; decide those with apply_changes.
+	"""
+	def __init__(self, file_path: Path, diff: str, content: Optional[str] = None):
+		_refuse_summary(file_path, diff)
+		self.file_path = file_path
+		if content is None:
+			with open(file_path, 'r') as f:
+				content = f.read()
+		self.file_lines = content.split("\n")
+		self.hunks: List[Dict[str, str]] = []
+		self.next_id = 1
+		self.round = 1
+		for hunk in parse_hunks(diff.splitlines()):
+			self._track(hunk["header"], hunk["content"], change_id=int(hunk["number"].split("#")[1]))
+
+	@property
+	def content(self) -> str:
+		return "\n".join(self.file_lines)
+
+	def _track(self, header: str, content: str, status: str = PENDING, change_id: Optional[int] = None) -> Dict[str, str]:
+		if change_id is None:
+			change_id = self.next_id
+		self.next_id = max(self.next_id, change_id + 1)
+		hunk = {"number": f"Change #{change_id}", "header": header, "content": content, "status": status}
+		self.hunks.append(hunk)
+		return hunk
+
+	def pending(self) -> List[Dict[str, str]]:
+		"""Hunks that still need a decision, in file order."""
+		return [h for h in self.hunks if h["status"] == PENDING]
+
+	def render(self, context_lines: int = 3, add_line_numbers: bool = False) -> str:
+		"""Render the pending hunks in add_change_numbers' format, each followed by a little context."""
+		pending = self.pending()
+		output = []
+		for i, hunk in enumerate(pending):
+			_, _, new_start, new_lines = parse_hunk_header(hunk["header"])
+			start = new_start if new_lines == 0 else new_start - 1 + new_lines
+			end = start + context_lines
+			if i + 1 < len(pending):
+				_, _, next_start, next_lines = parse_hunk_header(pending[i + 1]["header"])
+				end = min(end, next_start if next_lines == 0 else next_start - 1)
+			post_hunk_lines = self.file_lines[start:max(start, end)]
+			if add_line_numbers:
+				post_hunk_lines = [f"{start + j + 1:4d} {line}" for j, line in enumerate(post_hunk_lines)]
+			output += [
+				f"{hunk['header']} ({hunk['number']})",
+				hunk["content"],
+				f"@@ End {hunk['number']} Hunk @@"
+			] + post_hunk_lines
+		return "\n".join(output)
+
+	def apply(self, llm_response: str) -> str:
+		"""Apply decisions for pending hunks, update every hunk's position, and return the merged content."""
+		approvals = parse_llm_response(llm_response)
+		pending = self.pending()
+		operations = revert_operations(self.file_lines, pending, approvals)
+		reverted = [h for h in pending if approvals.get(h["number"], True) is not True and parse_hunk_header(h["header"])]
+
+		# Rebuild the file and remember how far each operation moved the lines after it
+		merged_lines = []
+		pos = 0
+		op_ends = []
+		op_deltas = []
+		delta = 0
+		replaced = {}
+		for (start, end, og_lines), hunk in zip(operations, reverted):
+			merged_lines.extend(self.file_lines[pos:start])
+			if isinstance(approvals[hunk["number"]], list):
+				replaced[hunk["number"]] = (len(merged_lines), og_lines)
+			merged_lines.extend(og_lines)
+			pos = max(pos, end)
+			delta += len(og_lines) - (end - start)
+			op_ends.append(end)
+			op_deltas.append(delta)
+		merged_lines.extend(self.file_lines[pos:])
+
+		def shift(index):
+			i = bisect_right(op_ends, index)
+			return index + (op_deltas[i - 1] if i else 0)
+
+		hunks = []
+		reverted_numbers = {h["number"] for h in reverted}
+		for hunk in self.hunks:
+			old_start, old_lines, new_start, new_lines = parse_hunk_header(hunk["header"])
+			if hunk["number"] in replaced:
+				start, replacement = replaced[hunk["number"]]
+				removed = [line for line in hunk["content"].splitlines() if line.startswith("-")]
+				if [line[1:] for line in removed] == replacement:
+					continue  # Replaced with the original, so it's just a rejection
+				hunk = dict(hunk, status=PENDING, content="\n".join(removed + [f"+{line}" for line in replacement]))
+				new_start = start + 1 if replacement else start
+				new_lines = len(replacement)
+			elif hunk["number"] in reverted_numbers:
+				continue
+			else:
+				if hunk["status"] == PENDING and approvals.get(hunk["number"]) is True:
+					hunk = dict(hunk, status=ACCEPTED)
+				new_start = shift(new_start) if new_lines == 0 else shift(new_start - 1) + 1
+			hunk["header"] = format_hunk_header(old_start, old_lines, new_start, new_lines)
+			hunks.append(hunk)
+		self.hunks = hunks
+		self.file_lines = merged_lines
+		self.round += 1
+		return self.content
+
+	def update(self, diff: str, content: Optional[str] = None) -> List[Dict[str, str]]:
+		"""Fold in a fresh diff after edits made outside the review, returning the hunks that became pending.
+
+		Hunks with the same old side and content as a tracked one keep its
+		number and status even if they moved; anything else is new and gets
+		the next change number.
+		"""
+		_refuse_summary(self.file_path, diff)
+		if content is None:
+			with open(self.file_path, 'r') as f:
+				content = f.read()
+		self.file_lines = content.split("\n")
+		known = {(parse_hunk_header(h["header"])[:2], h["content"]): h for h in self.hunks}
+		self.hunks = []
+		new_hunks = []
+		for hunk in parse_hunks(diff.splitlines()):
+			match = known.get((parse_hunk_header(hunk["header"])[:2], hunk["content"]))
+			if match:
+				self.hunks.append(dict(match, header=hunk["header"]))
+			else:
+				new_hunks.append(self._track(hunk["header"], hunk["content"]))
+		return new_hunks
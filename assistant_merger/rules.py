@@ -0,0 +1,176 @@
+import io
+import re
+import tokenize
+from dataclasses import dataclass
+from fnmatch import translate
+from pathlib import Path
+from typing import Optional, Tuple, List, Dict, Iterable
+from assistant_merger.git_tools import add_change_numbers, hunk_result_lines, parse_hunk_header
+
+@dataclass(frozen=True)
+class Rule:
+	"""A declarative pre-decision: when every condition that is set holds for a hunk, decide it.
+
+	paths are globs matched against the file's path (any may match). added
+	and removed are regexes every added or removed line must match, so
+	added='^\\s*#' catches added comments. whitespace_only matches hunks whose
+	sides differ only in whitespace, and same_tokens ones whose sides
+	tokenize to the same Python code once comments and blank lines are
+	dropped.
+	"""
+	decision: bool
+	paths: Tuple[str, ...] = ()
+	added: Optional[str] = None
+	removed: Optional[str] = None
+	whitespace_only: bool = False
+	same_tokens: bool = False
+
+def _sides(hunk: Dict[str, str]) -> Tuple[List[str], List[str]]:
+	removed, added = [], []
+	for line in hunk["content"].splitlines():
+		if line.startswith("-"):
+			removed.append(line[1:])
+		elif line.startswith("+"):
+			added.append(line[1:])
+	return removed, added
+
+def _without_whitespace(lines: List[str]) -> str:
+	"""Lines with whitespace dropped, except a single space where it separates two word characters.
+
+	So 'f(1,2)' and 'f(1, 2)' match, but 'import os' and 'importos' don't.
+	"""
+	return re.sub(r'(?<!\w) | (?!\w)', '', " ".join(" ".join(lines).split()))
+
+def _code_tokens(lines: List[str]) -> Optional[List[Tuple[int, str]]]:
+	"""Python tokens of lines, without comments or non-logical newlines, or None if they don't tokenize."""
+	ignored = (tokenize.COMMENT, tokenize.NL, tokenize.ENCODING)
+	try:
+		return [
+			(token.type, token.string)
+			for token in tokenize.generate_tokens(io.StringIO("\n".join(lines) + "\n").readline)
+			if token.type not in ignored
+		]
+	except (tokenize.TokenError, IndentationError, SyntaxError):
+		return None
+
+class _HunkFacts:
+	"""Per-hunk facts the rules test, each computed at most once however many rules ask."""
+	def __init__(self, hunk: Dict[str, str]):
+		self.removed, self.added = _sides(hunk)
+		self._whitespace_only = None
+		self._same_tokens = None
+
+	@property
+	def whitespace_only(self) -> bool:
+		if self._whitespace_only is None:
+			self._whitespace_only = _without_whitespace(self.removed) == _without_whitespace(self.added)
+		return self._whitespace_only
+
+	@property
+	def same_tokens(self) -> bool:
+		if self._same_tokens is None:
+			removed_tokens = _code_tokens(self.removed)
+			self._same_tokens = removed_tokens is not None and removed_tokens == _code_tokens(self.added)
+		return self._same_tokens
+
+class RuleSet:
+	"""Rules compiled for evaluation in one pass over a file's hunks; the first matching rule wins."""
+	def __init__(self, rules: Iterable[Rule]):
+		self.rules = list(rules)
+		self._compiled = [
+			(
+				rule,
+				re.compile("|".join(translate(glob) for glob in rule.paths)) if rule.paths else None,
+				re.compile(rule.added) if rule.added is not None else None,
+				re.compile(rule.removed) if rule.removed is not None else None
+			)
+			for rule in self.rules
+		]
+
+	def _matches(self, compiled: Tuple, facts: _HunkFacts) -> bool:
+		rule, _, added, removed = compiled
+		if added is not None and not (facts.added and all(added.search(line) for line in facts.added)):
+			return False
+		if removed is not None and not (facts.removed and all(removed.search(line) for line in facts.removed)):
+			return False
+		if rule.whitespace_only and not facts.whitespace_only:
+			return False
+		if rule.same_tokens and not facts.same_tokens:
+			return False
+		return True
+
+	def decide(self, path: str, hunks: Iterable[Dict[str, str]]) -> Dict[str, bool]:
+		"""Pre-decide hunks of the file at path (relative, '/'-separated), returning {change number: decision}."""
+		# Path globs are settled once per file, so the hunk loop only runs content tests
+		applicable = [c for c in self._compiled if c[1] is None or c[1].match(path)]
+		decisions = {}
+		if not applicable:
+			return decisions
+		for hunk in hunks:
+			if "number" not in hunk or not parse_hunk_header(hunk["header"]):
+				continue
+			facts = _HunkFacts(hunk)
+			for compiled in applicable:
+				if self._matches(compiled, facts):
+					decisions[hunk["number"]] = compiled[0].decision
+					break
+		return decisions
+
+def render_pending(diff: str, file_path: Path, decisions: Dict[str, bool], add_line_numbers: bool = False, content: Optional[str] = None) -> Tuple[str, List[Dict[str, str]]]:
+	"""Render like add_change_numbers, leaving out pre-decided hunks.
+
+	Each pre-decided hunk is shown as the lines its decision leaves in the
+	file, so the reviewer still reads the file as it will be. With
+	add_line_numbers, lines are numbered as in that file, so lines after a
+	rejected hunk move by the lines it restores. Returns the rendering and
+	the hunks that still need a decision.
+	"""
+	rendered, hunks = add_change_numbers(diff, file_path, add_line_numbers, content=content)
+	decided = {h["number"]: h for h in hunks if h.get("number") in decisions}
+	if not decided:
+		return rendered, hunks
+	lines = rendered.split("\n")
+	output = []
+	in_hunk = None
+	after_file_line = False
+	shift = 0  # Lines restored minus lines removed by the rejected hunks so far
+	for i, line in enumerate(lines):
+		if in_hunk is not None:
+			if in_hunk not in decided:
+				output.append(line)
+			if line == f"@@ End {in_hunk} Hunk @@":
+				in_hunk = None
+			continue
+		match = re.match(r'@@ .* @@ \((Change #\d+)\)$', line)
+		if match:
+			in_hunk = match.group(1)
+			if in_hunk not in decided:
+				output.append(line)
+				after_file_line = False
+				continue
+			hunk = decided[in_hunk]
+			resolved = hunk_result_lines(hunk, decisions[in_hunk])
+			_, _, new_start, new_lines = parse_hunk_header(hunk["header"])
+			end = lines.index(f"@@ End {in_hunk} Hunk @@", i)
+			if new_lines and after_file_line and (end + 1 == len(lines) or re.match(r'@@ .* @@ \(Change #\d+\)$', lines[end + 1])):
+				# Nothing follows this hunk, so add_change_numbers showed its first new line before it
+				output.pop()
+			if add_line_numbers:
+				start = (new_start if new_lines else new_start + 1) + shift
+				resolved = [f"{start + n:4d} {l}" for n, l in enumerate(resolved)]
+			output.extend(resolved)
+			shift += len(resolved) - new_lines
+			after_file_line = False
+			continue
+		numbered = re.match(r' *(\d+) ', line) if add_line_numbers and shift else None
+		if numbered:
+			line = f"{int(numbered.group(1)) + shift:4d} {line[numbered.end():]}"
+		output.append(line)
+		after_file_line = True
+	return "\n".join(output), [h for h in hunks if h.get("number") not in decided]
+
+def merge_decisions(llm_response: str, decisions: Dict[str, bool]) -> str:
+	"""Add pre-decisions to an LLM response for apply_changes; they override any answer for the same hunk."""
+	lines = [llm_response.strip()] if llm_response.strip() else []
+	lines += [f"{number}, {'Yes' if decision else 'No'}" for number, decision in decisions.items()]
+	return "\n".join(lines)
@@ -0,0 +1,157 @@
+import re
+import sqlite3
+import subprocess
+from pathlib import Path
+from typing import Optional, List, Dict, Iterable
+from assistant_merger.git_tools import find_git_repo, get_git_diffs, parse_hunks, parse_llm_response
+from assistant_merger.changeset import content_hash
+
+SESSION_NAME = "assistant_merger_session_{}.sqlite"
+MISSING_HASH = "missing"
+
+def _index_blobs(repo_path: Path, relative_paths: List[str]) -> Dict[str, str]:
+	"""{relative path: its index blob id(s)} from one 'git ls-files', so staging a file shows as a change."""
+	result = subprocess.run(
+		["git", "ls-files", "-s", "-z", "--"] + relative_paths,
+		cwd=repo_path,
+		capture_output=True,
+		check=True
+	)
+	blobs = {}
+	for record in result.stdout.decode("utf-8", "surrogateescape").split("\0"):
+		info, _, path = record.partition("\t")
+		fields = info.split()
+		if len(fields) == 3:
+			# A conflicted path has one entry per stage
+			blobs[path] = f"{blobs[path]},{fields[1]}" if path in blobs else fields[1]
+	return blobs
+
+class ReviewSession:
+	"""Review state of a large changeset kept in SQLite (WAL), so a restarted process picks up where it stopped.
+
+	Holds each file's content hash, diff and parsed hunks, every decision
+	recorded so far (as the text after 'Change #N') and which batches are
+	done. Each record() is its own transaction, so a crash loses at most
+	the response being recorded. sync() only re-diffs files whose content
+	or index entry changed since they were stored, and forgets their old
+	decisions.
+	"""
+	def __init__(self, db_path: Path, repo_path: Path):
+		self.db_path = db_path
+		self.repo_path = repo_path
+		self.db = sqlite3.connect(str(db_path))
+		self.db.execute("PRAGMA journal_mode=WAL")
+		self.db.execute("PRAGMA synchronous=NORMAL")
+		self.db.executescript(
+			"CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, content_hash TEXT, diff TEXT, error TEXT);"
+			"CREATE TABLE IF NOT EXISTS hunks (path TEXT, number TEXT, header TEXT, content TEXT, position INTEGER, PRIMARY KEY (path, number));"
+			"CREATE TABLE IF NOT EXISTS decisions (path TEXT, number TEXT, decision TEXT, PRIMARY KEY (path, number));"
+			"CREATE TABLE IF NOT EXISTS batches (batch TEXT PRIMARY KEY);"
+		)
+		self.db.commit()
+
+	@classmethod
+	def for_file(cls, file_path: Path, name: str = "default") -> "ReviewSession":
+		"""Open the named session of the repository containing file_path."""
+		repo_path = find_git_repo(file_path)
+		if not repo_path:
+			raise ValueError(f"No git repository found for {file_path}")
+		return cls(repo_path / ".git" / SESSION_NAME.format(name), repo_path)
+
+	def close(self):
+		self.db.close()
+
+	def _key(self, file_path: Path) -> str:
+		return file_path.relative_to(self.repo_path).as_posix()
+
+	def sync(self, paths: Iterable[Path]) -> List[Path]:
+		"""Bring the stored diffs up to date with the files on disk and the index, returning the files that were (re-)diffed.
+
+		Every file's index blob comes from one 'git ls-files', and the changed
+		files are re-diffed by one git process.
+		"""
+		keys = {file_path: self._key(file_path) for file_path in paths}
+		if not keys:
+			return []
+		stored = dict(self.db.execute("SELECT path, content_hash FROM files"))
+		index_blobs = _index_blobs(self.repo_path, list(keys.values()))
+		states = {}
+		for file_path, key in keys.items():
+			try:
+				digest = content_hash(file_path.read_bytes())
+			except FileNotFoundError:
+				# A deleted file is still diffed, since git reports the deletion
+				digest = MISSING_HASH
+			state = f"{digest} {index_blobs.get(key, '')}"
+			if stored.get(key) != state:
+				states[file_path] = state
+		if not states:
+			return []
+		results = get_git_diffs(self.repo_path, [keys[file_path] for file_path in states])
+		with self.db:
+			for file_path, state in states.items():
+				key = keys[file_path]
+				diff, error = results[key]
+				self.db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", (key, state, diff, error))
+				self.db.execute("DELETE FROM hunks WHERE path = ?", (key,))
+				self.db.execute("DELETE FROM decisions WHERE path = ?", (key,))
+				self.db.executemany(
+					"INSERT INTO hunks VALUES (?, ?, ?, ?, ?)",
+					[(key, h["number"], h["header"], h["content"], i) for i, h in enumerate(parse_hunks(diff.splitlines()))]
+				)
+		return list(states)
+
+	def diff(self, file_path: Path) -> Optional[str]:
+		row = self.db.execute("SELECT diff FROM files WHERE path = ?", (self._key(file_path),)).fetchone()
+		return row[0] if row else None
+
+	def error(self, file_path: Path) -> Optional[str]:
+		row = self.db.execute("SELECT error FROM files WHERE path = ?", (self._key(file_path),)).fetchone()
+		return row[0] if row else None
+
+	def hunks(self, file_path: Path) -> List[Dict[str, str]]:
+		"""The stored hunks of a file, as parse_hunks gave them."""
+		rows = self.db.execute("SELECT number, header, content FROM hunks WHERE path = ? ORDER BY position", (self._key(file_path),))
+		return [{"number": number, "header": header, "content": content} for number, header, content in rows]
+
+	def pending(self) -> Dict[Path, List[Dict[str, str]]]:
+		"""Hunks without a recorded decision, by file."""
+		rows = self.db.execute(
+			"SELECT h.path, h.number, h.header, h.content FROM hunks h "
+			"LEFT JOIN decisions d ON d.path = h.path AND d.number = h.number "
+			"WHERE d.decision IS NULL ORDER BY h.path, h.position"
+		)
+		pending = {}
+		for path, number, header, content in rows:
+			pending.setdefault(self.repo_path / path, []).append({"number": number, "header": header, "content": content})
+		return pending
+
+	def record(self, file_path: Path, llm_response: str):
+		"""Commit the decisions of one response for a file."""
+		key = self._key(file_path)
+		numbers = {h["number"] for h in self.hunks(file_path)}
+		decisions = []
+		for line in llm_response.strip().splitlines():
+			match = re.match(r'Change #(\d+)(,.*)', line.strip())
+			number = f"Change #{int(match.group(1))}" if match else None
+			if number in numbers and parse_llm_response(line.strip()):
+				decisions.append((key, number, match.group(2)))
+		with self.db:
+			self.db.executemany("INSERT OR REPLACE INTO decisions VALUES (?, ?, ?)", decisions)
+
+	def response(self, file_path: Path) -> str:
+		"""Every decision recorded for a file, as a response for apply_changes."""
+		rows = self.db.execute(
+			"SELECT d.number, d.decision FROM decisions d JOIN hunks h ON h.path = d.path AND h.number = d.number "
+			"WHERE d.path = ? ORDER BY h.position",
+			(self._key(file_path),)
+		)
+		return "\n".join(f"{number}{decision}" for number, decision in rows)
+
+	def finish_batch(self, batch: str):
+		"""Mark a batch of work (e.g. one LLM call) as done."""
+		with self.db:
+			self.db.execute("INSERT OR IGNORE INTO batches VALUES (?)", (batch,))
+
+	def batch_done(self, batch: str) -> bool:
+		return self.db.execute("SELECT 1 FROM batches WHERE batch = ?", (batch,)).fetchone() is not None
@@ -0,0 +1,135 @@
+import json
+from pathlib import Path
+from typing import Optional, List, Dict, Iterable, Iterator, Union
+from assistant_merger.git_tools import PartialDecision, apply_decisions, parse_hunks, parse_hunk_header
+from assistant_merger.classify import parse_summary
+
+try:
+	import msgpack
+except ImportError:
+	msgpack = None
+
+def diff_records(diff: str, file_path: Path, content: Optional[str] = None) -> Iterator[Dict[str, object]]:
+	"""Describe a file's diff as plain records instead of add_change_numbers' text, in one pass over its hunks.
+
+	Yields a "file" record, then one "hunk" record per hunk with its change
+	number, old/new ranges, removed and added lines, whether either side
+	lacks a final newline, and the 1-based range of unchanged new-side lines
+	after it up to the next hunk (None when there are none). Summary diffs
+	yield a single hunk record with their kind and blob ids instead of lines.
+	"""
+	summary = parse_summary(diff)
+	if summary:
+		yield {"type": "file", "path": str(file_path), "summary": True}
+		hunk = next(parse_hunks(diff.splitlines()))
+		yield {
+			"type": "hunk",
+			"change": 1,
+			"kind": summary.group(1),
+			"old_blob": summary.group(2),
+			"new_blob": summary.group(3),
+			"description": hunk["content"][2:]
+		}
+		return
+
+	if content is None:
+		with open(file_path, 'r', errors='surrogateescape') as f:
+			content = f.read()
+	line_count = content.count("\n") + (0 if content.endswith("\n") or not content else 1)
+	yield {"type": "file", "path": str(file_path), "summary": False, "lines": line_count}
+
+	# Each hunk's context runs up to the next hunk, so records go out one hunk behind
+	previous = None
+	for hunk in parse_hunks(diff.splitlines()):
+		parsed = parse_hunk_header(hunk["header"])
+		if not parsed:
+			continue
+		record = _hunk_record(hunk, parsed)
+		if previous is not None:
+			yield _with_context(previous, record["new_first"] - 1)
+		previous = record
+	if previous is not None:
+		yield _with_context(previous, line_count)
+
+def _hunk_record(hunk: Dict[str, str], parsed) -> Dict[str, object]:
+	old_start, old_lines, new_start, new_lines = parsed
+	removed, added = [], []
+	old_no_newline = new_no_newline = False
+	last = None
+	for line in hunk["content"].splitlines():
+		if line.startswith("\\"):
+			if last is removed:
+				old_no_newline = True
+			elif last is added:
+				new_no_newline = True
+		elif line.startswith("-"):
+			removed.append(line[1:])
+			last = removed
+		elif line.startswith("+"):
+			added.append(line[1:])
+			last = added
+	return {
+		"type": "hunk",
+		"change": int(hunk["number"].split("#")[1]),
+		"old_start": old_start,
+		"old_lines": old_lines,
+		"new_start": new_start,
+		"new_lines": new_lines,
+		"removed": removed,
+		"added": added,
+		"old_no_newline": old_no_newline,
+		"new_no_newline": new_no_newline,
+		"new_first": new_start if new_lines else new_start + 1
+	}
+
+def _with_context(record: Dict[str, object], context_last: int) -> Dict[str, object]:
+	first = record.pop("new_first") + record["new_lines"]
+	record["context"] = [first, context_last] if context_last >= first else None
+	return record
+
+def to_jsonl(records: Iterable[Dict[str, object]]) -> str:
+	"""Serialize records as JSON lines."""
+	return "".join(json.dumps(record) + "\n" for record in records)
+
+def from_jsonl(text: str) -> Iterator[Dict[str, object]]:
+	"""Read records back from JSON lines, e.g. decision records from a downstream service."""
+	for line in text.splitlines():
+		if line.strip():
+			yield json.loads(line)
+
+def to_msgpack(records: Iterable[Dict[str, object]]) -> bytes:
+	"""Serialize records as a stream of msgpack objects; needs the optional msgpack package."""
+	if msgpack is None:
+		raise ImportError("msgpack is not installed")
+	packer = msgpack.Packer(unicode_errors="surrogateescape")
+	return b"".join(packer.pack(record) for record in records)
+
+def parse_decision_records(records: Iterable[Dict[str, object]]) -> Dict[str, Union[bool, List[str], PartialDecision]]:
+	"""Turn structured decisions into what apply_decisions takes, with no response text to parse.
+
+	Each record names its "change" and holds exactly one of "accept" (bool),
+	"replace" (lines), "reject_lines" or "accept_lines" (1-based hunk body
+	line numbers, as in PartialDecision). A record without a decision or
+	with a non-bool "accept" (e.g. "no") raises ValueError naming its line,
+	counted from 1 as from_jsonl reads them.
+	"""
+	approvals = {}
+	for line, record in enumerate(records, 1):
+		number = f"Change #{int(record['change'])}"
+		if "replace" in record:
+			approvals[number] = list(record["replace"])
+		elif "reject_lines" in record:
+			approvals[number] = PartialDecision(frozenset(record["reject_lines"]))
+		elif "accept_lines" in record:
+			approvals[number] = PartialDecision(frozenset(record["accept_lines"]), True)
+		elif "accept" in record:
+			if not isinstance(record["accept"], bool):
+				raise ValueError(f"Decision record on line {line} for {number}: accept must be true or false, not {record['accept']!r}")
+			approvals[number] = record["accept"]
+		else:
+			raise ValueError(f"Decision record on line {line} for {number} has no decision")
+	return approvals
+
+def apply_structured(file_path: Path, diff: str, decisions: Iterable[Dict[str, object]], content: Optional[str] = None) -> str:
+	"""apply_changes driven by decision records instead of an LLM response."""
+	return apply_decisions(file_path, diff, parse_decision_records(decisions), content)
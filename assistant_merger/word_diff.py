@@ -0,0 +1,80 @@
+import re
+import time
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional
+
+TOKEN_PATTERN = re.compile(r'\w+|\s+|[^\w\s]')
+WORD_DIFF_PREFIX = "*"
+MIN_SIMILARITY = 0.5  # Pairs sharing less than this are clearer as plain -/+ lines
+HUNK_TIME_LIMIT = 0.05  # Seconds per hunk before the remaining pairs are left as plain lines
+
+def _intern(line: str, table: Dict[str, int]) -> List[int]:
+	"""Tokenize line into ids, so the matcher compares small ints instead of strings."""
+	return [table.setdefault(token, len(table)) for token in TOKEN_PATTERN.findall(line)]
+
+def word_diff_line(old: str, new: str, table: Optional[Dict[str, int]] = None) -> Optional[str]:
+	"""Render one changed line as '{-old-}{+new+}' edits inline, or None if that wouldn't help.
+
+	Returns None when the lines share too little, when either already holds
+	the markers, or when the inline form isn't shorter than '-old' plus '+new'.
+	"""
+	if any(marker in line for line in (old, new) for marker in ("{-", "-}", "{+", "+}")):
+		return None
+	table = {} if table is None else table
+	old_tokens, new_tokens = TOKEN_PATTERN.findall(old), TOKEN_PATTERN.findall(new)
+	matcher = SequenceMatcher(None, _intern(old, table), _intern(new, table), autojunk=False)
+	if matcher.ratio() < MIN_SIMILARITY:
+		return None
+	parts = []
+	for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+		if tag == "equal":
+			parts.append("".join(old_tokens[i1:i2]))
+			continue
+		if i2 > i1:
+			parts.append("{-" + "".join(old_tokens[i1:i2]) + "-}")
+		if j2 > j1:
+			parts.append("{+" + "".join(new_tokens[j1:j2]) + "+}")
+	rendered = "".join(parts)
+	if len(rendered) + 1 >= len(old) + len(new) + 3:
+		return None
+	return rendered
+
+def word_diff_hunk(content: str, time_limit: float = HUNK_TIME_LIMIT) -> str:
+	"""Render a hunk body with paired -/+ lines folded into '*' lines of inline word edits.
+
+	Removed and added lines are paired up in order within each run the
+	line-level diff replaces, and kept only if word_diff_line folds them.
+	Pairs are worked through until time_limit runs out; the rest of the
+	hunk is left as it was.
+	"""
+	body = content.split("\n")
+	if any(line.startswith("\\") for line in body):
+		return content
+	removed = [line[1:] for line in body if line.startswith("-")]
+	added = [line[1:] for line in body if line.startswith("+")]
+	if not removed or not added or len(removed) + len(added) != len(body):
+		return content
+
+	deadline = time.perf_counter() + time_limit
+	table = {}
+	# Paired lines, keyed by index into removed, replace their '-' line; their '+' line is dropped
+	paired = {}
+	for tag, i1, i2, j1, j2 in SequenceMatcher(None, removed, added, autojunk=False).get_opcodes():
+		if tag != "replace":
+			continue
+		for i, j in zip(range(i1, i2), range(j1, j2)):
+			if time.perf_counter() > deadline:
+				break
+			rendered = word_diff_line(removed[i], added[j], table)
+			if rendered is not None:
+				paired[i] = (j, rendered)
+	if not paired:
+		return content
+
+	dropped = {j for j, _ in paired.values()}
+	lines = [
+		f"{WORD_DIFF_PREFIX}{paired[i][1]}" if i in paired else f"-{line}"
+		for i, line in enumerate(removed)
+	]
+	lines += [f"+{line}" for j, line in enumerate(added) if j not in dropped]
+	return "\n".join(lines)
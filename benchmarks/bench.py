@@ -0,0 +1,127 @@
+"""Measure how get_git_diff, add_change_numbers and apply_changes scale on synthetic repos.
+
+Run from the repository root, e.g.:
+
+	python -m benchmarks.bench --files 200 --lines 2000 --hunks 20 --reject-ratio 0.3
+	python -m benchmarks.bench --compare benchmarks/results/<earlier>.json
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import subprocess
+from pathlib import Path
+from typing import Optional, List, Dict, Callable
+from assistant_merger.git_tools import get_git_diff, add_change_numbers, apply_changes
+from benchmarks.synthetic import make_repo, make_response
+
+STAGES = ("get_git_diff", "add_change_numbers", "apply_changes")
+RESULTS_DIR = Path(__file__).parent / "results"
+REGRESSION_RATIO = 1.2  # Slower than this multiple of the baseline is flagged
+
+def _percentile(values: List[float], fraction: float) -> float:
+	ordered = sorted(values)
+	return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+def _peak_memory(call: Callable[[], object]) -> int:
+	"""Peak bytes traced while running call, measured separately from timing."""
+	tracemalloc.start()
+	try:
+		call()
+		return tracemalloc.get_traced_memory()[1]
+	finally:
+		tracemalloc.stop()
+
+def run(files: int, lines: int, hunks: int, hunk_size: int, reject_ratio: float, repeat: int = 3, seed: int = 0, memory: bool = True) -> Dict[str, object]:
+	"""Build a synthetic repo and time every stage over all its files, returning the result record."""
+	rng = random.Random(seed)
+	with tempfile.TemporaryDirectory(prefix="assistant_merger_bench_") as temp_dir:
+		paths = make_repo(Path(temp_dir) / "repo", files, lines, hunks, hunk_size, seed)
+		input_bytes = sum(p.stat().st_size for p in paths)
+
+		# Inputs for later stages come from one untimed pass; without classify_files
+		# a big file still gets its full diff instead of a one-line huge summary
+		diffs = {p: get_git_diff(p, classify_files=False)[0] for p in paths}
+		rendered = {p: add_change_numbers(diffs[p], p) for p in paths}
+		responses = {p: make_response(rendered[p][1], reject_ratio, rng) for p in paths}
+		calls = {
+			"get_git_diff": lambda p: get_git_diff(p, classify_files=False),
+			"add_change_numbers": lambda p: add_change_numbers(diffs[p], p),
+			"apply_changes": lambda p: apply_changes(p, diffs[p], responses[p])
+		}
+
+		stages = {}
+		for stage in STAGES:
+			latencies = []
+			for _ in range(repeat):
+				for path in paths:
+					start = time.perf_counter()
+					calls[stage](path)
+					latencies.append(time.perf_counter() - start)
+			total = sum(latencies) / repeat
+			stages[stage] = {
+				"seconds": total,
+				"files_per_second": files / total if total else None,
+				"mb_per_second": input_bytes / total / 1e6 if total else None,
+				"p50_ms": _percentile(latencies, 0.5) * 1e3,
+				"p95_ms": _percentile(latencies, 0.95) * 1e3,
+				"peak_memory_bytes": max(_peak_memory(lambda: calls[stage](p)) for p in paths) if memory else None
+			}
+		hunk_count = sum(len(r[1]) for r in rendered.values())
+	return {
+		"params": {"files": files, "lines": lines, "hunks": hunks, "hunk_size": hunk_size, "reject_ratio": reject_ratio, "repeat": repeat, "seed": seed},
+		"input_bytes": input_bytes,
+		"hunk_count": hunk_count,
+		"stages": stages,
+		"version": _version(),
+		"python": platform.python_version(),
+		"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")
+	}
+
+def _version() -> Optional[str]:
+	result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent, capture_output=True, text=True)
+	return result.stdout.strip() or None
+
+def compare(result: Dict[str, object], baseline: Dict[str, object]) -> List[str]:
+	"""Describe stages that got slower than REGRESSION_RATIO times the baseline."""
+	regressions = []
+	for stage, numbers in result["stages"].items():
+		before = baseline.get("stages", {}).get(stage)
+		if before and before["seconds"] and numbers["seconds"] / before["seconds"] > REGRESSION_RATIO:
+			regressions.append(f"{stage}: {before['seconds']:.4f}s -> {numbers['seconds']:.4f}s ({numbers['seconds'] / before['seconds']:.2f}x)")
+	return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("--files", type=int, default=50)
+	parser.add_argument("--lines", type=int, default=1000)
+	parser.add_argument("--hunks", type=int, default=10)
+	parser.add_argument("--hunk-size", type=int, default=3)
+	parser.add_argument("--reject-ratio", type=float, default=0.3)
+	parser.add_argument("--repeat", type=int, default=3)
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+	parser.add_argument("--output", type=Path, default=None, help=f"result file (default: a new file in {RESULTS_DIR})")
+	parser.add_argument("--compare", type=Path, default=None, help="earlier result file to check for regressions")
+	args = parser.parse_args(argv)
+
+	result = run(args.files, args.lines, args.hunks, args.hunk_size, args.reject_ratio, args.repeat, args.seed, not args.no_memory)
+	output = args.output or RESULTS_DIR / f"{result['timestamp'].replace(':', '')}-{result['version'] or 'unknown'}.json"
+	output.parent.mkdir(parents=True, exist_ok=True)
+	output.write_text(json.dumps(result, indent=2) + "\n")
+	for stage, numbers in result["stages"].items():
+		print(f"{stage:20} {numbers['seconds']:8.4f}s  p50 {numbers['p50_ms']:7.2f}ms  p95 {numbers['p95_ms']:7.2f}ms  peak {numbers['peak_memory_bytes'] or 0:>10} B")
+	print(f"Results written to {output}")
+	if args.compare:
+		regressions = compare(result, json.loads(args.compare.read_text()))
+		for regression in regressions:
+			print(f"Regression: {regression}")
+		return 1 if regressions else 0
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,260 @@
+"""Fuzz apply_changes against git apply of the chosen hunks, and check its runtime grows linearly with file size.
+
+Run from the repository root, e.g.:
+
+	python -m benchmarks.fuzz --cases 500 --seed 1
+	python -m benchmarks.fuzz --cases 0 --sizes 2000,8000,32000,128000
+"""
+import gc
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Union
+from assistant_merger.git_tools import get_git_diff, add_change_numbers, apply_changes, parse_llm_response, parse_hunk_header, PartialDecision
+from assistant_merger.bytes_mode import get_git_diff_bytes, apply_changes_bytes
+from assistant_merger.patch import build_reject_patch, apply_patch
+
+# Few distinct lines, so git has repeated lines to choose between when aligning
+VOCABULARY = ("", "pass", "x = 1", "x = 2", "return x", "def f(x):", "    if x:", "    else:", "# note", "}")
+NO_NEWLINE = "\\ No newline at end of file"
+MAX_EXPONENT = 1.3  # Runtime growing faster than size ** this across the sizes is flagged
+
+@dataclass
+class Case:
+	"""One fuzz input: two versions of a file and a response deciding every hunk between them."""
+	v1: str
+	v2: str
+	response: str = ""
+
+def _text(lines: List[str], newline: bool) -> str:
+	return "\n".join(lines) + ("\n" if newline and lines else "")
+
+def _new_lines(rng: random.Random) -> List[str]:
+	return [rng.choice(VOCABULARY) + rng.choice(("", "  # new", " + 1")) for _ in range(rng.randint(1, 3))]
+
+def make_case(rng: random.Random, lines: int, density: float = 0.2) -> Case:
+	"""Random v1 of lines lines and a v2 that deletes, replaces or inserts around about density of them.
+
+	Either version may end without a newline, and dense edits leave hunks a
+	single line apart.
+	"""
+	v1 = [rng.choice(VOCABULARY) for _ in range(max(1, lines))]
+	v2 = []
+	for line in v1:
+		roll = rng.random()
+		if roll < density / 3:
+			continue  # Deleted
+		if roll < density * 2 / 3:
+			v2.extend(_new_lines(rng))  # Replaced
+			continue
+		if roll < density:
+			v2.extend(_new_lines(rng))  # Inserted before
+		v2.append(line)
+	if rng.random() < density:
+		v2.extend(_new_lines(rng))
+	return Case(_text(v1, rng.random() > 0.3), _text(v2, rng.random() > 0.3))
+
+def _body(hunk: Dict[str, str]) -> List[str]:
+	return [line for line in hunk["content"].splitlines() if line]
+
+def make_response(rng: random.Random, hunks: List[Dict[str, str]]) -> str:
+	"""Accept, reject, replace or partly accept each hunk at random.
+
+	Hunks touching a missing newline only get whole decisions, since which
+	line should end the file is ambiguous once their lines are mixed.
+	"""
+	decisions = []
+	for hunk in hunks:
+		roll = rng.random()
+		body = _body(hunk)
+		if roll < 0.3:
+			decisions.append(f"{hunk['number']}, Yes")
+		elif roll < 0.6:
+			decisions.append(f"{hunk['number']}, No")
+		elif roll < 0.8 or NO_NEWLINE in body:
+			replacement = "\\n".join(_new_lines(rng))
+			decisions.append(f"{hunk['number']}, <Merge_Replace_Hunk>{replacement}</Merge_Replace_Hunk>")
+		else:
+			picked = sorted(rng.sample(range(1, len(body) + 1), rng.randint(1, len(body))))
+			decisions.append(f"{hunk['number']}, {rng.choice(('Yes', 'No'))} except {', '.join(map(str, picked))}")
+	return "\n".join(decisions)
+
+def _reference_hunk(hunk: Dict[str, str], decision: Union[bool, List[str], PartialDecision]) -> List[str]:
+	"""The body of the hunk git apply should apply to v1 for decision, with the header's new side left to fix up."""
+	body = _body(hunk)
+	if decision is True:
+		return body
+	if isinstance(decision, list):
+		# A replacement stands in for the hunk's new lines, and ends the file without a newline if they did
+		replaced = [line for i, line in enumerate(body) if line[0] == '-' or line == NO_NEWLINE and body[i - 1][0] == '-']
+		lacks_newline = any(line == NO_NEWLINE and body[i - 1][0] == '+' for i, line in enumerate(body))
+		return replaced + ["+" + line for line in decision] + ([NO_NEWLINE] if lacks_newline else [])
+	result = []
+	for number, line in enumerate(body, 1):
+		if decision.rejects(number):
+			if line[0] == '-':
+				result.append(" " + line[1:])  # Kept as it was
+		else:
+			result.append(line)
+	return result
+
+def reference_patch(hunks: List[Dict[str, str]], response: str) -> str:
+	"""The --unidiff-zero patch turning v1 into what response asks for, built only from the chosen hunks."""
+	decisions = parse_llm_response(response)
+	patch = ["--- a/file.txt", "+++ b/file.txt"]
+	offset = 0
+	for hunk in hunks:
+		decision = decisions.get(hunk["number"], True)
+		if decision is False:
+			continue
+		body = _reference_hunk(hunk, decision)
+		if not any(line[0] in "+-" for line in body):
+			continue
+		old_start, old_lines, _, _ = parse_hunk_header(hunk["header"])
+		new_lines = sum(1 for line in body if line[0] in " +")
+		# An insertion's old start names the line before it. A deletion keeps its own position rather than
+		# the line before, which git apply would search from and could match the wrong copy of a repeated line
+		new_start = old_start + offset + (1 if old_lines == 0 else 0)
+		offset += new_lines - old_lines
+		patch.append(f"@@ -{old_start},{old_lines} +{new_start},{new_lines} @@")
+		patch.extend(body)
+	return "\n".join(patch) + "\n"
+
+def git_apply(content: str, patch: str, work_dir: Path) -> str:
+	"""content with patch applied by git apply, outside any repo."""
+	if "\n@@" not in patch:
+		return content  # Every hunk rejected
+	work_dir.mkdir(parents=True, exist_ok=True)
+	target = work_dir / "file.txt"
+	target.write_bytes(content.encode())
+	(work_dir / "change.patch").write_bytes(patch.encode())
+	subprocess.run(["git", "apply", "--unidiff-zero", "change.patch"], cwd=work_dir, check=True, capture_output=True)
+	return target.read_bytes().decode()
+
+class _Workspace:
+	"""A scratch repo whose one file is staged as v1 and rewritten as v2 for each case, plus a directory for git apply."""
+	def __init__(self, root: Path):
+		self.repo = root / "repo"
+		self.scratch = root / "scratch"
+		self.repo.mkdir(parents=True)
+		subprocess.run(["git", "init", "-q"], cwd=self.repo, check=True)
+		self.path = self.repo / "file.txt"
+
+	def diff(self, case: Case) -> str:
+		self.path.write_bytes(case.v1.encode())
+		subprocess.run(["git", "add", "file.txt"], cwd=self.repo, check=True)
+		self.path.write_bytes(case.v2.encode())
+		diff, error = get_git_diff(self.path, classify_files=False)
+		return "" if error else diff
+
+def check_case(workspace: _Workspace, case: Case, rng: random.Random) -> Optional[Dict[str, str]]:
+	"""Decide case's hunks at random (setting case.response) and compare every apply path with git apply; None if they agree."""
+	diff = workspace.diff(case)
+	if not diff:
+		return None  # No changes to decide
+	hunks = add_change_numbers(diff, workspace.path)[1]
+	case.response = make_response(rng, hunks)
+	patch = reference_patch(hunks, case.response)
+	record = {"v1": case.v1, "v2": case.v2, "response": case.response, "diff": diff, "patch": patch}
+	try:
+		expected = git_apply(case.v1, patch, workspace.scratch)
+	except subprocess.CalledProcessError as e:
+		return dict(record, error=f"git apply rejected the reference patch: {e.stderr.decode().strip()}")
+	# The bytes and reject-patch paths must agree too
+	results = {
+		"apply_changes": lambda: apply_changes(workspace.path, diff, case.response),
+		"apply_changes_bytes": lambda: apply_changes_bytes(workspace.path, get_git_diff_bytes(workspace.path, classify_files=False)[0], case.response).decode(),
+		"apply_patch": lambda: apply_patch(case.v2, build_reject_patch(workspace.path, diff, case.response))
+	}
+	for name, result in results.items():
+		try:
+			actual = result()
+		except Exception as e:
+			return dict(record, error=f"{name} raised {e!r}")
+		if actual != expected:
+			return dict(record, error=f"{name} differs from git apply", expected=expected, actual=actual)
+	return None
+
+def fuzz(cases: int, max_lines: int = 40, seed: int = 0) -> List[Dict[str, str]]:
+	"""Check cases random cases of up to max_lines lines, returning a record for each disagreement."""
+	failures = []
+	with tempfile.TemporaryDirectory(prefix="assistant_merger_fuzz_") as temp_dir:
+		workspace = _Workspace(Path(temp_dir))
+		for i in range(cases):
+			# Each case has its own seed so a failure can be replayed alone
+			rng = random.Random(f"{seed}:{i}")
+			failure = check_case(workspace, make_case(rng, rng.randint(1, max_lines), rng.choice((0.05, 0.2, 0.5))), rng)
+			if failure:
+				failures.append(dict(failure, seed=seed, case=i))
+	return failures
+
+def scaling(sizes: List[int], density: float = 0.02, repeat: int = 5, seed: int = 0) -> List[Dict[str, object]]:
+	"""Time apply_changes (best of repeat) on one random case per size, also checking each against git apply."""
+	records = []
+	with tempfile.TemporaryDirectory(prefix="assistant_merger_fuzz_") as temp_dir:
+		workspace = _Workspace(Path(temp_dir))
+		for lines in sizes:
+			rng = random.Random(f"{seed}:scaling:{lines}")
+			case = make_case(rng, lines, density)
+			failure = check_case(workspace, case, rng)
+			diff = workspace.diff(case)
+			seconds = min(_time(lambda: apply_changes(workspace.path, diff, case.response)) for _ in range(repeat))
+			records.append({"lines": lines, "seconds": seconds, "agrees": failure is None})
+	return records
+
+def growth_exponent(records: List[Dict[str, object]]) -> Optional[float]:
+	"""The k for which runtime best fits size ** k, by least squares on log-log axes.
+
+	Fitting every size at once keeps one noisy timing from flagging the run.
+	"""
+	points = [(math.log(r["lines"]), math.log(r["seconds"])) for r in records if r["seconds"] > 0]
+	if len(points) < 2:
+		return None
+	mean_x = sum(x for x, _ in points) / len(points)
+	mean_y = sum(y for _, y in points) / len(points)
+	spread = sum((x - mean_x) ** 2 for x, _ in points)
+	return sum((x - mean_x) * (y - mean_y) for x, y in points) / spread if spread else None
+
+def _time(call) -> float:
+	gc.collect()  # Don't charge one call for garbage left by the last
+	start = time.perf_counter()
+	call()
+	return time.perf_counter() - start
+
+def main(argv: Optional[List[str]] = None) -> int:
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("--cases", type=int, default=200)
+	parser.add_argument("--max-lines", type=int, default=40)
+	parser.add_argument("--sizes", default="2000,8000,32000,128000", help="comma separated file sizes in lines for the scaling check ('' to skip)")
+	parser.add_argument("--max-exponent", type=float, default=MAX_EXPONENT, help="fail when runtime grows faster than size ** this")
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--output", type=Path, default=None, help="write failing cases here as JSON")
+	args = parser.parse_args(argv)
+
+	failures = fuzz(args.cases, args.max_lines, args.seed)
+	print(f"{args.cases} cases, {len(failures)} disagreeing with git apply")
+	for failure in failures[:5]:
+		print(f"  case {failure['case']} (seed {failure['seed']}): {failure['error']}")
+	slow = False
+	if args.sizes:
+		records = scaling([int(n) for n in args.sizes.split(",")], seed=args.seed)
+		for record in records:
+			flag = "ok" if record["agrees"] else "FAIL"
+			print(f"{flag:4} {record['lines']:>8} lines  {record['seconds'] * 1e3:9.2f}ms")
+		exponent = growth_exponent(records)
+		slow = exponent is not None and exponent > args.max_exponent or not all(r["agrees"] for r in records)
+		if exponent is not None:
+			print(f"{'FAIL' if exponent > args.max_exponent else 'ok':4} runtime grows like size^{exponent:.2f} (limit {args.max_exponent})")
+	if args.output and failures:
+		args.output.write_text(json.dumps(failures, indent=2) + "\n")
+	return 1 if failures or slow else 0
+
+if __name__ == "__main__":
+	sys.exit(main())
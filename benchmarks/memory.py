@@ -0,0 +1,99 @@
+"""Check that annotate and apply stay within a memory budget relative to the file they work on.
+
+Run from the repository root, e.g.:
+
+	python -m benchmarks.memory --lines 1000,10000,100000 --max-ratio 6
+"""
+import gc
+import sys
+import json
+import random
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Optional, List, Dict, Callable, Tuple
+from assistant_merger.git_tools import get_git_diff, add_change_numbers, apply_changes
+from assistant_merger.bytes_mode import get_git_diff_bytes, apply_changes_bytes
+from benchmarks.synthetic import make_repo, make_response
+
+MAX_RATIO = 6.0  # Allowed peak allocation as a multiple of the file's size; annotate and apply sit around 3.5x today
+TOP_SITES = 5
+
+def measure(call: Callable[[], object], top: int = TOP_SITES) -> Dict[str, object]:
+	"""Peak and retained bytes allocated by call, with the lines holding the most memory at its end.
+
+	Retained bytes are what is still allocated after the result is dropped,
+	so anything above zero is a cache or a leak.
+	"""
+	gc.collect()
+	# Tracing starts fresh here, so the peak only covers call (no reset_peak, which needs Python 3.9)
+	tracemalloc.start(25)
+	try:
+		result = call()
+		_, peak = tracemalloc.get_traced_memory()
+		with_result = tracemalloc.take_snapshot()
+		del result
+		gc.collect()
+		after = tracemalloc.take_snapshot()
+	finally:
+		tracemalloc.stop()
+	ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+	retained = sum(s.size for s in after.filter_traces(ignore).statistics("filename"))
+	sites = with_result.filter_traces(ignore).statistics("lineno")[:top]
+	return {
+		"peak_bytes": peak,
+		"retained_bytes": retained,
+		"top_sites": [
+			{"site": f"{s.traceback[0].filename}:{s.traceback[0].lineno}", "bytes": s.size, "count": s.count}
+			for s in sites
+		]
+	}
+
+def run(sizes: List[int], hunks: int = 20, reject_ratio: float = 0.5, seed: int = 0) -> List[Dict[str, object]]:
+	"""Measure every API call on one synthetic file per size, returning a record per (size, call)."""
+	records = []
+	rng = random.Random(seed)
+	for lines in sizes:
+		with tempfile.TemporaryDirectory(prefix="assistant_merger_memory_") as temp_dir:
+			path = make_repo(Path(temp_dir) / "repo", files=1, lines=lines, hunks=hunks, seed=seed, no_newline_ratio=0)[0]
+			input_bytes = path.stat().st_size
+			# Big files would otherwise be summarized as huge, skipping the text path under test
+			diff, _ = get_git_diff(path, classify_files=False)
+			diff_bytes, _ = get_git_diff_bytes(path, classify_files=False)
+			response = make_response(add_change_numbers(diff, path)[1], reject_ratio, rng)
+			calls: List[Tuple[str, Callable[[], object]]] = [
+				("get_git_diff", lambda: get_git_diff(path, classify_files=False)),
+				("add_change_numbers", lambda: add_change_numbers(diff, path)),
+				("apply_changes", lambda: apply_changes(path, diff, response)),
+				("apply_changes_bytes", lambda: apply_changes_bytes(path, diff_bytes, response))
+			]
+			for name, call in calls:
+				measured = measure(call)
+				records.append(dict(measured, call=name, lines=lines, input_bytes=input_bytes, ratio=measured["peak_bytes"] / input_bytes))
+	return records
+
+def main(argv: Optional[List[str]] = None) -> int:
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("--lines", default="1000,10000,100000", help="comma separated file sizes in lines")
+	parser.add_argument("--hunks", type=int, default=20)
+	parser.add_argument("--max-ratio", type=float, default=MAX_RATIO, help="fail when peak bytes exceed this multiple of the file size")
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--output", type=Path, default=None, help="also write the records as JSON")
+	args = parser.parse_args(argv)
+
+	records = run([int(n) for n in args.lines.split(",")], args.hunks, seed=args.seed)
+	failures = []
+	for record in records:
+		flag = "FAIL" if record["ratio"] > args.max_ratio else "ok"
+		print(f"{flag:4} {record['call']:20} {record['lines']:>8} lines  peak {record['peak_bytes']:>11} B ({record['ratio']:5.2f}x)  retained {record['retained_bytes']:>9} B")
+		if flag == "FAIL":
+			failures.append(record)
+			for site in record["top_sites"]:
+				print(f"       {site['bytes']:>11} B in {site['count']:>6} blocks at {site['site']}")
+	if args.output:
+		args.output.write_text(json.dumps(records, indent=2) + "\n")
+	return 1 if failures else 0
+
+if __name__ == "__main__":
+	sys.exit(main())
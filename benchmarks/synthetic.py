@@ -0,0 +1,87 @@
+import random
+import subprocess
+from pathlib import Path
+from typing import Optional, List, Dict
+
+def _code_line(rng: random.Random, i: int) -> str:
+	"""A plausible line of Python, unique enough that git's diff lines up with the edits made."""
+	indent = "    " * rng.randint(0, 2)
+	kind = rng.random()
+	if kind < 0.1:
+		return ""
+	if kind < 0.2:
+		return f"{indent}# note {i}: {rng.getrandbits(32):08x}"
+	if kind < 0.3:
+		return f"def function_{i}(value_{i}, other):"
+	return f"{indent}result_{i} = compute_{rng.randint(0, 999)}(value_{i}, {rng.randint(0, 10**6)})"
+
+def make_file(rng: random.Random, lines: int) -> List[str]:
+	return [_code_line(rng, i) for i in range(lines)]
+
+def edit_file(rng: random.Random, lines: List[str], hunks: int, hunk_size: int) -> List[str]:
+	"""Make up to hunks edits of 1 to hunk_size lines each: replacements, insertions and deletions.
+
+	Edits sit in separate strides of the file with untouched lines between
+	them, so git mostly reports one hunk per edit.
+	"""
+	stride = len(lines) // max(1, hunks)
+	if stride < 3:
+		return lines + make_file(rng, hunk_size)
+	edited = []
+	pos = 0
+	for k in range(hunks):
+		size = rng.randint(1, min(hunk_size, stride - 2))
+		start = k * stride + rng.randint(0, stride - size - 1)
+		edited.extend(lines[pos:start])
+		kind = rng.random()
+		if kind < 0.2:
+			new_lines = []
+		elif kind < 0.4:
+			new_lines = lines[start:start + size] + [f"inserted_{start}_{i} = {rng.randint(0, 10**6)}" for i in range(size)]
+		else:
+			new_lines = [f"{line}  # edited" if line else "pass" for line in lines[start:start + size]]
+		edited.extend(new_lines)
+		pos = start + size
+	edited.extend(lines[pos:])
+	return edited
+
+def make_repo(root: Path, files: int = 10, lines: int = 500, hunks: int = 10, hunk_size: int = 3, seed: int = 0, no_newline_ratio: float = 0.1) -> List[Path]:
+	"""Create a git repo under root with files committed, then edited in the working tree; returns the file paths.
+
+	Each file gets up to hunks edits of up to hunk_size lines. Roughly
+	no_newline_ratio of files end without a final newline.
+	"""
+	rng = random.Random(seed)
+	root.mkdir(parents=True, exist_ok=True)
+	git = lambda *args: subprocess.run(["git", *args], cwd=root, check=True, capture_output=True)
+	git("init", "-q")
+	git("config", "user.email", "bench@example.com")
+	git("config", "user.name", "bench")
+	paths = []
+	originals = {}
+	for i in range(files):
+		path = root / f"pkg_{i % 10}" / f"module_{i}.py"
+		path.parent.mkdir(parents=True, exist_ok=True)
+		originals[path] = make_file(rng, lines)
+		ending = "" if rng.random() < no_newline_ratio else "\n"
+		path.write_text("\n".join(originals[path]) + ending)
+		paths.append(path)
+	git("add", "-A")
+	git("commit", "-q", "-m", "synthetic")
+	for path in paths:
+		ending = "" if rng.random() < no_newline_ratio else "\n"
+		path.write_text("\n".join(edit_file(rng, originals[path], hunks, hunk_size)) + ending)
+	return paths
+
+def make_response(hunks: List[Dict[str, str]], reject_ratio: float, rng: random.Random, replace_ratio: float = 0.0) -> str:
+	"""Decide hunks at random: reject about reject_ratio, replace about replace_ratio, accept the rest."""
+	decisions = []
+	for hunk in hunks:
+		roll = rng.random()
+		if roll < reject_ratio:
+			decisions.append(f"{hunk['number']}, No")
+		elif roll < reject_ratio + replace_ratio:
+			decisions.append(f"{hunk['number']}, <Merge_Replace_Hunk>replacement_{rng.randint(0, 999)} = 1</Merge_Replace_Hunk>")
+		else:
+			decisions.append(f"{hunk['number']}, Yes")
+	return "\n".join(decisions)
@@ -0,0 +1,53 @@
+import unittest
+import subprocess
+from shared_setup import *
+from assistant_merger.bytes_mode import *
+
+class TestBytesMode(SharedGitTestCase):
+	def commit_file(self, relative_path: str, data: bytes) -> Path:
+		path = self.repo_path / relative_path
+		path.write_bytes(data)
+		subprocess.run(["git", "add", relative_path], cwd=self.repo_path, check=True)
+		subprocess.run(["git", "commit", "-m", f"Add {relative_path}"], cwd=self.repo_path, check=True)
+		return path
+
+	def check_round_trip(self, path: Path, old: bytes, new: bytes):
+		"""All Yes must give the new bytes back and all No the old ones, byte for byte."""
+		diff, error = get_git_diff_bytes(path)
+		self.assertIsNone(error, f"Error getting diff: {error}")
+		hunks = parse_hunks_bytes(diff)
+		self.assertGreater(len(hunks), 0)
+		yes = "\n".join(f"Change #{i+1}, Yes" for i in range(len(hunks)))
+		no = "\n".join(f"Change #{i+1}, No" for i in range(len(hunks)))
+		self.assertEqual(apply_changes_bytes(path, diff, yes), new)
+		self.assertEqual(apply_changes_bytes(path, diff, no), old)
+
+	def test_example_files(self):
+		"""Test byte-exact all Yes / all No merges for every example file."""
+		for filename, repo_file_path in self.file_paths.items():
+			with self.subTest(filename=filename):
+				self.check_round_trip(
+					repo_file_path,
+					(self.v1_dir / filename).read_bytes(),
+					(self.v2_dir / filename).read_bytes()
+				)
+
+	def test_crlf_and_latin1(self):
+		"""Test that CRLF endings and non UTF-8 bytes survive a partial merge untouched."""
+		old = "caf\xe9 = 1\r\nx = 2\r\ny = 3\r\nz = 4".encode("latin-1")
+		new = "caf\xe9 = 1\r\nx = 20\r\ny = 3\r\nz = 40\r\nw = 5\r\n".encode("latin-1")
+		path = self.commit_file("legacy.txt", old)
+		path.write_bytes(new)
+		self.check_round_trip(path, old, new)
+
+		diff, _ = get_git_diff_bytes(path)
+		merged = apply_changes_bytes(path, diff, "Change #1, No\nChange #2, Yes")
+		self.assertEqual(merged, "caf\xe9 = 1\r\nx = 2\r\ny = 3\r\nz = 40\r\nw = 5\r\n".encode("latin-1"))
+		merged = apply_changes_bytes(path, diff, "Change #1, <Merge_Replace_Hunk>x = 7</Merge_Replace_Hunk>\nChange #2, Yes")
+		self.assertEqual(merged, "caf\xe9 = 1\r\nx = 7\r\ny = 3\r\nz = 40\r\nw = 5\r\n".encode("latin-1"))
+
+		annotated, hunks = add_change_numbers_bytes(diff, path)
+		self.assertIn("(Change #2)", annotated)
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,197 @@
+import unittest
+import os
+import subprocess
+from unittest import mock
+from shared_setup import *
+from assistant_merger.changeset import *
+from assistant_merger.bytes_mode import parse_hunks_bytes, get_git_diff_bytes, apply_changes_bytes
+
+class TestApplyChangeset(SharedGitTestCase):
+	def all_no_responses(self, diffs):
+		return {
+			path: "\n".join(f"Change #{i+1}, No" for i in range(len(parse_hunks_bytes(diff))))
+			for path, diff in diffs.items()
+		}
+
+	def test_apply_changeset(self):
+		"""Test that a changeset of 'No' responses reverts every file to v1."""
+		paths = list(self.file_paths.values())
+		diffs, hashes, errors = get_changeset_diffs(paths)
+		self.assertEqual(errors, {})
+		self.assertIsNone(apply_changeset(self.all_no_responses(diffs), diffs, hashes))
+		for filename, repo_file_path in self.file_paths.items():
+			with self.subTest(filename=filename):
+				self.assertEqual(repo_file_path.read_bytes(), (self.v1_dir / filename).read_bytes())
+		self.assertEqual([p for p in self.repo_path.rglob("*.tmp")], [])
+
+	def test_hash_mismatch_writes_nothing(self):
+		"""Test that a file edited after diffing aborts the whole changeset."""
+		paths = list(self.file_paths.values())
+		diffs, hashes, _ = get_changeset_diffs(paths)
+		paths[0].write_bytes(paths[0].read_bytes() + b"# late edit\n")
+		error = apply_changeset(self.all_no_responses(diffs), diffs, hashes)
+		self.assertIn("changed since it was diffed", error)
+		for filename, repo_file_path in self.file_paths.items():
+			if repo_file_path != paths[0]:
+				self.assertEqual(repo_file_path.read_bytes(), (self.v2_dir / filename).read_bytes())
+
+	def test_rollback_on_rename_failure(self):
+		"""Test that files already replaced are restored when a later rename fails."""
+		paths = list(self.file_paths.values())
+		diffs, hashes, _ = get_changeset_diffs(paths)
+		before = {path: path.read_bytes() for path in paths}
+		real_replace = os.replace
+		calls = []
+		def flaky_replace(src, dst):
+			calls.append(dst)
+			if len(calls) == 3:
+				raise OSError("disk full")
+			return real_replace(src, dst)
+		with mock.patch("assistant_merger.changeset.os.replace", flaky_replace):
+			error = apply_changeset(self.all_no_responses(diffs), diffs, hashes)
+		self.assertIn("rolled back", error)
+		for path in paths:
+			self.assertEqual(path.read_bytes(), before[path])
+
+	def test_generated_file_matches_get_git_diff(self):
+		"""Test that a generated file gets the same single summary hunk here as from get_git_diff."""
+		path = self.repo_path / "package-lock.json"
+		path.write_text('{\n"a": 1,\n"b": 2,\n"c": 3,\n"d": 4\n}\n')
+		subprocess.run(["git", "add", "package-lock.json"], cwd=self.repo_path, check=True)
+		subprocess.run(["git", "commit", "-m", "Add lock file"], cwd=self.repo_path, check=True)
+		original = path.read_bytes()
+		path.write_text('{\n"a": 10,\n"b": 2,\n"c": 3,\n"d": 40\n}\n')
+
+		self.assertTrue(get_git_diff_bytes(path)[0].startswith(b"@@ generated "))
+		self.assertIsNone(apply_changeset({path: "Change #1, No"}))
+		self.assertEqual(path.read_bytes(), original)
+
+class TestApplyChangesToIndex(SharedGitTestCase):
+	def test_stage_approved_hunks(self):
+		"""Test that only approved hunks are staged while the working tree keeps every change."""
+		responses = {}
+		for filename, repo_file_path in self.file_paths.items():
+			diff, _ = get_git_diff_bytes(repo_file_path)
+			hunk_count = len(parse_hunks_bytes(diff))
+			responses[repo_file_path] = "\n".join(
+				f"Change #{i+1}, {'Yes' if i == 0 else 'No'}" for i in range(hunk_count)
+			)
+		self.assertIsNone(apply_changes_to_index(responses))
+
+		for filename, repo_file_path in self.file_paths.items():
+			with self.subTest(filename=filename):
+				self.assertEqual(repo_file_path.read_bytes(), (self.v2_dir / filename).read_bytes())
+				relative_path = repo_file_path.relative_to(self.repo_path).as_posix()
+				staged = subprocess.run(
+					["git", "show", f":{relative_path}"], cwd=self.repo_path, capture_output=True, check=True
+				).stdout
+				expected = apply_changes_bytes(repo_file_path, get_git_diff_bytes(repo_file_path, "HEAD")[0], responses[repo_file_path])
+				self.assertEqual(staged, expected)
+				if "Change #2" in responses[repo_file_path]:
+					self.assertNotEqual(staged, repo_file_path.read_bytes())
+
+	def test_git_processes(self):
+		"""Test that staging a whole changeset runs each git command once, however many files it has."""
+		commands = []
+		popen_init = subprocess.Popen.__init__
+		def record(popen, args, *rest, **kwargs):
+			commands.append(next(a for a in args[1:] if not a.startswith("-") and "=" not in a))
+			popen_init(popen, args, *rest, **kwargs)
+		responses = {path: "Change #1, No" for path in self.file_paths.values()}
+		with mock.patch.object(subprocess.Popen, "__init__", record):
+			self.assertIsNone(apply_changes_to_index(responses))
+		self.assertEqual(sorted(commands), ["cat-file", "check-attr", "diff", "fast-import", "update-index"])
+		self.assertTrue(all(self.staged(p.relative_to(self.repo_path).as_posix()) != p.read_bytes() for p in responses))
+
+	def test_stage_summaries(self):
+		"""Test that an accepted binary summary stages the working file and a rejected one keeps the index blob."""
+		for name in ("a.bin", "b.bin"):
+			(self.repo_path / name).write_bytes(b"\0old " + name.encode())
+		subprocess.run(["git", "add", "a.bin", "b.bin"], cwd=self.repo_path, check=True)
+		for name in ("a.bin", "b.bin"):
+			(self.repo_path / name).write_bytes(b"\0new " + name.encode())
+		self.assertIsNone(apply_changes_to_index({self.repo_path / "a.bin": "Change #1, Yes", self.repo_path / "b.bin": "Change #1, No"}))
+		self.assertEqual(self.staged("a.bin"), b"\0new a.bin")
+		self.assertEqual(self.staged("b.bin"), b"\0old b.bin")
+
+	def staged(self, relative_path):
+		return subprocess.run(["git", "show", f":{relative_path}"], cwd=self.repo_path, capture_output=True, check=True).stdout
+
+	def test_stage_keeps_index_form(self):
+		"""Test that with autocrlf the staged blob keeps the index's LF endings, not the working file's CRLF."""
+		subprocess.run(["git", "config", "core.autocrlf", "true"], cwd=self.repo_path, check=True)
+		path = self.repo_path / "crlf.txt"
+		path.write_bytes(b"a\r\nb\r\nc\r\n")
+		subprocess.run(["git", "add", "crlf.txt"], cwd=self.repo_path, check=True)
+		self.assertEqual(self.staged("crlf.txt"), b"a\nb\nc\n")
+		path.write_bytes(b"a\r\nB\r\nc\r\nD\r\n")
+
+		self.assertIsNone(apply_changes_to_index({path: "Change #1, Yes\nChange #2, No"}))
+		self.assertEqual(self.staged("crlf.txt"), b"a\nB\nc\n")
+		self.assertEqual(path.read_bytes(), b"a\r\nB\r\nc\r\nD\r\n")
+
+	def test_stage_accepted_summary_through_filters(self):
+		"""Test that an accepted generated file is staged through autocrlf, as 'git add' would."""
+		subprocess.run(["git", "config", "core.autocrlf", "true"], cwd=self.repo_path, check=True)
+		path = self.repo_path / "package-lock.json"
+		path.write_bytes(b'{\r\n"a": 1\r\n}\r\n')
+		subprocess.run(["git", "add", "package-lock.json"], cwd=self.repo_path, check=True)
+		path.write_bytes(b'{\r\n"a": 2\r\n}\r\n')
+		self.assertIsNone(apply_changes_to_index({path: "Change #1, Yes"}))
+		self.assertEqual(self.staged("package-lock.json"), b'{\n"a": 2\n}\n')
+
+	def test_stage_keeps_index_mode(self):
+		"""Test that a retargeted symlink is staged as a symlink rather than a copy of its target."""
+		(self.repo_path / "a.txt").write_text("a\n")
+		(self.repo_path / "b.txt").write_text("b\n")
+		link = self.repo_path / "link"
+		link.symlink_to("a.txt")
+		subprocess.run(["git", "add", "a.txt", "b.txt", "link"], cwd=self.repo_path, check=True)
+		link.unlink()
+		link.symlink_to("b.txt")
+
+		self.assertIsNone(apply_changes_to_index({link: "Change #1, Yes"}))
+		entry = subprocess.run(["git", "ls-files", "-s", "link"], cwd=self.repo_path, capture_output=True, text=True, check=True).stdout
+		self.assertTrue(entry.startswith("120000 "), entry)
+		self.assertEqual(self.staged("link"), b"b.txt")
+
+class TestDedupeChangeset(SharedGitTestCase):
+	def make_migration(self):
+		"""Commit three modules, then rename the same import in all of them and add one unique edit."""
+		paths = []
+		for i in range(3):
+			path = self.repo_path / f"module_{i}.py"
+			path.write_text(f"import old_api\n\ndef run_{i}():\n    return old_api.call({i})\n")
+			paths.append(path)
+		subprocess.run(["git", "add"] + [str(p) for p in paths], cwd=self.repo_path, check=True)
+		subprocess.run(["git", "commit", "-m", "modules"], cwd=self.repo_path, check=True)
+		for i, path in enumerate(paths):
+			path.write_text(path.read_text().replace("import old_api", "import new_api as old_api"))
+		paths[2].write_text(paths[2].read_text().replace("(2)", "(20)"))
+		return paths
+
+	def test_groups(self):
+		"""Test that a repeated hunk is rendered once with every location."""
+		paths = self.make_migration()
+		diffs, _, errors = get_changeset_diffs(paths)
+		self.assertEqual(errors, {})
+		groups = dedupe_changeset(diffs)
+		self.assertEqual(len(groups), 2)
+		self.assertEqual([len(g["locations"]) for g in groups], [3, 1])
+		rendered = render_deduped(groups, self.repo_path)
+		self.assertEqual(rendered.count("+import new_api as old_api"), 1)
+		self.assertIn("@@ 3 locations @@ (Change #1)", rendered)
+		self.assertIn("module_2.py @@ -4 +4 @@", rendered)
+
+	def test_fan_out(self):
+		"""Test that one decision is applied at every location of its hunk."""
+		paths = self.make_migration()
+		diffs, hashes, _ = get_changeset_diffs(paths)
+		groups = dedupe_changeset(diffs)
+		self.assertEqual(fan_out_response("Change #1, No\nChange #2, Yes", groups)[paths[2]], "Change #1, No\nChange #2, Yes")
+		self.assertIsNone(apply_deduped("Change #1, No\nChange #2, Yes", groups, diffs, hashes))
+		for i, path in enumerate(paths):
+			self.assertEqual(path.read_text(), f"import old_api\n\ndef run_{i}():\n    return old_api.call({20 if i == 2 else i})\n")
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+import subprocess
+from shared_setup import *
+from assistant_merger.git_tools import *
+from assistant_merger.bytes_mode import get_git_diff_bytes, apply_changes_bytes
+from assistant_merger.changeset import apply_changes_to_index
+from assistant_merger.classify import sniff, BINARY, HUGE, TEXT
+
+class TestClassify(SharedGitTestCase):
+	def commit_file(self, relative_path: str, data: bytes) -> Path:
+		path = self.repo_path / relative_path
+		path.write_bytes(data)
+		subprocess.run(["git", "add", relative_path], cwd=self.repo_path, check=True)
+		subprocess.run(["git", "commit", "-m", f"Add {relative_path}"], cwd=self.repo_path, check=True)
+		return path
+
+	def test_sniff(self):
+		"""Test NUL byte and line length sniffing of a file's first block."""
+		self.assertEqual(sniff(b"abc\0def"), BINARY)
+		self.assertEqual(sniff(b"short\n" + b"x" * 2000 + b"\n"), HUGE)
+		self.assertEqual(sniff(b"short\nlines\n"), TEXT)
+
+	def test_binary_file_all_or_nothing(self):
+		"""Test that a binary file gets one summary hunk and 'No' restores the committed bytes."""
+		original = b"\0\1\2\3\xff\n"
+		path = self.commit_file("image.bin", original)
+		path.write_bytes(b"\0\1\2\4\xfe\n")
+
+		diff, error = get_git_diff(path)
+		self.assertIsNone(error, f"Error getting diff: {error}")
+		modified_diff, hunks = add_change_numbers(diff, path)
+		self.assertEqual(len(hunks), 1)
+		self.assertTrue(modified_diff.startswith("@@ binary "), modified_diff)
+		self.assertIn("@@ End Change #1 Hunk @@", modified_diff)
+
+		merged = apply_changes(path, diff, "Change #1, No")
+		self.assertEqual(merged.encode("utf-8", "surrogateescape"), original)
+		merged = apply_changes(path, diff, "Change #1, Yes")
+		self.assertEqual(merged.encode("utf-8", "surrogateescape"), path.read_bytes())
+
+	def test_summary_refuses_line_ranges(self):
+		"""Test that every merge path refuses a line-range decision on a summary hunk instead of reading it as Yes."""
+		path = self.commit_file("image.bin", b"\0\1\2\n")
+		path.write_bytes(b"\0\1\3\n")
+		response = "Change #1, Yes except 1"
+		with self.assertRaises(ValueError):
+			apply_changes(path, get_git_diff(path)[0], response)
+		with self.assertRaises(ValueError):
+			apply_changes_bytes(path, get_git_diff_bytes(path)[0], response)
+		self.assertIn("line ranges", apply_changes_to_index({path: response}))
+		self.assertEqual(subprocess.run(["git", "diff", "--cached", "--quiet"], cwd=self.repo_path).returncode, 0)
+
+	def test_generated_attribute(self):
+		"""Test that linguist-generated files are summarized instead of annotated line by line."""
+		self.commit_file(".gitattributes", b"*.gen.py linguist-generated\n")
+		path = self.commit_file("schema.gen.py", b"a = 1\nb = 2\n")
+		path.write_text("a = 1\nb = 3\nc = 4\n")
+
+		diff, error = get_git_diff(path)
+		self.assertIsNone(error, f"Error getting diff: {error}")
+		self.assertTrue(diff.startswith("@@ generated "), diff)
+		self.assertIn("+2 -1 lines", diff)
+		self.assertEqual(apply_changes(path, diff, "Change #1, No"), "a = 1\nb = 2\n")
+
+		diff, error = get_git_diff(path, classify_files=False)
+		self.assertTrue(diff.startswith("@@ -2 +2,2 @@"), diff)
+
+	def test_mode_only_change(self):
+		"""Test that a mode-only change to a generated file isn't summarized as a change with no blobs."""
+		path = self.commit_file("package-lock.json", b'{"a": 1}\n')
+		path.chmod(0o755)
+		subprocess.run(["git", "config", "core.fileMode", "true"], cwd=self.repo_path, check=True)
+		diff, error = get_git_diff(path)
+		self.assertEqual(diff, "")
+		self.assertIn("No changes", error)
+		self.assertEqual(get_git_diff_bytes(path)[0], b"")
+
+if __name__ == "__main__":
+	unittest.main()
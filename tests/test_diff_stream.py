@@ -0,0 +1,41 @@
+import unittest
+from shared_setup import *
+from assistant_merger.git_tools import *
+from assistant_merger.diff_stream import iter_file_diffs, DiffTooLargeError
+
+class TestDiffStream(SharedGitTestCase):
+	def test_oversized_file_summarized(self):
+		"""Test that files over max_file_bytes are summarized instead of kept in memory."""
+		file_diffs = {d.path: d for d in iter_file_diffs(self.repo_path, max_file_bytes=200)}
+		for filename, repo_file_path in self.file_paths.items():
+			with self.subTest(filename=filename):
+				file_diff = file_diffs[repo_file_path.relative_to(self.repo_path).as_posix()]
+				full_diff, error = get_git_diff(repo_file_path)
+				self.assertIsNone(error, f"Error getting diff for {filename}: {error}")
+				if len(full_diff) > 200:
+					self.assertTrue(file_diff.oversized)
+					self.assertEqual(file_diff.diff, "")
+					self.assertEqual(file_diff.added, sum(1 for l in full_diff.splitlines() if l.startswith("+")))
+					self.assertEqual(file_diff.removed, sum(1 for l in full_diff.splitlines() if l.startswith("-")))
+					_, error = get_git_diff(repo_file_path, max_file_bytes=200, classify_files=False)
+					self.assertTrue(error.startswith("Diff too large"), error)
+				else:
+					self.assertEqual(file_diff.diff, full_diff)
+
+	def test_oversized_abort(self):
+		"""Test that on_oversize='abort' stops the stream with an error."""
+		with self.assertRaises(DiffTooLargeError):
+			list(iter_file_diffs(self.repo_path, max_total_bytes=100, on_oversize="abort"))
+
+	def test_parse_hunks_is_incremental(self):
+		"""Test that parse_hunks yields hunks before consuming the rest of its input."""
+		repo_file_path = self.file_paths["vector3.py"]
+		diff, error = get_git_diff(repo_file_path)
+		self.assertIsNone(error, f"Error getting diff: {error}")
+		lines = iter(diff.splitlines())
+		first = next(parse_hunks(lines))
+		self.assertEqual(first["number"], "Change #1")
+		self.assertGreater(len(list(lines)), 0)
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+import subprocess
+from shared_setup import *
+from assistant_merger.git_tools import *
+from assistant_merger.diff_stream import iter_file_diffs
+from assistant_merger.bytes_mode import get_git_diff_bytes
+
+class TestDiffTargets(SharedGitTestCase):
+	def test_cached_matches_working_tree(self):
+		"""Test that staged changes produce the same diff under --cached as unstaged ones do by default."""
+		for filename, repo_file_path in self.file_paths.items():
+			with self.subTest(filename=filename):
+				working_diff, error = get_git_diff(repo_file_path)
+				self.assertIsNone(error, f"Error getting diff for {filename}: {error}")
+				subprocess.run(["git", "add", repo_file_path], cwd=self.repo_path, check=True)
+				cached_diff, error = get_git_diff(repo_file_path, target="--cached")
+				self.assertIsNone(error, f"Error getting cached diff for {filename}: {error}")
+				self.assertEqual(cached_diff, working_diff)
+				_, error = get_git_diff(repo_file_path)
+				self.assertIsNotNone(error, f"Expected no unstaged changes for {filename}")
+
+	def test_bad_targets(self):
+		"""Test that git's errors are reported and option-like targets are refused before running git."""
+		repo_file_path = next(iter(self.file_paths.values()))
+		diff, error = get_git_diff(repo_file_path, target="nonexistent")
+		self.assertEqual(diff, "")
+		self.assertIn("nonexistent", error)
+		self.assertNotIn("No changes", error)
+
+		output = self.temp_dir / "pwn"
+		for get_diff in (get_git_diff, get_git_diff_bytes):
+			with self.subTest(get_diff=get_diff.__name__):
+				_, error = get_diff(repo_file_path, target=f"--output={output}")
+				self.assertEqual(error, f"Invalid diff target: --output={output}")
+				self.assertFalse(output.exists())
+
+	def test_range_per_commit_stream(self):
+		"""Test that a commit range is streamed per commit and per file from one git log."""
+		subprocess.run(["git", "add", "-A"], cwd=self.repo_path, check=True)
+		subprocess.run(["git", "commit", "-m", "v2"], cwd=self.repo_path, check=True)
+		quaternion = self.file_paths["quaternion.py"]
+		quaternion.write_text(quaternion.read_text() + "\n# trailing comment\n")
+		subprocess.run(["git", "commit", "-am", "comment"], cwd=self.repo_path, check=True)
+
+		file_diffs = list(iter_file_diffs(self.repo_path, "HEAD~2..HEAD", per_commit=True))
+		commits = list(dict.fromkeys(d.commit for d in file_diffs))
+		self.assertEqual(len(commits), 2)
+		self.assertEqual(len([d for d in file_diffs if d.commit == commits[1]]), 1)
+
+		first = {d.path: d for d in file_diffs if d.commit == commits[0]}
+		contents = read_new_contents(self.repo_path, list(first.values()), "HEAD~2..HEAD")
+		for filename, repo_file_path in self.file_paths.items():
+			with self.subTest(filename=filename):
+				relative_path = repo_file_path.relative_to(self.repo_path).as_posix()
+				self.assertIn(relative_path, first)
+				file_diff = first[relative_path]
+				_, hunks = add_change_numbers(file_diff.diff, repo_file_path, content=contents[relative_path])
+				llm_response = "\n".join(f"Change #{i+1}, No" for i in range(len(hunks)))
+				merged = apply_changes(repo_file_path, file_diff.diff, llm_response, content=contents[relative_path])
+				self.assertEqual(merged, (self.v1_dir / filename).read_text())
+
+	def test_commit_target_reads_working_tree(self):
+		"""Test that a single commit target takes the new side, and its classification, from the working tree."""
+		file_diffs = list(iter_file_diffs(self.repo_path, "HEAD"))
+		contents = read_new_contents(self.repo_path, file_diffs, "HEAD")
+		for file_diff in file_diffs:
+			with self.subTest(path=file_diff.path):
+				self.assertEqual(contents[file_diff.path], (self.repo_path / file_diff.path).read_text())
+
+		data = self.repo_path / "data.txt"
+		data.write_text("1\n")
+		subprocess.run(["git", "add", "data.txt"], cwd=self.repo_path, check=True)
+		subprocess.run(["git", "commit", "-m", "data"], cwd=self.repo_path, check=True)
+		data.write_text("2\n" + "x" * 5000 + "\n")
+		for get_diff in (get_git_diff, get_git_diff_bytes):
+			with self.subTest(get_diff=get_diff.__name__):
+				diff, _ = get_diff(data, target="HEAD")
+				self.assertTrue(diff.startswith(b"@@ huge " if isinstance(diff, bytes) else "@@ huge "))
+
+	def test_missing_blob(self):
+		"""Test that a new-side blob git can't find raises instead of reading as empty."""
+		diffs = list(iter_file_diffs(self.repo_path))
+		diffs[0].new_blob = "1" * 40
+		with self.assertRaises(ValueError):
+			read_new_contents(self.repo_path, diffs[:1], "--cached")
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,60 @@
+import random
+import tempfile
+import unittest
+from pathlib import Path
+from assistant_merger.git_tools import add_change_numbers, apply_changes, parse_hunk_header
+from benchmarks.fuzz import Case, _Workspace, make_case, make_response, fuzz, growth_exponent, NO_NEWLINE
+
+class TestFuzz(unittest.TestCase):
+	def setUp(self):
+		self.temp_dir = tempfile.TemporaryDirectory()
+		self.workspace = _Workspace(Path(self.temp_dir.name))
+
+	def tearDown(self):
+		self.temp_dir.cleanup()
+
+	def test_seeded_cases_agree(self):
+		"""Test that every apply path matches git apply on a fixed set of random cases."""
+		failures = fuzz(100, seed=1)
+		self.assertEqual([(f["case"], f["error"]) for f in failures], [])
+
+	def test_generator_covers_edge_cases(self):
+		"""Test the generated cases include missing newlines, zero-length sides, adjacent hunks and replacements."""
+		seen = set()
+		for i in range(60):
+			rng = random.Random(i)
+			diff = self.workspace.diff(make_case(rng, 30, 0.3))
+			hunks = add_change_numbers(diff, self.workspace.path)[1]
+			if NO_NEWLINE in diff:
+				seen.add("no newline")
+			ranges = [parse_hunk_header(h["header"]) for h in hunks]
+			for old_start, old_lines, _, new_lines in ranges:
+				if old_lines == 0:
+					seen.add("insertion")
+				if new_lines == 0:
+					seen.add("deletion")
+			for (start, lines, _, _), (next_start, _, _, _) in zip(ranges, ranges[1:]):
+				if next_start - (start + max(lines, 1)) <= 1:
+					seen.add("adjacent")
+			if "<Merge_Replace_Hunk>" in make_response(rng, hunks):
+				seen.add("replacement")
+		self.assertEqual(seen, {"no newline", "insertion", "deletion", "adjacent", "replacement"})
+
+	def test_rejected_hunk_keeps_original_newline(self):
+		"""Test that rejecting a hunk which dropped the final newline puts it back, as found by the fuzzer."""
+		diff = self.workspace.diff(Case("a\nb\n", "a\nc"))
+		self.assertEqual(apply_changes(self.workspace.path, diff, "Change #1, No"), "a\nb\n")
+		self.assertEqual(apply_changes(self.workspace.path, diff, "Change #1, <Merge_Replace_Hunk>d</Merge_Replace_Hunk>"), "a\nd")
+		diff = self.workspace.diff(Case("a\nb", "a\nc\n"))
+		self.assertEqual(apply_changes(self.workspace.path, diff, "Change #1, No"), "a\nb")
+		self.assertEqual(apply_changes(self.workspace.path, diff, "Change #1, <Merge_Replace_Hunk>d</Merge_Replace_Hunk>"), "a\nd\n")
+
+	def test_growth_exponent(self):
+		"""Test the fitted exponent tells linear from quadratic runtimes."""
+		sizes = [1000, 4000, 16000]
+		self.assertAlmostEqual(growth_exponent([{"lines": n, "seconds": n * 1e-6} for n in sizes]), 1.0)
+		self.assertAlmostEqual(growth_exponent([{"lines": n, "seconds": n * n * 1e-9} for n in sizes]), 2.0)
+		self.assertIsNone(growth_exponent([{"lines": 1000, "seconds": 0.1}]))
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,59 @@
+import json
+import unittest
+from shared_setup import *
+from assistant_merger.git_tools import *
+from assistant_merger import instrumentation
+
+class TestInstrumentation(SharedGitTestCase):
+	def run_review(self):
+		for repo_file_path in self.file_paths.values():
+			diff, _ = get_git_diff(repo_file_path)
+			_, hunks = add_change_numbers(diff, repo_file_path)
+			apply_changes(repo_file_path, diff, "\n".join(f"{h['number']}, No" for h in hunks))
+
+	def test_collect(self):
+		"""Test that stages and counters are recorded and exported."""
+		stages = []
+		with instrumentation.collect(callback=lambda name, seconds: stages.append(name)) as metrics:
+			self.run_review()
+		self.assertIsNone(instrumentation.current())
+		files = len(self.file_paths)
+		for stage in ("find_git_repo", "git_diff", "render", "parse_response", "apply", "subprocess"):
+			self.assertIn(stage, metrics.timers)
+		self.assertEqual(metrics.timers["render"][0], files)
+		self.assertEqual(metrics.counters["subprocesses"], files)
+		self.assertGreater(metrics.counters["bytes_read"], 0)
+		self.assertEqual(metrics.counters["hunks_applied"], metrics.counters["hunks_reverted"])
+		self.assertGreater(metrics.counters["lines_rendered"], 0)
+		self.assertIn("apply", stages)
+
+		exported = json.loads(metrics.to_json())
+		self.assertEqual(exported["counters"]["subprocesses"], files)
+		prometheus = metrics.to_prometheus()
+		self.assertIn('assistant_merger_stage_calls_total{stage="render"} ' + str(files), prometheus)
+		self.assertIn(f"assistant_merger_subprocesses_total {files}", prometheus)
+
+	def test_disabled(self):
+		"""Test that nothing is collected while instrumentation is off."""
+		metrics = instrumentation.enable()
+		instrumentation.disable()
+		self.assertIsNone(instrumentation.current())
+		self.run_review()
+		self.assertEqual((metrics.timers, metrics.counters), ({}, {}))
+		self.assertIs(instrumentation.stage("render"), instrumentation.stage("apply"))
+
+	def test_collect_reuses_metrics(self):
+		"""Test that a Metrics reused across collect() blocks doesn't keep earlier callbacks."""
+		metrics = instrumentation.Metrics()
+		first, second = [], []
+		with instrumentation.collect(metrics, callback=lambda name, seconds: first.append(name)):
+			self.run_review()
+		calls = len(first)
+		with instrumentation.collect(metrics, callback=lambda name, seconds: second.append(name)):
+			self.run_review()
+		self.assertEqual(metrics.callbacks, [])
+		self.assertEqual(len(first), calls)
+		self.assertEqual(len(second), calls)
+
+if __name__ == '__main__':
+	unittest.main()
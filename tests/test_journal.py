@@ -0,0 +1,59 @@
+import unittest
+import subprocess
+from shared_setup import *
+from assistant_merger.git_tools import *
+from assistant_merger.journal import Journal
+
+class TestJournal(SharedGitTestCase):
+	def test_undo_redo_single_decision(self):
+		"""Test that undoing one decision matches re-applying with that change accepted, and redo reverses it."""
+		repo_file_path = self.file_paths["vector3.py"]
+		diff, error = get_git_diff(repo_file_path)
+		self.assertIsNone(error, f"Error getting diff: {error}")
+		_, hunks = add_change_numbers(diff, repo_file_path)
+		self.assertGreater(len(hunks), 2)
+		current = repo_file_path.read_text()
+
+		decisions = ["No"] * len(hunks)
+		journal = Journal.for_file(repo_file_path)
+		merged = journal.record(repo_file_path, diff, "\n".join(f"Change #{i+1}, {d}" for i, d in enumerate(decisions)))
+		self.assertEqual(merged, (self.v1_dir / "vector3.py").read_text())
+		self.assertEqual(len(journal.history(repo_file_path)), len(hunks))
+
+		# Undo the middle decision: same as answering Yes to it in the first place
+		middle = journal.history(repo_file_path)[len(hunks) // 2]
+		journal.undo(middle["id"])
+		decisions[len(hunks) // 2] = "Yes"
+		expected = apply_changes(repo_file_path, diff, "\n".join(f"Change #{i+1}, {d}" for i, d in enumerate(decisions)), content=current)
+		self.assertEqual(repo_file_path.read_text(), expected)
+
+		# A fresh Journal replays the file and keeps positions consistent
+		journal = Journal.for_file(repo_file_path)
+		for entry in journal.history(repo_file_path):
+			if entry["applied"]:
+				journal.undo(entry["id"])
+		self.assertEqual(repo_file_path.read_text(), current)
+		journal.redo(middle["id"])
+		self.assertEqual(
+			repo_file_path.read_text(),
+			apply_changes(repo_file_path, diff, f"{middle['change']}, No", content=current)
+		)
+		with self.assertRaises(ValueError):
+			journal.redo(middle["id"])
+
+	def test_summary_diff_refused(self):
+		"""Test that rejecting a binary file through the journal raises and leaves the file and journal alone."""
+		path = self.repo_path / "img.bin"
+		path.write_bytes(b"\0\1\2\n")
+		subprocess.run(["git", "add", "img.bin"], cwd=self.repo_path, check=True)
+		subprocess.run(["git", "commit", "-m", "Add img.bin"], cwd=self.repo_path, check=True)
+		path.write_bytes(b"\0\1\3\n")
+		diff, _ = get_git_diff(path)
+		journal = Journal.for_file(path)
+		with self.assertRaises(ValueError):
+			journal.record(path, diff, "Change #1, No")
+		self.assertEqual(path.read_bytes(), b"\0\1\3\n")
+		self.assertEqual(journal.history(), [])
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+from shared_setup import *
+from assistant_merger.git_tools import *
+from assistant_merger.line_map import LineMap, ChangesetIndex
+from assistant_merger.diff_stream import iter_file_diffs
+
+class TestLineMap(SharedGitTestCase):
+	def check_map(self, line_map: LineMap, old_lines: list, new_lines: list):
+		"""Every line that maps across must hold the same text on both sides, and map back to itself."""
+		mapped = 0
+		for line in range(1, len(new_lines) + 1):
+			old_line = line_map.new_to_old(line)
+			if old_line is None:
+				self.assertIsNotNone(line_map.hunk_at(line))
+				continue
+			mapped += 1
+			self.assertIsNone(line_map.hunk_at(line))
+			self.assertEqual(new_lines[line - 1], old_lines[old_line - 1], f"new line {line} -> old line {old_line}")
+			self.assertEqual(line_map.old_to_new(old_line), line)
+		removed = sum(1 for line in range(1, len(old_lines) + 1) if line_map.old_to_new(line) is None)
+		self.assertEqual(len(old_lines) - removed, mapped)
+
+	def test_new_to_old(self):
+		"""Test mapping between v1 and v2 of every example file."""
+		for filename, repo_file_path in self.file_paths.items():
+			with self.subTest(filename=filename):
+				diff, error = get_git_diff(repo_file_path)
+				self.assertIsNone(error, f"Error getting diff for {filename}: {error}")
+				line_map = LineMap.from_diff(diff)
+				self.check_map(line_map, (self.v1_dir / filename).read_text().splitlines(), (self.v2_dir / filename).read_text().splitlines())
+				for hunk in line_map.hunks:
+					_, _, new_start, new_lines = parse_hunk_header(hunk["header"])
+					if new_lines:
+						self.assertIs(line_map.hunk_at(new_start + new_lines - 1), hunk)
+
+	def test_partial_application(self):
+		"""Test that the map stays correct for the file produced by partial decisions."""
+		for filename, repo_file_path in self.file_paths.items():
+			with self.subTest(filename=filename):
+				diff, _ = get_git_diff(repo_file_path)
+				hunks = list(parse_hunks(diff.splitlines()))
+				decisions = ["Yes", "No", "<Merge_Replace_Hunk>a\\nb</Merge_Replace_Hunk>"]
+				llm_response = "\n".join(f"{h['number']}, {decisions[i % 3]}" for i, h in enumerate(hunks))
+				merged = apply_changes(repo_file_path, diff, llm_response)
+				line_map = LineMap(hunks).apply(parse_llm_response(llm_response))
+				self.check_map(line_map, (self.v1_dir / filename).read_text().splitlines(), merged.splitlines())
+
+class TestChangesetIndex(SharedGitTestCase):
+	def test_attach_diagnostics(self):
+		"""Test that diagnostics on every line are attributed exactly like a linear scan over the hunks."""
+		diffs = {d.path: d.diff for d in iter_file_diffs(self.repo_path)}
+		index = ChangesetIndex.from_diffs(diffs)
+		diagnostics = []
+		for path in diffs:
+			line_count = len((self.repo_path / path).read_text().splitlines())
+			diagnostics += [(path, line, f"{path}:{line}") for line in range(1, line_count + 2)]
+		attached = index.attach(diagnostics)
+
+		expected = {}
+		for path, line, payload in diagnostics:
+			for hunk in parse_hunks(diffs[path].splitlines()):
+				_, _, new_start, new_lines = parse_hunk_header(hunk["header"])
+				if new_start <= line < new_start + new_lines:
+					expected.setdefault((path, hunk["number"]), []).append(payload)
+		self.assertEqual(attached, expected)
+
+		# With slack, a diagnostic right after a hunk still lands on it
+		path, hunks = next((p, list(parse_hunks(d.splitlines()))) for p, d in diffs.items())
+		_, _, new_start, new_lines = parse_hunk_header(hunks[0]["header"])
+		self.assertEqual(index.lookup(path, new_start + max(new_lines, 1), slack=1)["number"], hunks[0]["number"])
+
+if __name__ == "__main__":
+	unittest.main()
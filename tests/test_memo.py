@@ -0,0 +1,101 @@
+import time
+import unittest
+from pathlib import Path
+from shared_setup import *
+from assistant_merger.git_tools import *
+from assistant_merger.memo import DecisionMemo
+
+class TestDecisionMemo(SharedGitTestCase):
+	def diffs(self):
+		return {path: get_git_diff(path)[0] for path in self.file_paths.values()}
+
+	def responses(self, diffs):
+		"""Alternate No, Yes and a replacement across each file's hunks."""
+		forms = [", No", ", Yes", ", <Merge_Replace_Hunk>replaced\\nlines</Merge_Replace_Hunk>"]
+		return {
+			path: "\n".join(f"Change #{i + 1}{forms[i % 3]}" for i in range(len(list(parse_hunks(diff.splitlines())))))
+			for path, diff in diffs.items()
+		}
+
+	def test_replay(self):
+		"""Test that remembered decisions replay for the whole changeset and give the same merge."""
+		memo = DecisionMemo.for_file(next(iter(self.file_paths.values())))
+		diffs = self.diffs()
+		responses = self.responses(diffs)
+		for path, diff in diffs.items():
+			memo.remember(path, diff, responses[path])
+		memo.close()
+
+		memo = DecisionMemo.for_file(next(iter(self.file_paths.values())))
+		replayed, pending = memo.recall(diffs)
+		for path, diff in diffs.items():
+			with self.subTest(path=path.name):
+				self.assertEqual(pending[path], [])
+				self.assertEqual(apply_changes(path, diff, replayed[path]), apply_changes(path, diff, responses[path]))
+
+	def test_context_change_misses(self):
+		"""Test that a hunk whose surroundings changed is not replayed."""
+		memo = DecisionMemo.for_file(next(iter(self.file_paths.values())))
+		path = self.file_paths["vector2.py"]
+		diff = get_git_diff(path)[0]
+		memo.remember(path, diff, "Change #1, No")
+		content = path.read_text()
+		first_hunk = next(parse_hunks(diff.splitlines()))
+		_, _, new_start, new_lines = parse_hunk_header(first_hunk["header"])
+		lines = content.split("\n")
+		lines[new_start - 1 + new_lines] += "  # edited"
+		replayed, pending = memo.recall({path: diff}, {path: "\n".join(lines)})
+		self.assertEqual(replayed[path], "")
+		self.assertIn(first_hunk["content"], [h["content"] for h in pending[path]])
+
+	def test_summary_hunks(self):
+		"""Test that a binary file's summary hunk is pending until decided, then replays for the same blobs only."""
+		path = self.repo_path / "img.bin"
+		path.write_bytes(b"\0\1\2\n")
+		subprocess.run(["git", "add", "img.bin"], cwd=self.repo_path, check=True)
+		subprocess.run(["git", "commit", "-m", "Add img.bin"], cwd=self.repo_path, check=True)
+		path.write_bytes(b"\0\1\3\n")
+		diff = get_git_diff(path)[0]
+		self.assertTrue(diff.startswith("@@ binary "), diff)
+
+		memo = DecisionMemo.for_file(path)
+		replayed, pending = memo.recall({path: diff})
+		self.assertEqual(replayed[path], "")
+		self.assertEqual([h["number"] for h in pending[path]], ["Change #1"])
+
+		memo.remember(path, diff, "Change #1, No")
+		replayed, pending = memo.recall({path: diff})
+		self.assertEqual((replayed[path], pending[path]), ("Change #1, No", []))
+
+		path.write_bytes(b"\0\1\4\n")
+		replayed, pending = memo.recall({path: get_git_diff(path)[0]})
+		self.assertEqual(len(pending[path]), 1)
+
+	def test_deleted_file(self):
+		"""Test that a deleted tracked file's hunks are remembered and replayed."""
+		path = self.file_paths["vector2.py"]
+		path.unlink()
+		diff = get_git_diff(path)[0]
+		memo = DecisionMemo.for_file(path)
+		replayed, pending = memo.recall({path: diff})
+		self.assertEqual([h["number"] for h in pending[path]], ["Change #1"])
+		memo.remember(path, diff, "Change #1, No")
+		replayed, pending = memo.recall({path: diff})
+		self.assertEqual((replayed[path], pending[path]), ("Change #1, No", []))
+
+	def test_eviction(self):
+		"""Test TTL expiry and least-recently-used size eviction."""
+		memo = DecisionMemo(self.temp_dir / "memo.sqlite", max_entries=2)
+		memo.store({("a", "1", "x"): ", Yes"})
+		memo.store({("b", "2", "x"): ", No"})
+		memo.lookup([("a", "1", "x")])
+		memo.store({("c", "3", "x"): ", Yes"})
+		self.assertEqual(set(memo.lookup([("a", "1", "x"), ("b", "2", "x"), ("c", "3", "x")])), {("a", "1", "x"), ("c", "3", "x")})
+
+		memo = DecisionMemo(self.temp_dir / "ttl.sqlite", ttl=60)
+		memo.store({("a", "1", "x"): ", Yes"})
+		memo.db.execute("UPDATE decisions SET used_at = ?", (time.time() - 120,))
+		self.assertEqual(memo.lookup([("a", "1", "x")]), {})
+
+if __name__ == '__main__':
+	unittest.main()
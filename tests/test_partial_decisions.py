@@ -0,0 +1,82 @@
+import re
+import unittest
+import subprocess
+from pathlib import Path
+from shared_setup import *
+from assistant_merger.git_tools import *
+from assistant_merger.bytes_mode import get_git_diff_bytes, apply_changes_bytes
+from assistant_merger.patch import build_reject_patch, apply_patch
+
+class TestPartialDecisions(SharedGitTestCase):
+	def body_line_count(self, hunk):
+		return sum(1 for line in hunk["content"].splitlines() if line and line[0] != '\\')
+
+	def test_parse(self):
+		"""Test the partial forms parse to the right line sets, and plain decisions still parse."""
+		approvals = parse_llm_response("Change #1, Yes except 2-4, 7\nChange #2, No except line 3\nChange #3, lines 1-2 No\nChange #4, lines 5 Yes\nChange #5, Yes")
+		self.assertEqual(approvals["Change #1"], PartialDecision(frozenset({2, 3, 4, 7})))
+		self.assertEqual(approvals["Change #2"], PartialDecision(frozenset({3}), True))
+		self.assertEqual(approvals["Change #3"], PartialDecision(frozenset({1, 2})))
+		self.assertEqual(approvals["Change #4"], PartialDecision(frozenset({5}), True))
+		self.assertIs(approvals["Change #5"], True)
+
+	def test_malformed_ranges_ignored(self):
+		"""Test that malformed ranges leave the line unparsed, and reversed ranges are swapped."""
+		approvals = parse_llm_response("Change #1, Yes except -3\nChange #2, Yes except 3-5-\nChange #3, lines - No\nChange #4, No except ,\nChange #5, Yes except 15-12")
+		self.assertEqual(approvals, {"Change #5": PartialDecision(frozenset({12, 13, 14, 15}))})
+		for filename, repo_file_path in self.file_paths.items():
+			with self.subTest(filename=filename):
+				diff, _ = get_git_diff(repo_file_path)
+				self.assertEqual(apply_changes(repo_file_path, diff, "Change #1, Yes except -3"), apply_changes(repo_file_path, diff, ""))
+
+	def test_whole_ranges_match_plain_decisions(self):
+		"""Test that excepting every line of every hunk is the same as the opposite plain decision."""
+		for filename, repo_file_path in self.file_paths.items():
+			with self.subTest(filename=filename):
+				diff, _ = get_git_diff(repo_file_path)
+				_, hunks = add_change_numbers(diff, repo_file_path)
+				everything = {h["number"]: f"1-{self.body_line_count(h)}" for h in hunks}
+				all_no = "\n".join(f"{n}, No" for n in everything)
+				all_yes = "\n".join(f"{n}, Yes" for n in everything)
+				self.assertEqual(apply_changes(repo_file_path, diff, "\n".join(f"{n}, Yes except {r}" for n, r in everything.items())), apply_changes(repo_file_path, diff, all_no))
+				self.assertEqual(apply_changes(repo_file_path, diff, "\n".join(f"{n}, lines {r} No" for n, r in everything.items())), apply_changes(repo_file_path, diff, all_no))
+				self.assertEqual(apply_changes(repo_file_path, diff, "\n".join(f"{n}, No except {r}" for n, r in everything.items())), apply_changes(repo_file_path, diff, all_yes))
+
+	def test_paths_agree(self):
+		"""Test that text, bytes and reject-patch merges agree on partial decisions."""
+		for filename, repo_file_path in self.file_paths.items():
+			with self.subTest(filename=filename):
+				diff, _ = get_git_diff(repo_file_path)
+				_, hunks = add_change_numbers(diff, repo_file_path)
+				# Alternate forms and reject every other line, so kept and dropped lines interleave
+				decisions = []
+				for i, hunk in enumerate(hunks):
+					odd_lines = ",".join(str(n) for n in range(1, self.body_line_count(hunk) + 1, 2))
+					decisions.append(f"{hunk['number']}, Yes except {odd_lines}" if i % 2 else f"{hunk['number']}, lines {odd_lines} Yes")
+				llm_response = "\n".join(decisions)
+				expected = apply_changes(repo_file_path, diff, llm_response)
+				self.assertFalse(expected.startswith("Error:"), expected)
+
+				diff_bytes, error = get_git_diff_bytes(repo_file_path)
+				self.assertIsNone(error)
+				self.assertEqual(apply_changes_bytes(repo_file_path, diff_bytes, llm_response), expected.encode("utf-8", "surrogateescape"))
+
+				patch = build_reject_patch(repo_file_path, diff, llm_response)
+				self.assertEqual(apply_patch(repo_file_path.read_text(), patch), expected)
+				if patch:
+					patch_file = self.temp_dir / "partial.patch"
+					patch_file.write_text(patch)
+					subprocess.run(["git", "apply", "--unidiff-zero", "--check", str(patch_file)], cwd=self.repo_path, check=True)
+
+	def test_numbered_rendering(self):
+		"""Test that numbered hunk bodies count the lines partial decisions refer to."""
+		for filename, repo_file_path in self.file_paths.items():
+			with self.subTest(filename=filename):
+				diff, _ = get_git_diff(repo_file_path)
+				_, hunks = add_change_numbers(diff, repo_file_path)
+				numbered, _ = add_change_numbers(diff, repo_file_path, add_hunk_line_numbers=True)
+				total = sum(self.body_line_count(h) for h in hunks)
+				self.assertGreaterEqual(sum(1 for line in numbered.splitlines() if re.match(r'[-+ ]\s*\d+ ', line)), total)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+import subprocess
+from pathlib import Path
+from shared_setup import *
+from assistant_merger.git_tools import *
+from assistant_merger.patch import build_reject_patch, apply_patch
+
+class TestRejectPatch(SharedGitTestCase):
+	def check_patch(self, repo_file_path: Path, llm_response: str, expected: str):
+		"""The patch must reproduce expected both in process and through git apply."""
+		diff, error = get_git_diff(repo_file_path)
+		self.assertIsNone(error, f"Error getting diff: {error}")
+		patch = build_reject_patch(repo_file_path, diff, llm_response)
+		self.assertEqual(apply_patch(repo_file_path.read_text(), patch), expected)
+
+		patch_file = self.temp_dir / "reject.patch"
+		patch_file.write_text(patch)
+		subprocess.run(["git", "apply", "--unidiff-zero", "--check", str(patch_file)], cwd=self.repo_path, check=True)
+
+	def test_all_no(self):
+		"""Test that rejecting everything patches each file back to v1."""
+		for filename, repo_file_path in self.file_paths.items():
+			with self.subTest(filename=filename):
+				diff, _ = get_git_diff(repo_file_path)
+				_, hunks = add_change_numbers(diff, repo_file_path)
+				llm_response = "\n".join(f"Change #{i+1}, No" for i in range(len(hunks)))
+				self.check_patch(repo_file_path, llm_response, (self.v1_dir / filename).read_text())
+
+	def test_manual_decisions(self):
+		"""Test that patches for the manual test decisions match apply_changes, and only hold rejected hunks."""
+		input_dir = Path(__file__).parent / "examples" / "manual_tests" / "input"
+		for input_file in input_dir.glob("*.txt"):
+			filename = input_file.stem.rsplit("_", 1)[0] + ".py"
+			with self.subTest(input=input_file.name):
+				repo_file_path = self.file_paths[filename]
+				llm_response = input_file.read_text().strip()
+				diff, _ = get_git_diff(repo_file_path)
+				expected = apply_changes(repo_file_path, diff, llm_response)
+				self.check_patch(repo_file_path, llm_response, expected)
+
+				patch = build_reject_patch(repo_file_path, diff, llm_response)
+				rejected = sum(1 for line in llm_response.splitlines() if not line.rstrip().lower().endswith("yes"))
+				self.assertEqual(patch.count("\n@@ "), rejected)
+
+	def test_summary_diff(self):
+		"""Test that rejecting a binary file's summary hunk raises rather than returning an empty patch."""
+		path = self.repo_path / "img.bin"
+		path.write_bytes(b"\0\1\2\n")
+		subprocess.run(["git", "add", "img.bin"], cwd=self.repo_path, check=True)
+		subprocess.run(["git", "commit", "-m", "Add img.bin"], cwd=self.repo_path, check=True)
+		path.write_bytes(b"\0\1\3\n")
+		diff, _ = get_git_diff(path)
+		self.assertEqual(build_reject_patch(path, diff, "Change #1, Yes"), "")
+		with self.assertRaises(ValueError):
+			build_reject_patch(path, diff, "Change #1, No")
+		with self.assertRaises(ValueError):
+			build_reject_patch(path, diff, "Change #1, <Merge_Replace_Hunk>x</Merge_Replace_Hunk>")
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,102 @@
+import asyncio
+import subprocess
+import unittest
+from pathlib import Path
+from shared_setup import *
+from assistant_merger.git_tools import *
+from assistant_merger.pipeline import Reviewer, ReviewerError, StubReviewer, ReviewPipeline, run_pipeline
+
+class CountingReviewer(StubReviewer):
+	"""Stub that records how many calls overlap."""
+	def __init__(self, **kwargs):
+		super().__init__(**kwargs)
+		self.in_flight = 0
+		self.max_in_flight = 0
+
+	async def review(self, prompt):
+		self.in_flight += 1
+		self.max_in_flight = max(self.max_in_flight, self.in_flight)
+		try:
+			return await super().review(prompt)
+		finally:
+			self.in_flight -= 1
+
+class TestPipeline(SharedGitTestCase):
+	def test_reject_all_with_retries(self):
+		"""Test that failed calls are retried and every response is applied."""
+		reviewer = StubReviewer(reject_ratio=1.0, fail_every=2)
+		pipeline = ReviewPipeline(reviewer, max_concurrency=2, backoff=0)
+		results = asyncio.run(pipeline.run(list(self.file_paths.values())))
+		self.assertEqual(results, {path: None for path in self.file_paths.values()})
+		self.assertGreater(pipeline.stats["retries"], 0)
+		self.assertEqual(pipeline.stats["applied"], len(self.file_paths))
+		for filename, repo_file_path in self.file_paths.items():
+			with self.subTest(filename=filename):
+				self.assertEqual(repo_file_path.read_text(), (self.v1_dir / filename).read_text())
+
+	def test_concurrency_bound(self):
+		"""Test that no more than max_concurrency reviews run at once."""
+		reviewer = CountingReviewer(latency=0.01)
+		results = run_pipeline(list(self.file_paths.values()), reviewer, max_concurrency=2)
+		self.assertTrue(all(error is None for error in results.values()))
+		self.assertLessEqual(reviewer.max_in_flight, 2)
+		self.assertGreaterEqual(reviewer.max_in_flight, 1)
+
+	def test_deterministic(self):
+		"""Test that the stub gives the same answer for the same prompt."""
+		path = self.file_paths["vector2.py"]
+		prompt, hunks = add_change_numbers(get_git_diff(path)[0], path)
+		first = asyncio.run(StubReviewer(reject_ratio=0.5).review(prompt))
+		self.assertEqual(first, asyncio.run(StubReviewer(reject_ratio=0.5).review(prompt)))
+		self.assertEqual(len(first.splitlines()), len(hunks))
+
+	def test_gives_up(self):
+		"""Test that a reviewer that always fails leaves files untouched and reports an error."""
+		class Broken(Reviewer):
+			async def review(self, prompt):
+				raise ReviewerError("down")
+		path = self.file_paths["vector2.py"]
+		before = path.read_text()
+		pipeline = ReviewPipeline(Broken(), max_retries=1, backoff=0)
+		results = asyncio.run(pipeline.run([path]))
+		self.assertIn("Review failed", results[path])
+		self.assertEqual(pipeline.stats["retries"], 1)
+		self.assertEqual(path.read_text(), before)
+
+	def test_other_errors_not_retried(self):
+		"""Test that an error other than ReviewerError fails the file without retries."""
+		class Buggy(Reviewer):
+			async def review(self, prompt):
+				raise TypeError("bug")
+		path = self.file_paths["vector2.py"]
+		pipeline = ReviewPipeline(Buggy(), max_retries=3, backoff=0)
+		results = asyncio.run(pipeline.run([path]))
+		self.assertIn("bug", results[path])
+		self.assertEqual((pipeline.stats["calls"], pipeline.stats["retries"]), (1, 0))
+		with self.assertRaises(TypeError):
+			Reviewer()
+
+	def test_binary_file(self):
+		"""Test that an accepted binary summary is written as bytes, keeping the new content."""
+		path = self.repo_path / "img.bin"
+		path.write_bytes(b"\x89PNG\x00\xff old")
+		subprocess.run(["git", "add", "img.bin"], cwd=self.repo_path, check=True)
+		subprocess.run(["git", "commit", "-m", "image"], cwd=self.repo_path, check=True)
+		path.write_bytes(b"\x89PNG\x00\xfe new")
+		results = run_pipeline([path] + list(self.file_paths.values()), StubReviewer())
+		self.assertEqual(results, {p: None for p in [path] + list(self.file_paths.values())})
+		self.assertEqual(path.read_bytes(), b"\x89PNG\x00\xfe new")
+
+	def test_failed_write_is_per_file(self):
+		"""Test that an on_response error fails its file without stopping the others."""
+		broken = self.file_paths["vector2.py"]
+		def on_response(file_path, diff, response):
+			if file_path == broken:
+				raise UnicodeEncodeError("utf-8", "x", 0, 1, "bad")
+			return None
+		results = run_pipeline(list(self.file_paths.values()), StubReviewer(), on_response=on_response)
+		self.assertIn("Could not apply response", results[broken])
+		self.assertTrue(all(error is None for path, error in results.items() if path != broken))
+
+if __name__ == '__main__':
+	unittest.main()
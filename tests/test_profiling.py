@@ -0,0 +1,55 @@
+import os
+import json
+import unittest
+from unittest import mock
+from shared_setup import *
+from assistant_merger.git_tools import *
+from assistant_merger import profiling
+
+class TestProfiling(SharedGitTestCase):
+	def tearDown(self):
+		profiling.configure(None, threshold=1.0, keep=20)
+		super().tearDown()
+
+	def review(self, repo_file_path):
+		diff, _ = get_git_diff(repo_file_path)
+		_, hunks = add_change_numbers(diff, repo_file_path)
+		return apply_changes(repo_file_path, diff, "\n".join(f"{h['number']}, No" for h in hunks))
+
+	def test_capture_and_rotate(self):
+		"""Test that slow calls leave a profile plus input sizes, rotated to keep entries."""
+		dump_dir = self.temp_dir / "profiles"
+		profiling.configure(dump_dir, threshold=0, keep=4)
+		repo_file_path = self.file_paths["vector2.py"]
+		merged = self.review(repo_file_path)
+		self.assertEqual(merged, (self.v1_dir / "vector2.py").read_text())
+		profiles = sorted(dump_dir.glob("*.pstats"))
+		self.assertEqual(len(profiles), 3)
+		details = [json.loads(p.with_suffix(".json").read_text()) for p in profiles]
+		self.assertEqual({d["function"] for d in details}, {"get_git_diff", "add_change_numbers", "apply_changes"})
+		apply_details = next(d for d in details if d["function"] == "apply_changes")
+		self.assertEqual(apply_details["args"][0], str(repo_file_path))
+		self.assertGreater(apply_details["args"][1]["length"], 0)
+
+		self.review(repo_file_path)
+		self.assertEqual(len(list(dump_dir.glob("*.pstats"))), 4)
+		self.assertEqual(len(list(dump_dir.glob("*.json"))), 4)
+
+	def test_fast_calls_not_kept(self):
+		"""Test that calls under the threshold, or with capture off, leave nothing behind."""
+		dump_dir = self.temp_dir / "profiles"
+		profiling.configure(dump_dir, threshold=60)
+		self.review(self.file_paths["vector2.py"])
+		profiling.configure(None)
+		self.review(self.file_paths["vector3.py"])
+		self.assertEqual(list(dump_dir.glob("*")) if dump_dir.exists() else [], [])
+
+	def test_malformed_env_warns(self):
+		"""Test that bad threshold or keep values are ignored with a warning instead of raising."""
+		env = {profiling.PROFILE_DIR_ENV: "", profiling.PROFILE_THRESHOLD_ENV: "slow", profiling.PROFILE_KEEP_ENV: "5"}
+		with mock.patch.dict(os.environ, env), self.assertWarns(UserWarning):
+			profiling.configure_from_env()
+		self.assertEqual((profiling._settings.threshold, profiling._settings.keep), (1.0, 5))
+
+if __name__ == '__main__':
+	unittest.main()
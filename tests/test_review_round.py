@@ -0,0 +1,81 @@
+import unittest
+import subprocess
+from shared_setup import *
+from assistant_merger.git_tools import *
+from assistant_merger.review_round import ReviewRound, ACCEPTED
+
+class TestReviewRound(SharedGitTestCase):
+	def test_delta_rounds(self):
+		"""Test that round 2 only re-emits replaced hunks and shifted positions match a fresh diff."""
+		repo_file_path = self.file_paths["vector3.py"]
+		diff, error = get_git_diff(repo_file_path)
+		self.assertIsNone(error, f"Error getting diff: {error}")
+		_, hunks = add_change_numbers(diff, repo_file_path)
+		self.assertGreater(len(hunks), 3)
+
+		decisions = ["Yes", "No", "<Merge_Replace_Hunk>    # replaced\\n    pass</Merge_Replace_Hunk>"] + ["Yes", "No"] * len(hunks)
+		llm_response = "\n".join(f"Change #{i+1}, {d}" for i, d in zip(range(len(hunks)), decisions))
+		review = ReviewRound(repo_file_path, diff)
+		merged = review.apply(llm_response)
+		self.assertEqual(merged, apply_changes(repo_file_path, diff, llm_response))
+
+		# Only the replaced hunk is left to review, under its original number
+		self.assertEqual([h["number"] for h in review.pending()], ["Change #3"])
+		rendered = review.render()
+		self.assertTrue(rendered.startswith("@@ "), rendered)
+		self.assertIn("(Change #3)", rendered)
+		self.assertIn("+    # replaced", rendered)
+		self.assertNotIn("(Change #1)", rendered)
+
+		# Arithmetic positions agree with what git reports for the merged file
+		repo_file_path.write_text(merged)
+		fresh_diff, error = get_git_diff(repo_file_path)
+		self.assertIsNone(error, f"Error getting diff: {error}")
+		fresh_headers = {h["header"] for h in parse_hunks(fresh_diff.splitlines())}
+		for hunk in review.hunks:
+			if hunk["status"] == ACCEPTED:
+				self.assertIn(hunk["header"], fresh_headers)
+
+		# Round 2 answers with the stable number and the file settles
+		merged = review.apply("Change #3, No")
+		self.assertEqual(review.pending(), [])
+		self.assertEqual(review.round, 3)
+		expected = apply_changes(repo_file_path, diff, llm_response.replace(f"Change #3, {decisions[2]}", "Change #3, No"), content=(self.v2_dir / "vector3.py").read_text())
+		self.assertEqual(merged, expected)
+
+	def test_update_with_new_edit(self):
+		"""Test that a fresh diff keeps known hunks and numbers new ones after the last."""
+		repo_file_path = self.file_paths["vector3.py"]
+		diff, _ = get_git_diff(repo_file_path)
+		review = ReviewRound(repo_file_path, diff)
+		count = len(review.hunks)
+		# Insert a line in the middle of the first gap of unchanged lines, away from every hunk
+		lines = repo_file_path.read_text().split("\n")
+		ranges = [parse_hunk_header(h["header"])[2:] for h in review.hunks]
+		ends = [start + max(count, 1) for start, count in ranges]
+		gap = next(end for end, (next_start, _) in zip(ends, ranges[1:]) if next_start - end >= 3)
+		lines.insert(gap + 1, "# new edit")
+		repo_file_path.write_text("\n".join(lines))
+		new_diff, _ = get_git_diff(repo_file_path)
+		new_hunks = review.update(new_diff)
+		self.assertEqual([h["number"] for h in new_hunks], [f"Change #{count + 1}"])
+		self.assertEqual(len(review.hunks), count + 1)
+
+	def test_summary_diff_refused(self):
+		"""Test that a binary file's summary diff is refused up front rather than failing in render or apply."""
+		path = self.repo_path / "img.bin"
+		path.write_bytes(b"\0\1\2\n")
+		subprocess.run(["git", "add", "img.bin"], cwd=self.repo_path, check=True)
+		subprocess.run(["git", "commit", "-m", "Add img.bin"], cwd=self.repo_path, check=True)
+		path.write_bytes(b"\0\1\3\n")
+		diff, _ = get_git_diff(path)
+		with self.assertRaises(ValueError):
+			ReviewRound(path, diff)
+
+		repo_file_path = self.file_paths["vector3.py"]
+		review = ReviewRound(repo_file_path, get_git_diff(repo_file_path)[0])
+		with self.assertRaises(ValueError):
+			review.update(diff)
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+from pathlib import Path
+from shared_setup import *
+from assistant_merger.git_tools import *
+from assistant_merger.rules import Rule, RuleSet, render_pending, merge_decisions
+
+DIFF = """@@ -2 +2 @@
+-x = compute(1,2)
++x = compute(1, 2)
+@@ -4 +4 @@
+-y = 1
++y = 1  # the answer, minus 41
+@@ -6 +6 @@
+-z = 3
++z = 4
+"""
+CONTENT = "a = 0\nx = compute(1, 2)\nb = 0\ny = 1  # the answer, minus 41\nc = 0\nz = 4\n"
+
+class TestRules(SharedGitTestCase):
+	def test_decide(self):
+		"""Test each kind of condition, and that the first matching rule wins."""
+		hunks = list(parse_hunks(DIFF.splitlines()))
+		self.assertEqual(RuleSet([Rule(True, whitespace_only=True)]).decide("a.py", hunks), {"Change #1": True})
+		self.assertEqual(RuleSet([Rule(True, same_tokens=True)]).decide("a.py", hunks), {"Change #1": True, "Change #2": True})
+		self.assertEqual(RuleSet([Rule(False, added=r"^z = ")]).decide("a.py", hunks), {"Change #3": False})
+		self.assertEqual(RuleSet([Rule(False, paths=("docs/*",)), Rule(True, paths=("*.py",))]).decide("a.py", hunks), {f"Change #{i}": True for i in (1, 2, 3)})
+		self.assertEqual(RuleSet([Rule(False, paths=("docs/*",), same_tokens=True)]).decide("a.py", hunks), {})
+		self.assertEqual(RuleSet([Rule(False, same_tokens=True), Rule(True)]).decide("a.py", hunks), {"Change #1": False, "Change #2": False, "Change #3": True})
+		joined = list(parse_hunks("@@ -1 +1 @@\n-import os\n+importos\n@@ -3 +3,2 @@\n-a  b\n+a\n+  b\n".splitlines()))
+		self.assertEqual(RuleSet([Rule(True, whitespace_only=True)]).decide("a.py", joined), {"Change #2": True})
+
+	def test_render_and_merge(self):
+		"""Test that pre-decided hunks drop out of the prompt and merge back into the response."""
+		decisions = RuleSet([Rule(True, same_tokens=True)]).decide("a.py", parse_hunks(DIFF.splitlines()))
+		rendered, pending = render_pending(DIFF, Path("a.py"), decisions, content=CONTENT)
+		self.assertEqual([h["number"] for h in pending], ["Change #3"])
+		self.assertNotIn("(Change #1)", rendered)
+		self.assertIn("x = compute(1, 2)", rendered)
+		merged = apply_changes(Path("a.py"), DIFF, merge_decisions("Change #1, No\nChange #3, No", decisions), content=CONTENT)
+		self.assertEqual(merged, "a = 0\nx = compute(1, 2)\nb = 0\ny = 1  # the answer, minus 41\nc = 0\nz = 3\n")
+
+	def test_render_numbers_restored_lines(self):
+		"""Test that with line numbers on, lines are numbered as in the file the pre-decisions leave."""
+		rendered, _ = render_pending(DIFF, Path("a.py"), {"Change #1": False, "Change #3": True}, add_line_numbers=True, content=CONTENT)
+		self.assertEqual(rendered.split("\n"), [
+			"   1 a = 0",
+			"   2 x = compute(1,2)",
+			"   3 b = 0",
+			"@@ -4 +4 @@ (Change #2)",
+			"-y = 1",
+			"+y = 1  # the answer, minus 41",
+			"@@ End Change #2 Hunk @@",
+			"   5 c = 0",
+			"   6 z = 4"
+		])
+		# A rejected deletion pushes later lines down, a rejected addition pulls them up
+		diff = "@@ -2 +1,0 @@\n-x = compute(1,2)\n@@ -4 +3 @@\n-c = 1\n+c = 2\n"
+		rendered, _ = render_pending(diff, Path("a.py"), {"Change #1": False}, add_line_numbers=True, content="a = 0\nb = 0\nc = 2\nd = 0\n")
+		self.assertEqual(rendered.split("\n"), [
+			"   1 a = 0",
+			"   2 x = compute(1,2)",
+			"   3 b = 0",
+			"@@ -4 +3 @@ (Change #2)",
+			"-c = 1",
+			"+c = 2",
+			"@@ End Change #2 Hunk @@",
+			"   5 d = 0"
+		])
+		diff = "@@ -1,0 +2,2 @@\n+x = 1\n+y = 2\n@@ -2 +4 @@\n-b = 1\n+b = 0\n"
+		rendered, _ = render_pending(diff, Path("a.py"), {"Change #1": False}, add_line_numbers=True, content="a = 0\nx = 1\ny = 2\nb = 0\nc = 0\n")
+		self.assertEqual(rendered.split("\n"), [
+			"   1 a = 0",
+			"@@ -2 +4 @@ (Change #2)",
+			"-b = 1",
+			"+b = 0",
+			"@@ End Change #2 Hunk @@",
+			"   3 c = 0"
+		])
+
+	def test_accept_all_by_path(self):
+		"""Test that a path rule accepting everything leaves nothing to render and keeps every change."""
+		rules = RuleSet([Rule(True, paths=("*.py",))])
+		for filename, repo_file_path in self.file_paths.items():
+			with self.subTest(filename=filename):
+				diff, _ = get_git_diff(repo_file_path)
+				decisions = rules.decide(repo_file_path.relative_to(self.repo_path).as_posix(), parse_hunks(diff.splitlines()))
+				rendered, pending = render_pending(diff, repo_file_path, decisions)
+				self.assertEqual(pending, [])
+				self.assertNotIn("@@ End", rendered)
+				self.assertEqual(apply_changes(repo_file_path, diff, merge_decisions("", decisions)), repo_file_path.read_text())
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import subprocess
+from unittest import mock
+from pathlib import Path
+from shared_setup import *
+from assistant_merger.git_tools import *
+from assistant_merger.session import ReviewSession
+
+class TestReviewSession(SharedGitTestCase):
+	def test_resume(self):
+		"""Test that a reopened session keeps its decisions and doesn't re-diff unchanged files."""
+		paths = list(self.file_paths.values())
+		session = ReviewSession.for_file(paths[0])
+		self.assertEqual(session.sync(paths), paths)
+		session.record(paths[0], "Change #1, No\nChange #2, <Merge_Replace_Hunk>a\\nb</Merge_Replace_Hunk>")
+		session.finish_batch("batch-1")
+		session.close()
+
+		session = ReviewSession.for_file(paths[0])
+		with mock.patch("assistant_merger.session.get_git_diffs") as get_diff:
+			self.assertEqual(session.sync(paths), [])
+			get_diff.assert_not_called()
+		self.assertTrue(session.batch_done("batch-1"))
+		self.assertFalse(session.batch_done("batch-2"))
+		self.assertEqual(session.response(paths[0]), "Change #1, No\nChange #2, <Merge_Replace_Hunk>a\\nb</Merge_Replace_Hunk>")
+		pending = session.pending()
+		self.assertNotIn("Change #1", [h["number"] for h in pending.get(paths[0], [])])
+		diff, _ = get_git_diff(paths[1])
+		self.assertEqual(pending[paths[1]], list(parse_hunks(diff.splitlines())))
+		self.assertEqual(session.diff(paths[0]), get_git_diff(paths[0])[0])
+		self.assertEqual(
+			apply_changes(paths[0], session.diff(paths[0]), session.response(paths[0])),
+			apply_changes(paths[0], get_git_diff(paths[0])[0], "Change #1, No\nChange #2, <Merge_Replace_Hunk>a\\nb</Merge_Replace_Hunk>")
+		)
+
+	def test_changed_file_rediffed(self):
+		"""Test that only a file whose content changed is re-diffed, losing its stale decisions."""
+		paths = list(self.file_paths.values())
+		session = ReviewSession.for_file(paths[0])
+		session.sync(paths)
+		session.record(paths[0], "Change #1, No")
+		session.record(paths[1], "Change #1, No")
+		paths[0].write_text(paths[0].read_text() + "\n# more\n")
+		self.assertEqual(session.sync(paths), [paths[0]])
+		self.assertEqual(session.response(paths[0]), "")
+		self.assertEqual(session.response(paths[1]), "Change #1, No")
+		self.assertIn("# more", session.diff(paths[0]))
+
+	def test_deleted_file(self):
+		"""Test that a deleted file is diffed as a deletion instead of aborting the sync, and only once."""
+		paths = list(self.file_paths.values())
+		session = ReviewSession.for_file(paths[0])
+		session.sync(paths)
+		paths[0].unlink()
+		self.assertEqual(session.sync(paths), [paths[0]])
+		self.assertEqual(session.diff(paths[0]), get_git_diff(paths[0])[0])
+		self.assertTrue(session.diff(paths[0]).startswith("@@ -1,") and " +0,0 @@" in session.diff(paths[0]))
+		self.assertEqual(session.sync(paths), [])
+
+	def test_staged_file_rediffed(self):
+		"""Test that staging a file re-diffs it against the new index, and that changed files share one git diff."""
+		paths = list(self.file_paths.values())
+		session = ReviewSession.for_file(paths[0])
+		session.sync(paths)
+		session.record(paths[1], "Change #1, No")
+		subprocess.run(["git", "add", paths[0]], cwd=self.repo_path, check=True)
+		paths[2].write_text(paths[2].read_text() + "\n# more\n")
+		with mock.patch("assistant_merger.session.get_git_diffs", wraps=get_git_diffs) as get_diffs:
+			self.assertEqual(session.sync(paths), [paths[0], paths[2]])
+			get_diffs.assert_called_once()
+		self.assertEqual(session.hunks(paths[0]), [])
+		self.assertIn("No changes", session.error(paths[0]))
+		self.assertEqual(session.response(paths[1]), "Change #1, No")
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+from pathlib import Path
+from shared_setup import *
+from assistant_merger.git_tools import *
+
+class TestSplitHunks(SharedGitTestCase):
+	def test_anchor_split(self):
+		"""Test that a line common to both sides splits a hunk in two around it."""
+		hunk = {"number": "Change #1", "header": "@@ -3,3 +3,3 @@", "content": "-a = 1\n-keep()\n-b = 2\n+a = 10\n+keep()\n+b = 20"}
+		self.assertEqual(
+			[(h["header"], h["content"]) for h in split_hunk(hunk)],
+			[("@@ -3 +3 @@", "-a = 1\n+a = 10"), ("@@ -5 +5 @@", "-b = 2\n+b = 20")]
+		)
+
+	def test_apply_split(self):
+		"""Test that split hunks render and apply independently against in-memory content."""
+		diff = "@@ -3,3 +3,3 @@\n-a = 1\n-keep()\n-b = 2\n+a = 10\n+keep()\n+b = 20\n"
+		content = "x\ny\na = 10\nkeep()\nb = 20\nz\n"
+		rendered, hunks = add_change_numbers(diff, Path("example.py"), content=content, split=True)
+		self.assertEqual(len(hunks), 2)
+		self.assertEqual(rendered.count("keep()"), 1)
+		self.assertEqual(apply_changes(Path("example.py"), diff, "Change #1, Yes\nChange #2, No", content=content, split=True), "x\ny\na = 10\nkeep()\nb = 2\nz\n")
+
+	def test_block_split(self):
+		"""Test that a pure addition is cut at blank lines before top level code."""
+		hunk = {"number": "Change #1", "header": "@@ -4,0 +5,5 @@", "content": "+def f():\n+    return 1\n+\n+def g():\n+    return 2"}
+		self.assertEqual(
+			[(h["header"], h["content"]) for h in split_hunk(hunk)],
+			[("@@ -4,0 +5,3 @@", "+def f():\n+    return 1\n+"), ("@@ -4,0 +8,2 @@", "+def g():\n+    return 2")]
+		)
+
+	def test_no_newline_left_whole(self):
+		"""Test that hunks ending a file without a newline aren't split."""
+		hunk = {"number": "Change #1", "header": "@@ -1,2 +1,2 @@", "content": "-a\n-b\n\\ No newline at end of file\n+c\n+b\n\\ No newline at end of file"}
+		self.assertEqual(split_hunk(hunk), [hunk])
+
+	def test_split_matches_whole(self):
+		"""Test that accepting or rejecting every split hunk matches the unsplit result."""
+		for filename, repo_file_path in self.file_paths.items():
+			with self.subTest(filename=filename):
+				diff, _ = get_git_diff(repo_file_path)
+				_, hunks = add_change_numbers(diff, repo_file_path)
+				_, split = add_change_numbers(diff, repo_file_path, split=True)
+				self.assertGreaterEqual(len(split), len(hunks))
+				self.assertEqual([h["number"] for h in split], [f"Change #{i + 1}" for i in range(len(split))])
+				for answer in ("Yes", "No"):
+					whole = apply_changes(repo_file_path, diff, "\n".join(f"{h['number']}, {answer}" for h in hunks))
+					self.assertEqual(apply_changes(repo_file_path, diff, "\n".join(f"{h['number']}, {answer}" for h in split), split=True), whole)
+
+	def test_single_split_hunk_rejected(self):
+		"""Test that rejecting one split hunk only restores that hunk's removed lines."""
+		for filename, repo_file_path in self.file_paths.items():
+			diff, _ = get_git_diff(repo_file_path)
+			_, split = add_change_numbers(diff, repo_file_path, split=True)
+			current = repo_file_path.read_text()
+			for hunk in split:
+				if "\\" in hunk["content"]:
+					continue
+				with self.subTest(filename=filename, change=hunk["number"]):
+					merged = apply_changes(repo_file_path, diff, f"{hunk['number']}, No", split=True)
+					removed = [l[1:] for l in hunk["content"].splitlines() if l[0] == "-"]
+					added = [l[1:] for l in hunk["content"].splitlines() if l[0] == "+"]
+					self.assertEqual(len(merged.split("\n")), len(current.split("\n")) - len(added) + len(removed))
+					for line in removed:
+						self.assertIn(line, merged.split("\n"))
+
+if __name__ == '__main__':
+	unittest.main()
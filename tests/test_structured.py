@@ -0,0 +1,67 @@
+import io
+import json
+import unittest
+from pathlib import Path
+from shared_setup import *
+from assistant_merger.git_tools import *
+from assistant_merger import structured
+from assistant_merger.structured import diff_records, to_jsonl, from_jsonl, to_msgpack, apply_structured
+
+DIFF = """@@ -2 +2 @@
+-b = 1
++b = 2
+@@ -4,0 +5,2 @@
++d = 4
++e = 5
+"""
+CONTENT = "a\nb = 2\nc\nx\nd = 4\ne = 5\nf\ng\n"
+
+class TestStructured(SharedGitTestCase):
+	def test_records(self):
+		"""Test hunk ranges, lines and the context between hunks."""
+		records = list(diff_records(DIFF, Path("a.py"), CONTENT))
+		self.assertEqual(records[0], {"type": "file", "path": "a.py", "summary": False, "lines": 8})
+		self.assertEqual(records[1]["removed"], ["b = 1"])
+		self.assertEqual(records[1]["added"], ["b = 2"])
+		self.assertEqual(records[1]["context"], [3, 4])
+		self.assertEqual((records[2]["change"], records[2]["new_start"], records[2]["new_lines"]), (2, 5, 2))
+		self.assertEqual(records[2]["context"], [7, 8])
+		self.assertEqual(list(from_jsonl(to_jsonl(records))), records)
+
+	def test_structured_decisions_match_text(self):
+		"""Test that decision records merge exactly like the equivalent response text."""
+		for filename, repo_file_path in self.file_paths.items():
+			with self.subTest(filename=filename):
+				diff, _ = get_git_diff(repo_file_path)
+				hunks = [r for r in diff_records(diff, repo_file_path) if r["type"] == "hunk"]
+				records, lines = [], []
+				for i, hunk in enumerate(hunks):
+					if i % 3 == 0:
+						records.append({"change": hunk["change"], "accept": False})
+						lines.append(f"Change #{hunk['change']}, No")
+					elif i % 3 == 1:
+						records.append({"change": hunk["change"], "replace": ["x = 1"]})
+						lines.append(f"Change #{hunk['change']}, <Merge_Replace_Hunk>x = 1</Merge_Replace_Hunk>")
+					else:
+						records.append({"change": hunk["change"], "reject_lines": [1]})
+						lines.append(f"Change #{hunk['change']}, Yes except 1")
+				self.assertEqual(apply_structured(repo_file_path, diff, records), apply_changes(repo_file_path, diff, "\n".join(lines)))
+
+	def test_accept_must_be_bool(self):
+		"""Test that a string or number "accept" is refused rather than read as true."""
+		for value in ("no", "false", 0):
+			with self.subTest(value=value):
+				records = from_jsonl(f'{{"change": 1, "accept": true}}\n{{"change": 2, "accept": {json.dumps(value)}}}\n')
+				with self.assertRaisesRegex(ValueError, "line 2"):
+					structured.parse_decision_records(records)
+		self.assertEqual(structured.parse_decision_records([{"change": 1, "accept": False}]), {"Change #1": False})
+
+	@unittest.skipIf(structured.msgpack is None, "msgpack is not installed")
+	def test_msgpack(self):
+		"""Test that msgpack output unpacks to the same records."""
+		import msgpack
+		records = list(diff_records(DIFF, Path("a.py"), CONTENT))
+		self.assertEqual(list(msgpack.Unpacker(io.BytesIO(to_msgpack(records)))), records)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+from pathlib import Path
+from shared_setup import *
+from assistant_merger.git_tools import *
+from assistant_merger.word_diff import word_diff_line, word_diff_hunk
+
+class TestWordDiff(SharedGitTestCase):
+	def test_rename(self):
+		"""Test that a renamed identifier renders as a single inline edit."""
+		self.assertEqual(word_diff_line("    total = compute(values)", "    total = calculate(values)"), "    total = {-compute-}{+calculate+}(values)")
+
+	def test_unrelated_lines_stay_plain(self):
+		"""Test that lines with little in common aren't folded."""
+		self.assertIsNone(word_diff_line("import os", "return [x for x in items]"))
+		self.assertIsNone(word_diff_line("a {-b-} c", "a {-d-} c"))
+
+	def test_hunk(self):
+		"""Test that equal-length replacements are paired and leftover lines kept."""
+		content = "-x = old_name(1)\n-y = old_name(2)\n+x = new_name(1)\n+y = new_name(2)\n+z = 3"
+		self.assertEqual(word_diff_hunk(content), "*x = {-old_name-}{+new_name+}(1)\n*y = {-old_name-}{+new_name+}(2)\n+z = 3")
+
+	def test_time_limit(self):
+		"""Test that an exhausted time budget leaves the hunk as it was."""
+		content = "-x = old_name(1)\n+x = new_name(1)"
+		self.assertEqual(word_diff_hunk(content, time_limit=-1), content)
+
+	def test_rendering_only(self):
+		"""Test that word diff rendering is never longer and leaves hunks and decisions untouched."""
+		for filename, repo_file_path in self.file_paths.items():
+			with self.subTest(filename=filename):
+				diff, _ = get_git_diff(repo_file_path)
+				plain, hunks = add_change_numbers(diff, repo_file_path)
+				compact, word_hunks = add_change_numbers(diff, repo_file_path, word_diff=True)
+				self.assertLessEqual(len(compact), len(plain))
+				self.assertEqual(hunks, word_hunks)
+
+if __name__ == '__main__':
+	unittest.main()